@@ -26,6 +26,7 @@
             "/web_responsive/static/src/legacy/js/web_responsive.js",
             "/web_responsive/static/src/components/ui_context.esm.js",
             "/web_responsive/static/src/components/apps_menu/apps_menu.scss",
+            "/web_responsive/static/src/components/apps_menu/menu_search_index.esm.js",
             "/web_responsive/static/src/components/apps_menu/apps_menu.esm.js",
             "/web_responsive/static/src/components/control_panel/control_panel.scss",
             "/web_responsive/static/src/components/control_panel/control_panel.esm.js",
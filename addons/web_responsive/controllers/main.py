@@ -0,0 +1,45 @@
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+import base64
+
+from odoo import http
+from odoo.http import request
+from odoo.tools.mimetypes import guess_mimetype
+
+from ..models.ir_ui_menu import icon_hash
+
+
+class WebResponsiveController(http.Controller):
+    @http.route(
+        [
+            "/web_responsive/menu_icon/<int:menu_id>",
+            "/web_responsive/menu_icon/<int:menu_id>/<string:unique>",
+        ],
+        type="http",
+        auth="user",
+        methods=["GET"],
+    )
+    def menu_icon(self, menu_id, unique=None):
+        """Icon of a menu the user can see.
+
+        URLs carrying the current content hash are cached for a year; the
+        hash changes with the icon, so a new icon gets a new URL.
+        """
+        # search() only returns menus visible to the current user
+        menu = request.env["ir.ui.menu"].search([("id", "=", menu_id)])
+        if not menu or not menu.web_icon_data:
+            raise request.not_found()
+        etag = icon_hash(menu.web_icon_data)
+        if unique == etag:
+            cache_control = "private, max-age=%d, immutable" % http.STATIC_CACHE_LONG
+        else:
+            cache_control = "private, no-cache"
+        headers = [("ETag", '"%s"' % etag), ("Cache-Control", cache_control)]
+        if etag in request.httprequest.if_none_match:
+            return request.make_response(b"", headers=headers, status=304)
+        content = base64.b64decode(menu.web_icon_data)
+        headers += [
+            ("Content-Type", guess_mimetype(content, default="image/png")),
+            ("Content-Length", len(content)),
+        ]
+        return request.make_response(content, headers=headers)
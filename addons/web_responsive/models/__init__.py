@@ -0,0 +1 @@
+from . import ir_ui_menu
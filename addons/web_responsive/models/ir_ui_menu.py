@@ -0,0 +1,37 @@
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+import hashlib
+
+from odoo import api, models
+
+
+def icon_hash(web_icon_data):
+    """Short content hash of a menu icon, used as its URL key and ETag."""
+    if isinstance(web_icon_data, str):
+        web_icon_data = web_icon_data.encode()
+    return hashlib.sha1(web_icon_data).hexdigest()[:16]
+
+
+class IrUiMenu(models.Model):
+    _inherit = "ir.ui.menu"
+
+    @api.model
+    def load_web_menus(self, debug):
+        """Replace inline icon data with a cacheable URL.
+
+        Each app icon is served by ``/web_responsive/menu_icon``, keyed by
+        the menu id and a hash of its content, so the browser downloads it
+        once and the menu payload only carries ``webIconUrl`` and
+        ``webIconHash``.
+        """
+        menus = super().load_web_menus(debug)
+        for menu in menus.values():
+            web_icon_data = menu.get("webIconData")
+            if not web_icon_data or not menu.get("id"):
+                continue
+            menu["webIconHash"] = icon_hash(web_icon_data)
+            menu["webIconUrl"] = "/web_responsive/menu_icon/{}/{}".format(
+                menu["id"], menu["webIconHash"]
+            )
+            menu["webIconData"] = False
+        return menus
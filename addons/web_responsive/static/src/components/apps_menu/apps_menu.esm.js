@@ -9,10 +9,10 @@ import {useAutofocus, useBus, useService} from "@web/core/utils/hooks";
 import {useHotkey} from "@web/core/hotkeys/hotkey_hook";
 import {scrollTo} from "@web/core/utils/scrolling";
 import {debounce} from "@web/core/utils/timing";
-import {fuzzyLookup} from "@web/core/utils/search";
 import {WebClient} from "@web/webclient/webclient";
 import {patch} from "web.utils";
 import {escapeRegExp} from "@web/core/utils/strings";
+import {MenuSearchIndex} from "@web_responsive/components/apps_menu/menu_search_index.esm";
 
 const {Component, useState, onPatched, onWillPatch} = owl;
 
@@ -127,65 +127,30 @@ export class AppsMenu extends Component {
 }
 
 /**
- * Reduce menu data to a searchable format understandable by fuzzyLookup
+ * Image source for a menu icon.
  *
- * `menuService.getMenuAsTree()` returns array in a format similar to this (only
- * relevant data is shown):
- *
- * ```js
- * // This is a menu entry:
- * {
- *     actionID: 12,       // Or `false`
- *     name: "Actions",
- *     childrenTree: {0: {...}, 1: {...}}}, // List of inner menu entries
- *                                          // in the same format or `undefined`
- * }
- * ```
- *
- * This format is very hard to process to search matches, and it would
- * slow down the search algorithm, so we reduce it with this method to be
- * able to later implement a simpler search.
- *
- * @param {Object} memo
- * Reference to current result object, passed on recursive calls.
+ * The server sends app icons as cacheable URLs (`webIconUrl`); inline
+ * `webIconData` is still turned into a data URI for menus loaded
+ * without them.
  *
  * @param {Object} menu
- * A menu entry, as described above.
- *
- * @returns {Object}
- * Reduced object, without entries that have no action, and with a
- * format like this:
- *
- * ```js
- * {
- *  "Discuss": {Menu entry Object},
- *  "Settings": {Menu entry Object},
- *  "Settings/Technical/Actions/Actions": {Menu entry Object},
- *  ...
- * }
- * ```
+ * @returns {String} Icon URL or data URI, or "" if the menu has no icon
  */
-function findNames(memo, menu) {
-    if (menu.actionID) {
-        var result = "";
-        if (menu.webIconData) {
-            const prefix = menu.webIconData.startsWith("P")
-                ? "data:image/svg+xml;base64,"
-                : "data:image/png;base64,";
-            result = menu.webIconData.startsWith("data:image")
-                ? menu.webIconData
-                : prefix + menu.webIconData.replace(/\s/g, "");
-        }
-        menu.webIconData = result;
-        memo[menu.name.trim()] = menu;
+function menuIconSrc(menu) {
+    if (menu.webIconUrl) {
+        return menu.webIconUrl;
     }
-    if (menu.childrenTree) {
-        const innerMemo = _.reduce(menu.childrenTree, findNames, {});
-        for (const innerKey in innerMemo) {
-            memo[menu.name.trim() + " / " + innerKey] = innerMemo[innerKey];
-        }
+    const webIconData = menu.webIconData;
+    if (!webIconData) {
+        return "";
     }
-    return memo;
+    if (webIconData.startsWith("data:image")) {
+        return webIconData;
+    }
+    const prefix = webIconData.startsWith("P")
+        ? "data:image/svg+xml;base64,"
+        : "data:image/png;base64,";
+    return prefix + webIconData.replace(/\s/g, "");
 }
 
 /**
@@ -201,15 +166,10 @@ export class AppsMenuSearchBar extends Component {
         });
         this.searchBarInput = useAutofocus({refName: "SearchBarInput"});
         this._searchMenus = debounce(this._searchMenus, 100);
-        // Store menu data in a format searchable by fuzzy.js
-        this._searchableMenus = [];
         this.menuService = useService("menu");
-        for (const menu of this.menuService.getApps()) {
-            Object.assign(
-                this._searchableMenus,
-                _.reduce([this.menuService.getMenuAsTree(menu.id)], findNames, {})
-            );
-        }
+        // Flattened menus, indexed once per menu version
+        this._searchIndex = MenuSearchIndex.get(this.menuService);
+        this._menuInfoCache = new Map();
         // Set up key navigation
         this._setupKeyNavigation();
         onWillPatch(() => {
@@ -239,7 +199,7 @@ export class AppsMenuSearchBar extends Component {
         const query = this.searchBarInput.el.value;
         this.state.hasResults = query !== "";
         this.state.results = this.state.hasResults
-            ? fuzzyLookup(query, _.keys(this._searchableMenus), (k) => k)
+            ? this._searchIndex.search(query)
             : [];
     }
 
@@ -249,7 +209,13 @@ export class AppsMenuSearchBar extends Component {
      * @returns {Object} Menu object.
      */
     _menuInfo(key) {
-        return this._searchableMenus[key];
+        let info = this._menuInfoCache.get(key);
+        if (!info) {
+            const menu = this.menuService.getMenu(this._searchIndex.menuId(key));
+            info = {...menu, webIconData: menuIconSrc(menu)};
+            this._menuInfoCache.set(key, info);
+        }
+        return info;
     }
 
     /**
@@ -318,16 +284,10 @@ export class AppsMenuSearchBar extends Component {
 // Patch Navbar to add proper icon for apps
 patch(NavBar.prototype, "web_responsive.navbar", {
     getWebIconData(menu) {
-        var result = "/web_responsive/static/img/default_icon_app.png";
-        if (menu.webIconData) {
-            const prefix = menu.webIconData.startsWith("P")
-                ? "data:image/svg+xml;base64,"
-                : "data:image/png;base64,";
-            result = menu.webIconData.startsWith("data:image")
-                ? menu.webIconData
-                : prefix + menu.webIconData.replace(/\s/g, "");
-        }
-        return result;
+        return (
+            menuIconSrc(menu) ||
+            "/web_responsive/static/img/default_icon_app.png"
+        );
     },
 });
 AppsMenu.template = "web_responsive.AppsMenu";
@@ -0,0 +1,241 @@
+/** @odoo-module **/
+/* License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl). */
+
+import {browser} from "@web/core/browser/browser";
+import {fuzzyLookup} from "@web/core/utils/search";
+import {session} from "@web/session";
+
+const STORAGE_KEY = "web_responsive.menu_search_index";
+const INDEX_FORMAT = 1;
+// Word prefixes indexed for queries shorter than a trigram
+const PREFIX_LENGTH = 2;
+
+// Index of the current menu version, shared by every search bar instance
+let currentIndex = null;
+
+/**
+ * Lowercase and strip diacritics, so "medico" matches "Médico".
+ *
+ * @param {String} text
+ * @returns {String}
+ */
+export function normalize(text) {
+    return text
+        .normalize("NFD")
+        .replace(/[\u0300-\u036f]/g, "")
+        .toLowerCase();
+}
+
+function trigrams(word) {
+    const result = [];
+    for (let i = 0; i + 3 <= word.length; i++) {
+        result.push(word.slice(i, i + 3));
+    }
+    return result;
+}
+
+function addPosting(postings, token, position) {
+    const list = postings[token] || (postings[token] = []);
+    if (list[list.length - 1] !== position) {
+        list.push(position);
+    }
+}
+
+/**
+ * Flatten the menu trees of all apps into searchable entries.
+ *
+ * Only entries with an action are kept, and each one is keyed by its
+ * full path, like "Settings / Technical / Actions / Actions".
+ *
+ * @param {Object} menuService
+ * @returns {Array[]} `[key, menuId]` pairs
+ */
+function flattenMenus(menuService) {
+    const entries = [];
+    const seen = new Set();
+    const visit = (menu, path) => {
+        const key = path ? `${path} / ${menu.name.trim()}` : menu.name.trim();
+        if (menu.actionID && !seen.has(key)) {
+            seen.add(key);
+            entries.push([key, menu.id]);
+        }
+        for (const child of menu.childrenTree || []) {
+            visit(child, key);
+        }
+    };
+    for (const app of menuService.getApps()) {
+        visit(menuService.getMenuAsTree(app.id), "");
+    }
+    return entries;
+}
+
+/**
+ * Build the index: normalized keys plus posting lists (sorted entry
+ * positions) for every trigram and short word prefix.
+ *
+ * @param {Array[]} entries `[key, menuId]` pairs
+ * @returns {Object}
+ */
+function buildIndex(entries) {
+    const normalized = [];
+    const trigramPostings = {};
+    const prefixPostings = {};
+    entries.forEach(([key], position) => {
+        const text = normalize(key);
+        normalized.push(text);
+        for (const word of text.split(/[\s/]+/)) {
+            const maxLength = Math.min(PREFIX_LENGTH, word.length);
+            for (let length = 1; length <= maxLength; length++) {
+                addPosting(prefixPostings, word.slice(0, length), position);
+            }
+            for (const trigram of trigrams(word)) {
+                addPosting(trigramPostings, trigram, position);
+            }
+        }
+    });
+    return {
+        entries,
+        normalized,
+        trigrams: trigramPostings,
+        prefixes: prefixPostings,
+    };
+}
+
+function intersect(left, right) {
+    const result = [];
+    let i = 0;
+    let j = 0;
+    while (i < left.length && j < right.length) {
+        if (left[i] === right[j]) {
+            result.push(left[i]);
+            i++;
+            j++;
+        } else if (left[i] < right[j]) {
+            i++;
+        } else {
+            j++;
+        }
+    }
+    return result;
+}
+
+function readStoredIndex(hash) {
+    try {
+        const stored = JSON.parse(browser.localStorage.getItem(STORAGE_KEY));
+        if (stored && stored.format === INDEX_FORMAT && stored.hash === hash) {
+            return stored.index;
+        }
+    } catch {
+        // Corrupted or unavailable storage: rebuild the index
+    }
+    return null;
+}
+
+function storeIndex(hash, index) {
+    try {
+        browser.localStorage.setItem(
+            STORAGE_KEY,
+            JSON.stringify({format: INDEX_FORMAT, hash, index})
+        );
+    } catch {
+        // Storage full or disabled: the in-memory index is enough
+    }
+}
+
+/**
+ * Searchable index of the menus, rebuilt only when the menu version
+ * changes. The version is the `load_menus` hash sent by the server,
+ * which already depends on the user, the language and the menu data.
+ */
+export class MenuSearchIndex {
+    /**
+     * @param {Object} menuService
+     * @returns {MenuSearchIndex}
+     */
+    static get(menuService) {
+        const hash = (session.cache_hashes && session.cache_hashes.load_menus) || null;
+        if (currentIndex && hash && currentIndex.hash === hash) {
+            return currentIndex;
+        }
+        let data = hash && readStoredIndex(hash);
+        if (!data) {
+            data = buildIndex(flattenMenus(menuService));
+            if (hash) {
+                storeIndex(hash, data);
+            }
+        }
+        currentIndex = new MenuSearchIndex(hash, data);
+        return currentIndex;
+    }
+
+    constructor(hash, data) {
+        this.hash = hash;
+        this.entries = data.entries;
+        this.normalized = data.normalized;
+        this.trigrams = data.trigrams;
+        this.prefixes = data.prefixes;
+        this.menuIds = new Map(this.entries);
+    }
+
+    /**
+     * @param {String} key Full path of a menu entry
+     * @returns {Number|undefined} Its menu id
+     */
+    menuId(key) {
+        return this.menuIds.get(key);
+    }
+
+    /**
+     * Positions of the entries where every query word appears: trigram
+     * postings for words of 3+ characters, word prefixes for shorter ones.
+     *
+     * @param {String[]} words Normalized query words
+     * @returns {Number[]|null} `null` if some word is not indexed
+     */
+    _candidates(words) {
+        let candidates = null;
+        for (const word of words) {
+            const lists =
+                word.length < 3
+                    ? [this.prefixes[word]]
+                    : trigrams(word).map((trigram) => this.trigrams[trigram]);
+            for (const list of lists) {
+                if (!list) {
+                    return null;
+                }
+                candidates = candidates ? intersect(candidates, list) : list;
+            }
+        }
+        return candidates;
+    }
+
+    /**
+     * Menu keys matching the query, best matches first.
+     *
+     * Candidates come from the index and are ranked with `fuzzyLookup`.
+     * Only when the index finds nothing (e.g. a query with letters
+     * skipped) does the fuzzy matching run over every entry.
+     *
+     * @param {String} query
+     * @returns {String[]}
+     */
+    search(query) {
+        const normalizedQuery = normalize(query).trim();
+        const words = normalizedQuery.split(/[\s/]+/).filter(Boolean);
+        if (!words.length) {
+            return [];
+        }
+        let positions = this._candidates(words) || [];
+        positions = positions.filter((position) =>
+            words.every((word) => this.normalized[position].includes(word))
+        );
+        if (!positions.length) {
+            positions = this.entries.map((entry, position) => position);
+        }
+        return fuzzyLookup(
+            normalizedQuery,
+            positions,
+            (position) => this.normalized[position]
+        ).map((position) => this.entries[position][0]);
+    }
+}
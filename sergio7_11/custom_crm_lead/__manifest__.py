@@ -1,6 +1,6 @@
 {
     'name': 'Extends crm lead',
-    'version': '16.0.1.0.0',
+    'version': '16.0.1.3.0',
     'summary': 'Extends crm lead for a many2many tags products',
     'description': 'Extends crm lead for a many2many tags products',
     'category': 'Tools',
@@ -8,9 +8,14 @@
     # 'website': 'https://github.com/nicomesa230',
     'depends': ['base', 'product', 'crm', 'custom_partner', 'custom_department'],
     'data': [
+        'security/ir.model.access.csv',
+        'data/ir_cron.xml',
         'views/crm_product_menu.xml',
         'views/form_crm_lead.xml',
         'views/crm_lead_views.xml',
+        'views/department_views.xml',
+        'views/pipeline_summary_views.xml',
+        'views/revenue_forecast_views.xml',
     ],
     'license': 'LGPL-3',
     'installable': True,
@@ -1 +1,6 @@
-from . import crm_lead
\ No newline at end of file
+from . import crm_lead
+from . import lead_department
+from . import dataset_generator
+from . import visibility_benchmark
+from . import pipeline_summary
+from . import revenue_forecast
@@ -1,4 +1,10 @@
+import time
+from collections import defaultdict
+
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.addons.custom_partner.models import perf_metrics
+from odoo.addons.custom_partner.models.perf_probe import VisibilityProbe, claim_nested_search, nested_search
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -31,6 +37,12 @@ class CrmLead(models.Model):
         store=True,
         help="Departamento del comercial asignado a esta oportunidad"
     )
+    department_code = fields.Char(
+        string='Código de departamento',
+        compute='_compute_department_code',
+        search='_search_department_code',
+        help="Códigos de los departamentos del comercial; al buscar incluye los subdepartamentos"
+    )
     tag_ids = fields.Many2many(
         string='Etiquetas',
         help='Etiquetas relacionadas con esta oportunidad',
@@ -57,9 +69,27 @@ class CrmLead(models.Model):
             else:
                 lead.commercial_department = False
     
+    @api.depends('user_id.partner_id.department.code')
+    def _compute_department_code(self):
+        for lead in self:
+            codes = lead.user_id.partner_id.department.mapped('code')
+            lead.department_code = ', '.join(code for code in codes if code) or False
+
+    def _search_department_code(self, operator, value):
+        """Oportunidades cuyo comercial está en el departamento con ese código o en un subdepartamento."""
+        if operator not in ('=', 'in'):
+            raise UserError(f"Operador no soportado para buscar por código de departamento: {operator}")
+        codes = [value] if operator == '=' else value
+        Department = self.env['res.partner.department']
+        department_ids = set()
+        for code in codes:
+            department_ids.update(Department._department_ids_by_code(code))
+        return [('user_id.partner_id.department', 'in', list(department_ids))]
+
     @api.depends('product_ids', 'product_ids.list_price')
     def _compute_expected_revenue_from_products(self):
         """Calcula el ingreso esperado sumando el precio de los productos seleccionados"""
+        perf_metrics.inc(self.env, 'custom_crm_expected_revenue_recomputes_total', len(self))
         for lead in self:
             total_revenue = 0.0
             for product in lead.product_ids:
@@ -67,47 +97,86 @@ class CrmLead(models.Model):
             lead.expected_revenue = total_revenue
     
     def _get_or_create_department_tag(self, department_name, color=1):
+        return self._get_or_create_department_tags([department_name], color)[department_name]
+
+    def _get_or_create_department_tags(self, department_names, color=1):
+        """Etiquetas {nombre: tag} de los departamentos, creando en bloque las que falten."""
         Tag = self.env['crm.tag']
-        tag = Tag.search([('name', '=', department_name)], limit=1)
-        if not tag:
-            tag = Tag.create({'name': department_name, 'color': color})
-        return tag
+        tags = {tag.name: tag for tag in Tag.search([('name', 'in', list(department_names))])}
+        missing_names = [name for name in department_names if name not in tags]
+        perf_metrics.inc(self.env, 'custom_crm_tag_upserts_total', len(tags), action='found')
+        if missing_names:
+            perf_metrics.inc(self.env, 'custom_crm_tag_upserts_total', len(missing_names), action='created')
+            for tag in Tag.create([{'name': name, 'color': color} for name in missing_names]):
+                tags[tag.name] = tag
+        return tags
 
     def _assign_department_tag(self):
+        """Añade a cada oportunidad las etiquetas de los departamentos de su comercial."""
+        default_partner = self.env.user.partner_id
+        names_by_lead = {}
         for lead in self:
-            tags_to_add = self.env['crm.tag']
-
-            user = lead.user_id or self.env.user
-            partner = user.partner_id if user else False
-
-            if partner and partner.department:
-                dept_names = partner.department.mapped('name')
-                for name in dept_names:
-                    tag = self._get_or_create_department_tag(name)
-                    tags_to_add |= tag
+            partner = lead.user_id.partner_id if lead.user_id else default_partner
+            names_by_lead[lead] = partner.department.mapped('name') if partner else []
+
+        department_names = sorted({name for names in names_by_lead.values() for name in names})
+        if not department_names:
+            return
+        tags = self._get_or_create_department_tags(department_names)
+
+        # Una sola escritura por combinación de etiquetas
+        leads_by_tags = defaultdict(lambda: self.browse())
+        for lead, names in names_by_lead.items():
+            if names:
+                leads_by_tags[tuple(sorted(tags[name].id for name in names))] |= lead
+        for tag_ids, leads in leads_by_tags.items():
+            saved_leads = leads.filtered('id')
+            if saved_leads:
+                saved_leads.write({'tag_ids': [(4, tag_id) for tag_id in tag_ids]})
+            # En onchange las oportunidades aún no existen en base de datos
+            for lead in leads - saved_leads:
+                lead.tag_ids |= self.env['crm.tag'].browse(tag_ids)
+
+    # Campos que alteran los contadores y el resumen del pipeline de los departamentos
+    _DEPARTMENT_COUNTER_FIELDS = (
+        'active', 'type', 'user_id', 'stage_id', 'expected_revenue', 'probability', 'product_ids',
+    )
 
-            if tags_to_add:
-                lead.tag_ids |= tags_to_add
+    def _mark_department_counters_dirty(self):
+        """Marca los departamentos de los comerciales de estas oportunidades."""
+        self.env['res.partner.department']._mark_counters_dirty(
+            self.sudo().user_id.partner_id.department.ids
+        )
+
+    def _metrics_role(self):
+        profile = self.env['res.partner']._get_acting_profile()
+        return 'admin' if profile.is_admin else (profile.role or 'other')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Al crear leads, asignar departamento y etiqueta automáticamente"""
+        start = time.perf_counter()
+        partners = self.env['res.partner'].browse({vals['partner_id'] for vals in vals_list if vals.get('partner_id')})
+        for vals in vals_list:
+            if 'user_id' not in vals:
+                vals['user_id'] = self.env.user.id
+
+            if vals.get('partner_id'):
+                partner = partners.browse(vals['partner_id']).with_prefetch(partners._prefetch_ids)
+                if 'email_from' not in vals:
+                    vals['email_from'] = (partner.email or '').strip()
+                if 'phone' not in vals:
+                    vals['phone'] = (partner.phone or partner.mobile or '').strip()
 
-    @api.model
-    def create(self, vals):
-        """Al crear lead, asignar departamento y etiqueta automáticamente"""
-        if 'user_id' not in vals:
-            vals['user_id'] = self.env.user.id
-            
-        if vals.get('partner_id'):
-            partner = self.env['res.partner'].browse(vals['partner_id'])
-            if 'email_from' not in vals:
-                vals['email_from'] = (partner.email or '').strip()
-            if 'phone' not in vals:
-                vals['phone'] = (partner.phone or partner.mobile or '').strip()
-        
-        lead = super().create(vals)
-        lead._assign_department_tag()
-        return lead
+        leads = super().create(vals_list)
+        leads._assign_department_tag()
+        leads._mark_department_counters_dirty()
+        perf_metrics.observe(self.env, 'custom_crm_lead_create_seconds', time.perf_counter() - start, role=self._metrics_role())
+        return leads
     
     def write(self, vals):
         """Al modificar lead, actualizar departamento y etiquetas"""
+        start = time.perf_counter()
         if 'partner_id' in vals:
             partner_id = vals['partner_id']
             if partner_id:
@@ -122,12 +191,24 @@ class CrmLead(models.Model):
                 if 'phone' not in vals:
                     vals['phone'] = False
         
+        touches_counters = any(fname in vals for fname in self._DEPARTMENT_COUNTER_FIELDS)
+        if touches_counters:
+            self._mark_department_counters_dirty()
+
         result = super().write(vals)
         
         if 'user_id' in vals or 'partner_id' in vals:
             self._assign_department_tag()
-            
+
+        if touches_counters:
+            self._mark_department_counters_dirty()
+
+        perf_metrics.observe(self.env, 'custom_crm_lead_write_seconds', time.perf_counter() - start, role=self._metrics_role())
         return result
+
+    def unlink(self):
+        self._mark_department_counters_dirty()
+        return super().unlink()
     
     @api.onchange('user_id')
     def _onchange_user_id(self):
@@ -157,168 +238,115 @@ class CrmLead(models.Model):
     phone = fields.Char(readonly=True) 
 
     @api.model
-    def search(self, args, offset=0, limit=None, order=None, count=False):
+    def _get_visibility_domain(self, profile):
         """
-        Filtros personalizados de visibilidad por rol para oportunidades CRM.
+        Dominio de oportunidades visibles para el perfil de usuario indicado.
         """
-        current_user = self.env.user
-        
-        # 🆕 CRÍTICO: Evitar recursión en cálculos computados
-        if (self.env.context.get('skip_custom_search') or 
-            self.env.context.get('active_test') is False or
-            self.env.context.get('computing_opportunity_count') or
-            '_compute_' in str(self.env.context)):
-            _logger.info(f"🔓 Contexto especial detectado en CRM search - sin restricciones")
-            return super(CrmLead, self).search(args, offset=offset, limit=limit, order=order, count=count)
-
-        _logger.info(f"===== CRM SEARCH llamado por usuario {current_user.name} (ID {current_user.id}) =====")
-        
-        # Admin ve todo
-        if self.env.user._is_admin():
-            _logger.info("Es admin REAL - Sin restricciones")
-            return super(CrmLead, self).search(args, offset, limit, order, count)
+        Partner = self.env['res.partner'].with_context(skip_custom_search=True).sudo()
+        Users = self.env['res.users'].with_context(skip_custom_search=True)
 
-        if not current_user.partner_id:
+        if not profile.partner_id:
             _logger.warning(f"Usuario sin partner_id asociado")
-            return super(CrmLead, self).search(args + [('id', '=', False)], offset, limit, order, count)
-
-        partner = current_user.partner_id
-        _logger.info(f"- Roles: worker={partner.worker}, supervisor={partner.supervisor}, external={partner.external}")
+            return [('id', '=', False)]
 
         # COMERCIAL
-        if partner.worker:
-            _logger.info(f"COMERCIAL CRM search - Usuario {partner.name}")
-            worker_domain = [
-                '|', 
-                ('create_uid', '=', current_user.id),
-                ('user_id', '=', current_user.id)
+        if profile.is_worker:
+            return [
+                '|',
+                ('create_uid', '=', profile.uid),
+                ('user_id', '=', profile.uid)
             ]
-            _logger.info(f"Worker domain: {worker_domain}")
-            return super(CrmLead, self).search(args + worker_domain, offset, limit, order, count)
-
-        # SUPERVISOR
-        if partner.supervisor:
-            _logger.info(f"SUPERVISOR CRM search - Usuario {partner.name}")
-            _logger.info(f"- Departamentos: {partner.department.mapped('name')} (IDs {partner.department.ids})")
-            _logger.info(f"- Empresa: {partner.internal_company_id.name if partner.internal_company_id else None}")
 
+        # SUPERVISOR y EXTERNO (el externo funciona como supervisor de su equipo)
+        if profile.is_supervisor or profile.is_external:
             # 🆕 CRÍTICO: Usar skip_custom_search para evitar recursión
             # Obtener IDs de comerciales de su departamento/empresa
-            comerciales_ids = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
+            # El supervisor ve todo el subárbol de sus departamentos
+            department_operator = 'child_of' if profile.is_supervisor else 'in'
+            comerciales_ids = Partner.search([
                 ('worker', '=', True),
-                ('department', 'in', partner.department.ids),
-                ('internal_company_id', '=', partner.internal_company_id.id)
-            ]).ids
-            _logger.info(f"- Comerciales encontrados: {len(comerciales_ids)} - IDs: {comerciales_ids}")
-
-            # Obtener usuarios de esos comerciales
-            commercial_userids = []
-            for comercial_id in comerciales_ids:
-                user = self.env['res.users'].with_context(skip_custom_search=True).search([('partner_id', '=', comercial_id)], limit=1)
-                if user:
-                    commercial_userids.append(user.id)
-            _logger.info(f"- Usuarios comerciales: {commercial_userids}")
-
-            # 🆕 OBTENER EXTERNOS QUE TIENE ASIGNADOS ESTE SUPERVISOR
-            externos_supervisados_ids = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
-                ('external', '=', True),
-                ('supervisores_ids', 'in', [partner.id])
+                ('department', department_operator, list(profile.department_ids)),
+                ('internal_company_id', '=', profile.company_id)
             ]).ids
-            _logger.info(f"- Externos supervisados: {len(externos_supervisados_ids)} - IDs: {externos_supervisados_ids}")
-
-            # 🆕 OBTENER USUARIOS DE LOS EXTERNOS SUPERVISADOS
-            external_userids = []
-            for externo_id in externos_supervisados_ids:
-                user = self.env['res.users'].with_context(skip_custom_search=True).search([('partner_id', '=', externo_id)], limit=1)
-                if user:
-                    external_userids.append(user.id)
-            _logger.info(f"- Usuarios externos: {external_userids}")
+            _logger.info(f"- Comerciales encontrados: {len(comerciales_ids)}")
 
-            # 🆕 OBTENER COMERCIALES DE LOS EXTERNOS SUPERVISADOS Y SUS USUARIOS
+            externos_supervisados_ids = []
             comerciales_de_externos_ids = []
-            comerciales_de_externos_userids = []
-            
-            if externos_supervisados_ids:
-                for externo in self.env['res.partner'].with_context(skip_custom_search=True).browse(externos_supervisados_ids):
-                    comerciales_de_externos_ids.extend(externo.comerciales_asignados_ids.ids)
-                
-                comerciales_de_externos_ids = list(set(comerciales_de_externos_ids))
-                _logger.info(f"- Comerciales de externos: {len(comerciales_de_externos_ids)} - IDs: {comerciales_de_externos_ids}")
-                
-                for comercial_id in comerciales_de_externos_ids:
-                    user = self.env['res.users'].with_context(skip_custom_search=True).search([('partner_id', '=', comercial_id)], limit=1)
-                    if user:
-                        comerciales_de_externos_userids.append(user.id)
-                _logger.info(f"- Usuarios de comerciales de externos: {comerciales_de_externos_userids}")
+            if profile.is_supervisor:
+                # 🆕 OBTENER EXTERNOS QUE TIENE ASIGNADOS ESTE SUPERVISOR
+                externos_supervisados = Partner.search([
+                    ('external', '=', True),
+                    ('supervisores_ids', 'in', [profile.partner_id])
+                ])
+                externos_supervisados_ids = externos_supervisados.ids
+                _logger.info(f"- Externos supervisados: {len(externos_supervisados_ids)}")
+
+                # 🆕 COMERCIALES DE LOS EXTERNOS SUPERVISADOS (una sola lectura)
+                comerciales_de_externos_ids = externos_supervisados.comerciales_asignados_ids.ids
+
+            # Usuarios de comerciales, externos y comerciales de externos en una sola búsqueda
+            visible_partner_ids = set(comerciales_ids + externos_supervisados_ids + comerciales_de_externos_ids)
+            visible_user_ids = Users.search([('partner_id', 'in', list(visible_partner_ids))]).ids if visible_partner_ids else []
+            _logger.info(f"- Usuarios de comerciales y externos: {len(visible_user_ids)}")
 
             # Combinar todos los usuarios permitidos
-            todos_user_ids = list(set([current_user.id] + commercial_userids + external_userids + comerciales_de_externos_userids))
+            todos_user_ids = list(set([profile.uid] + visible_user_ids))
             _logger.info(f"- Total usuarios visibles: {len(todos_user_ids)}")
 
-            # 🆕 CONSTRUIR DOMINIO AMPLIADO PARA SUPERVISOR - ESTRUCTURA CORREGIDA
-            supervisor_domain = [
+            # 🆕 CONSTRUIR DOMINIO AMPLIADO - ESTRUCTURA CORREGIDA
+            return [
                 '|',  # OR principal
                 '|',  # Segundo nivel OR
                 # Opción 1: Oportunidades creadas por usuarios permitidos
                 ('create_uid', 'in', todos_user_ids),
-                # Opción 2: Oportunidades asignadas al supervisor
-                ('user_id', '=', current_user.id),
-                # Opción 3: Oportunidades creadas por el supervisor
-                ('create_uid', '=', current_user.id)
+                # Opción 2: Oportunidades asignadas al usuario
+                ('user_id', '=', profile.uid),
+                # Opción 3: Oportunidades creadas por el usuario
+                ('create_uid', '=', profile.uid)
             ]
 
-            _logger.info(f"Aplicando dominio supervisor CRM ampliado")
-            result = super(CrmLead, self).search(args + supervisor_domain, offset, limit, order, count)
-            _logger.info(f"Resultado CRM: {result if count else len(result)} registros")
-            return result
-
-        # 🆕 EXTERNO - Ahora funciona como supervisor
-        if partner.external:
-            _logger.info(f"EXTERNO CRM search - Usuario {partner.name} (como supervisor externo)")
-            _logger.info(f"- Departamentos: {partner.department.mapped('name')} (IDs {partner.department.ids})")
-            _logger.info(f"- Empresa: {partner.internal_company_id.name if partner.internal_company_id else None}")
+        # OTRO ROL
+        _logger.info("Usuario sin rol específico en CRM")
+        return [('create_uid', '=', profile.uid)]
 
-            # 🆕 CRÍTICO: Usar skip_custom_search para evitar recursión
-            # Obtener IDs de comerciales de su departamento/empresa
-            comerciales_ids = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
-                ('worker', '=', True),
-                ('department', 'in', partner.department.ids),
-                ('internal_company_id', '=', partner.internal_company_id.id)
-            ]).ids
-            _logger.info(f"- Comerciales de su equipo: {len(comerciales_ids)} - IDs: {comerciales_ids}")
+    @api.model
+    def search(self, args, offset=0, limit=None, order=None, count=False):
+        """
+        Filtros personalizados de visibilidad por rol para oportunidades CRM.
+        """
+        if self.env['res.partner']._skip_visibility_filters():
+            _logger.info(f"🔓 Contexto especial detectado en CRM search - sin restricciones")
+            return super(CrmLead, self).search(args, offset=offset, limit=limit, order=order, count=count)
 
-            # Obtener usuarios de esos comerciales
-            commercial_userids = []
-            for comercial_id in comerciales_ids:
-                user = self.env['res.users'].with_context(skip_custom_search=True).search([('partner_id', '=', comercial_id)], limit=1)
-                if user:
-                    commercial_userids.append(user.id)
-            _logger.info(f"- Usuarios comerciales: {commercial_userids}")
+        profile = self.env['res.partner']._get_acting_profile()
+        branch = 'admin' if profile.is_admin else 'default'
 
-            # Combinar todos los usuarios permitidos
-            todos_user_ids = list(set([current_user.id] + commercial_userids))
-            _logger.info(f"- Total usuarios visibles: {len(todos_user_ids)}")
+        # Llamada interna de search_read: args ya incluye el dominio de
+        # visibilidad y la medición es la de search_read
+        nested = claim_nested_search(self.env, self._name, args)
+        if nested is not None:
+            nested.update(branch=branch, model=self, final_domain=args)
+            return super(CrmLead, self).search(args, offset, limit, order, count)
 
-            # 🆕 CONSTRUIR DOMINIO PARA EXTERNO (como supervisor)
-            external_domain = [
-                '|',  # OR principal
-                '|',  # Segundo nivel OR
-                # Opción 1: Oportunidades creadas por usuarios permitidos
-                ('create_uid', 'in', todos_user_ids),
-                # Opción 2: Oportunidades asignadas al externo
-                ('user_id', '=', current_user.id),
-                # Opción 3: Oportunidades creadas por el externo
-                ('create_uid', '=', current_user.id)
-            ]
+        _logger.info(f"===== CRM SEARCH llamado por {profile} =====")
+        probe = VisibilityProbe(self.env, self._name, 'search')
 
-            _logger.info(f"🔍 Aplicando dominio externo CRM (como supervisor)")
-            result = super(CrmLead, self).search(args + external_domain, offset, limit, order, count)
-            _logger.info(f"✅ Resultado externo CRM: {result if count else len(result)} registros")
+        # Admin ve todo
+        if profile.is_admin:
+            _logger.info("Es admin REAL - Sin restricciones")
+            with probe.stage('final'):
+                result = super(CrmLead, self).search(args, offset, limit, order, count)
+            probe.record(profile, [], result if count else len(result), branch)
             return result
 
-        # OTRO ROL
-        _logger.info("Usuario sin rol específico en CRM")
-        return super(CrmLead, self).search(args + [('create_uid', '=', current_user.id)], offset, limit, order, count)
+        with probe.stage('build'):
+            visibility_domain = self._get_visibility_domain(profile)
+        with probe.stage('final'):
+            result = super(CrmLead, self).search(args + visibility_domain, offset, limit, order, count)
+        probe.record(profile, visibility_domain, result if count else len(result), branch)
+        probe.capture_if_slow(self, args + visibility_domain, offset, limit, order, profile, count)
+        _logger.info(f"✅ Resultado CRM: {result if count else len(result)} registros")
+        return result
 
     @api.model
     def search_read(self, domain=None, fields=None, offset=0, limit=None, order=None):
@@ -328,146 +356,27 @@ class CrmLead(models.Model):
         if domain is None:
             domain = []
 
-        current_user = self.env.user
-        
-        # 🆕 CRÍTICO: Evitar recursión en cálculos computados
-        if (self.env.context.get('skip_custom_search') or 
-            self.env.context.get('active_test') is False or
-            self.env.context.get('computing_opportunity_count') or
-            '_compute_' in str(self.env.context)):
+        if self.env['res.partner']._skip_visibility_filters():
             _logger.info(f"🔓 Contexto especial detectado en CRM search_read - sin restricciones")
             return super(CrmLead, self).search_read(domain, fields, offset, limit, order)
 
-        _logger.info(f"CRM SEARCH_READ llamado por usuario {current_user.name}")
+        profile = self.env['res.partner']._get_acting_profile()
+        _logger.info(f"CRM SEARCH_READ llamado por {profile}")
 
+        probe = VisibilityProbe(self.env, self._name, 'search_read')
+        visibility_domain = []
         # Admin ve todo
-        if self.env.is_admin():
-            _logger.info("Es admin - Sin restricciones")
-            return super(CrmLead, self).search_read(domain, fields, offset, limit, order)
-
-        if not current_user.partner_id:
-            _logger.warning(f"Usuario sin partner_id asociado")
-            return super(CrmLead, self).search_read(domain + [('id', '=', False)], fields, offset, limit, order)
-
-        partner = current_user.partner_id
-        _logger.info(f"- Roles: worker={partner.worker}, supervisor={partner.supervisor}, external={partner.external}")
-
-        # COMERCIAL
-        if partner.worker:
-            _logger.info(f"COMERCIAL CRM search_read - Usuario {partner.name}")
-            worker_domain = [
-                '|', 
-                ('create_uid', '=', current_user.id),
-                ('user_id', '=', current_user.id)
-            ]
-            _logger.info(f"Worker domain: {worker_domain}")
-            return super(CrmLead, self).search_read(domain + worker_domain, fields, offset, limit, order)
-
-        # SUPERVISOR
-        if partner.supervisor:
-            _logger.info(f"SUPERVISOR CRM search_read - Usuario {partner.name}")
-            
-            # 🆕 CRÍTICO: Usar skip_custom_search para evitar recursión
-            # Obtener IDs de comerciales
-            comerciales_ids = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
-                ('worker', '=', True),
-                ('department', 'in', partner.department.ids),
-                ('internal_company_id', '=', partner.internal_company_id.id)
-            ]).ids
-            _logger.info(f"- Comerciales encontrados: {len(comerciales_ids)}")
-
-            # Obtener usuarios de comerciales
-            commercial_userids = []
-            for comercial_id in comerciales_ids:
-                user = self.env['res.users'].with_context(skip_custom_search=True).search([('partner_id', '=', comercial_id)], limit=1)
-                if user:
-                    commercial_userids.append(user.id)
-
-            # 🆕 OBTENER EXTERNOS QUE TIENE ASIGNADOS ESTE SUPERVISOR
-            externos_supervisados_ids = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
-                ('external', '=', True),
-                ('supervisores_ids', 'in', [partner.id])
-            ]).ids
-            _logger.info(f"- Externos supervisados: {len(externos_supervisados_ids)}")
-
-            # 🆕 OBTENER USUARIOS DE EXTERNOS
-            external_userids = []
-            for externo_id in externos_supervisados_ids:
-                user = self.env['res.users'].with_context(skip_custom_search=True).search([('partner_id', '=', externo_id)], limit=1)
-                if user:
-                    external_userids.append(user.id)
-
-            # 🆕 OBTENER COMERCIALES DE EXTERNOS Y SUS USUARIOS
-            comerciales_de_externos_userids = []
-            if externos_supervisados_ids:
-                for externo in self.env['res.partner'].with_context(skip_custom_search=True).browse(externos_supervisados_ids):
-                    for comercial in externo.comerciales_asignados_ids:
-                        user = self.env['res.users'].with_context(skip_custom_search=True).search([('partner_id', '=', comercial.id)], limit=1)
-                        if user:
-                            comerciales_de_externos_userids.append(user.id)
-
-            # Combinar todos los usuarios
-            todos_user_ids = list(set([current_user.id] + commercial_userids + external_userids + comerciales_de_externos_userids))
-            _logger.info(f"- Total usuarios visibles: {len(todos_user_ids)}")
-
-            # 🆕 DOMINIO AMPLIADO PARA SUPERVISOR - ESTRUCTURA CORREGIDA
-            supervisor_domain = [
-                '|',  # OR principal
-                '|',  # Segundo nivel OR
-                # Opción 1: Oportunidades de usuarios permitidos
-                ('create_uid', 'in', todos_user_ids),
-                # Opción 2: Oportunidades asignadas al supervisor
-                ('user_id', '=', current_user.id),
-                # Opción 3: Oportunidades creadas por el supervisor
-                ('create_uid', '=', current_user.id)
-            ]
-
-            _logger.info(f"Aplicando dominio supervisor CRM ampliado en search_read")
-            return super(CrmLead, self).search_read(domain + supervisor_domain, fields, offset, limit, order)
-
-        # EXTERNO
-        if partner.external:
-            _logger.info(f"EXTERNO CRM search_read - Usuario {partner.name}")
-            
-            # 🆕 CRÍTICO: Usar skip_custom_search para evitar recursión
-            # Obtener IDs de comerciales de su equipo
-            comerciales_ids = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
-                ('worker', '=', True),
-                ('department', 'in', partner.department.ids),
-                ('internal_company_id', '=', partner.internal_company_id.id)
-            ]).ids
-            _logger.info(f"- Comerciales de su equipo: {len(comerciales_ids)}")
-
-            # Obtener usuarios de comerciales
-            commercial_userids = []
-            for comercial_id in comerciales_ids:
-                user = self.env['res.users'].with_context(skip_custom_search=True).search([('partner_id', '=', comercial_id)], limit=1)
-                if user:
-                    commercial_userids.append(user.id)
-
-            # Combinar usuarios
-            todos_user_ids = list(set([current_user.id] + commercial_userids))
-            _logger.info(f"- Total usuarios visibles: {len(todos_user_ids)}")
-
-            # 🆕 DOMINIO PARA EXTERNO
-            external_domain = [
-                '|',  # OR principal
-                '|',  # Segundo nivel OR
-                # Opción 1: Oportunidades de usuarios permitidos
-                ('create_uid', 'in', todos_user_ids),
-                # Opción 2: Oportunidades asignadas al externo
-                ('user_id', '=', current_user.id),
-                # Opción 3: Oportunidades creadas por el externo
-                ('create_uid', '=', current_user.id)
-            ]
-            
-            _logger.info(f"🔍 Aplicando dominio externo CRM en search_read")
-            return super(CrmLead, self).search_read(domain + external_domain, fields, offset, limit, order)
-
-        # OTRO ROL
-        _logger.info("Usuario sin rol específico en CRM")
-        return super(CrmLead, self).search_read(domain + [('create_uid', '=', current_user.id)], fields, offset, limit, order)
+        if not profile.is_admin:
+            with probe.stage('build'):
+                visibility_domain = self._get_visibility_domain(profile)
+        full_domain = domain + visibility_domain
+        with probe.stage('final'), nested_search(self.env, self._name, full_domain) as nested:
+            result = super(CrmLead, self).search_read(full_domain, fields, offset, limit, order)
+        probe.record(profile, visibility_domain, len(result), nested['branch'])
+        if nested['branch'] not in (None, 'admin'):
+            probe.capture_if_slow(nested['model'], nested['final_domain'], offset, limit, order, profile)
+        return result
 
 
 # 🆕 ELIMINAR la clase ResPartner del módulo CRM
-# Ya existe en custom_partner y causa recursión
\ No newline at end of file
+# Ya existe en custom_partner y causa recursión
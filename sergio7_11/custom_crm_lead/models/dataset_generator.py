@@ -0,0 +1,361 @@
+import csv
+import io
+import logging
+import random
+import time
+
+from odoo import models, fields, api
+from odoo.exceptions import AccessError, UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class DatasetGenerator(models.AbstractModel):
+    """
+    Generador reproducible de organigramas sintéticos para pruebas de carga.
+
+    Crea compañías, departamentos, supervisores, externos, comerciales (con
+    sus usuarios), clientes y oportunidades con productos. Los contactos,
+    relaciones y oportunidades se insertan con COPY por bloques; solo las
+    compañías, departamentos, productos y usuarios pasan por el ORM.
+
+    Como acción de servidor:
+        env['custom.dataset.generator'].generate(companies=12, scale=2)
+
+    Como script:
+        echo "env['custom.dataset.generator'].generate(companies=12, scale=2); env.cr.commit()" \\
+            | odoo-bin shell -d <bd>
+    """
+    _name = 'custom.dataset.generator'
+    _description = 'Generador de datos sintéticos para pruebas de carga'
+
+    # Volúmenes por compañía con scale=1
+    _BASE_VOLUMES = {
+        'departments': 5,
+        'externos': 3,
+        'comerciales': 25,
+        'clients': 250,
+        'leads': 400,
+    }
+
+    # Proporción de comerciales que dependen de un externo
+    _EXTERNO_COVERAGE = 0.5
+
+    # -------------------------
+    # API
+    # -------------------------
+
+    @api.model
+    def generate(self, companies=2, scale=1.0, skew=1.0, seed=42, batch_size=10000, prefix=None):
+        """
+        Genera el conjunto de datos y devuelve un resumen con los volúmenes
+        creados y el tiempo empleado.
+
+        :param companies: número de compañías
+        :param scale: multiplicador de los volúmenes por compañía
+        :param skew: exponente Zipf del reparto de comerciales por departamento
+            y de clientes/oportunidades por comercial (0 = uniforme)
+        :param seed: semilla; la misma semilla produce los mismos datos
+        :param batch_size: filas por bloque de COPY
+        :param prefix: prefijo de nombres y logins (por defecto GEN<seed>)
+        """
+        if not self.env.is_system():
+            raise AccessError("Solo los administradores pueden generar datos sintéticos.")
+
+        start = time.perf_counter()
+        rng = random.Random(seed)
+        prefix = prefix or f"GEN{seed}"
+        if self.env['res.company'].sudo().search_count([('name', '=like', f"{prefix} %")]):
+            raise UserError(f"Ya existen datos generados con el prefijo '{prefix}'. Usa otra semilla o prefijo.")
+
+        volumes = {key: max(1, int(round(value * scale))) for key, value in self._BASE_VOLUMES.items()}
+        _logger.info(f"🧪 Generando dataset '{prefix}': {companies} compañías, volúmenes {volumes}, skew={skew}")
+
+        self.env.flush_all()
+        plan = self._plan_organization(rng, prefix, companies, volumes, skew)
+        # Los clientes van después de los usuarios: su create_uid es el usuario
+        # de su comercial, que es por donde los ven supervisores y externos
+        staff = [partner for partner in plan['partners'] if self._is_staff(partner)]
+        clients = [partner for partner in plan['partners'] if not self._is_staff(partner)]
+        self._insert_partners(plan, staff, batch_size)
+        self._create_users(plan)
+        self._insert_partners(plan, clients, batch_size)
+        self._insert_leads(rng, plan, volumes, skew, batch_size)
+
+        self.env.invalidate_all()
+        self.env['res.partner.department']._refresh_counters(plan['department_ids'])
+
+        summary = {
+            'prefix': prefix,
+            'companies': len(plan['companies']),
+            'departments': len(plan['department_ids']),
+            'partners': len(plan['partners']),
+            'users': len(plan['user_by_partner']),
+            'leads': plan['lead_count'],
+            'seconds': round(time.perf_counter() - start, 2),
+        }
+        _logger.info(f"✅ Dataset generado: {summary}")
+        return summary
+
+    # -------------------------
+    # PLANIFICACIÓN
+    # -------------------------
+
+    def _zipf_weights(self, size, skew):
+        return [1.0 / (rank ** skew) for rank in range(1, size + 1)]
+
+    def _reserve_ids(self, table, count):
+        """Reserva count ids de la secuencia de la tabla."""
+        if not count:
+            return []
+        self.env.cr.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            [f"{table}_id_seq", count],
+        )
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _plan_organization(self, rng, prefix, company_count, volumes, skew):
+        """Crea compañías y departamentos con el ORM y planifica los contactos en memoria."""
+        Company = self.env['res.company'].sudo()
+        Department = self.env['res.partner.department'].sudo()
+
+        companies = Company.create([
+            {'name': f"{prefix} Empresa {index:02d}"} for index in range(1, company_count + 1)
+        ])
+
+        plan = {
+            'prefix': prefix,
+            'companies': companies,
+            'department_ids': [],
+            'department_names': {},
+            'partners': [],
+            'department_rel': [],
+            'supervisor_rel': [],
+            'comercial_rel': [],
+            'comerciales_by_company': {},
+            'clients_by_comercial': {},
+            'user_by_partner': {},
+            'lead_count': 0,
+        }
+
+        for company in companies:
+            root = Department.create({'name': f"{prefix} {company.id} Comercial", 'company_id': company.id})
+            children = Department.create([
+                {'name': f"{prefix} {company.id} Departamento {index}", 'parent_id': root.id, 'company_id': company.id}
+                for index in range(1, volumes['departments'] + 1)
+            ])
+            departments = root | children
+            plan['department_ids'] += departments.ids
+            plan['department_names'].update({department.id: department.name for department in departments})
+            self._plan_company(rng, plan, prefix, company, root, children, volumes, skew)
+        return plan
+
+    def _plan_company(self, rng, plan, prefix, company, root, children, volumes, skew):
+        partner_ids = iter(self._reserve_ids('res_partner', (
+            len(children) + 1 + volumes['externos'] + volumes['comerciales'] + volumes['clients']
+        )))
+
+        def add_partner(name, department_id, **values):
+            partner = dict(
+                id=next(partner_ids), name=name, company_id=company.id,
+                internal_company_id=company.id, worker=False, supervisor=False, external=False,
+                supervisor_externo_id=None, comercial_asignado_id=None,
+            )
+            partner.update(values)
+            plan['partners'].append(partner)
+            plan['department_rel'].append((partner['id'], department_id))
+            return partner
+
+        # Supervisores: uno por departamento (el de la raíz ve todo el subárbol)
+        supervisors = {}
+        for department in root | children:
+            supervisors[department.id] = add_partner(
+                f"{prefix} Supervisor {department.id}", department.id, supervisor=True,
+            )
+
+        # Externos: repartidos entre los departamentos hijos, cada uno con su supervisor
+        externos_by_department = {}
+        for index in range(volumes['externos']):
+            department = children[index % len(children)]
+            externo = add_partner(
+                f"{prefix} Externo {company.id}-{index + 1}", department.id, external=True, company_id=None,
+            )
+            externos_by_department.setdefault(department.id, []).append(externo)
+            plan['supervisor_rel'].append((externo['id'], supervisors[department.id]['id']))
+            if rng.random() < 0.3:
+                plan['supervisor_rel'].append((externo['id'], supervisors[root.id]['id']))
+
+        # Comerciales: reparto sesgado entre departamentos
+        comerciales = []
+        department_weights = self._zipf_weights(len(children), skew)
+        for index in range(volumes['comerciales']):
+            department = rng.choices(children, department_weights)[0]
+            externo = None
+            if department.id in externos_by_department and rng.random() < self._EXTERNO_COVERAGE:
+                externo = rng.choice(externos_by_department[department.id])
+            comercial = add_partner(
+                f"{prefix} Comercial {company.id}-{index + 1}", department.id, worker=True,
+                supervisor_externo_id=externo and externo['id'],
+            )
+            comercial['department_id'] = department.id
+            if externo:
+                plan['comercial_rel'].append((externo['id'], comercial['id']))
+            comerciales.append(comercial)
+        plan['comerciales_by_company'][company.id] = comerciales
+
+        # Clientes: reparto sesgado entre comerciales, con el departamento del comercial
+        comercial_weights = self._zipf_weights(len(comerciales), skew)
+        for index in range(volumes['clients']):
+            comercial = rng.choices(comerciales, comercial_weights)[0]
+            client = add_partner(
+                f"{prefix} Cliente {company.id}-{index + 1}", comercial['department_id'],
+                comercial_asignado_id=comercial['id'],
+            )
+            plan['clients_by_comercial'].setdefault(comercial['id'], []).append(client['id'])
+
+    # -------------------------
+    # INSERCIÓN MASIVA
+    # -------------------------
+
+    def _copy_rows(self, table, columns, rows, batch_size):
+        """Inserta rows en table con COPY, en bloques de batch_size filas."""
+        cr = self.env.cr
+        query = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        total = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if value is None else value for value in row])
+            total += 1
+            if total % batch_size == 0:
+                buffer.seek(0)
+                cr.copy_expert(query, buffer)
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+        if buffer.tell():
+            buffer.seek(0)
+            cr.copy_expert(query, buffer)
+        _logger.info(f"📥 COPY {table}: {total} filas")
+        return total
+
+    def _is_staff(self, partner):
+        return partner['worker'] or partner['supervisor'] or partner['external']
+
+    def _insert_partners(self, plan, partners, batch_size):
+        """
+        Inserta los contactos indicados y sus relaciones. El create_uid de un
+        cliente es el usuario de su comercial (si ya existe); el del resto, el
+        usuario actual.
+        """
+        now = fields.Datetime.now()
+        uid = self.env.uid
+        lang = self.env.lang or 'es_ES'
+        user_by_partner = plan['user_by_partner']
+        columns = [
+            'id', 'name', 'display_name', 'active', 'type', 'is_company', 'commercial_partner_id',
+            'partner_share', 'email', 'lang', 'company_id', 'internal_company_id',
+            'worker', 'supervisor', 'external', 'supervisor_externo_id', 'comercial_asignado_id',
+            'create_uid', 'create_date', 'write_uid', 'write_date',
+        ]
+        # Los referenciados (supervisores, externos, comerciales) van antes que los clientes
+        self._copy_rows('res_partner', columns, (
+            (
+                partner['id'], partner['name'], partner['name'], True, 'contact', False, partner['id'],
+                True, f"{partner['name'].lower().replace(' ', '.')}@example.com", lang,
+                partner['company_id'], partner['internal_company_id'],
+                partner['worker'], partner['supervisor'], partner['external'],
+                partner['supervisor_externo_id'], partner['comercial_asignado_id'],
+                user_by_partner.get(partner['comercial_asignado_id'], uid), now, uid, now,
+            )
+            for partner in partners
+        ), batch_size)
+
+        partner_ids = {partner['id'] for partner in partners}
+        Partner = self.env['res.partner']
+        department_field = Partner._fields['department']
+        self._copy_rows(
+            department_field.relation, [department_field.column1, department_field.column2],
+            [row for row in plan['department_rel'] if row[0] in partner_ids], batch_size,
+        )
+        supervisor_rel = [row for row in plan['supervisor_rel'] if row[0] in partner_ids]
+        comercial_rel = [row for row in plan['comercial_rel'] if row[0] in partner_ids]
+        self._copy_rows('supervisor_externo_rel', ['externo_id', 'supervisor_id'], supervisor_rel, batch_size)
+        self._copy_rows('supervisor_externo_comercial_rel', ['externo_id', 'comercial_id'], comercial_rel, batch_size)
+        self.env.invalidate_all()
+
+    def _create_users(self, plan):
+        """Crea en bloque (ORM) los usuarios de supervisores, externos y comerciales."""
+        salesman = self.env.ref('sales_team.group_sale_salesman', raise_if_not_found=False)
+        all_leads = self.env.ref('sales_team.group_sale_salesman_all_leads', raise_if_not_found=False)
+        vals_list = []
+        for partner in plan['partners']:
+            if not self._is_staff(partner):
+                continue
+            group = all_leads if partner['supervisor'] else salesman
+            company_id = partner['internal_company_id']
+            vals_list.append({
+                'login': f"{partner['name'].lower().replace(' ', '.')}@example.com",
+                'partner_id': partner['id'],
+                'company_id': company_id,
+                'company_ids': [(6, 0, [company_id])],
+                'groups_id': [(6, 0, group.ids)] if group else False,
+            })
+        users = self.env['res.users'].sudo().with_context(
+            no_reset_password=True,
+            tracking_disable=True,
+            mail_create_nosubscribe=True,
+            mail_create_nolog=True,
+        ).create(vals_list)
+        plan['user_by_partner'] = {user.partner_id.id: user.id for user in users}
+        _logger.info(f"👥 Usuarios creados: {len(users)}")
+
+    def _get_products(self, prefix):
+        Product = self.env['product.product'].sudo()
+        products = Product.search([('sale_ok', '=', True)], limit=50)
+        if len(products) < 5:
+            products |= Product.create([
+                {'name': f"{prefix} Producto {index}", 'list_price': 100.0 * index}
+                for index in range(1, 21)
+            ])
+        return [(product.id, product.list_price) for product in products]
+
+    def _insert_leads(self, rng, plan, volumes, skew, batch_size):
+        self.env.flush_all()
+        stages = self.env['crm.stage'].sudo().search([])
+        stage_choices = [(stage.id, 100.0 if stage.is_won else 10.0 * (index + 1)) for index, stage in enumerate(stages)]
+        products = self._get_products(plan['prefix'])
+        department_names = plan['department_names']
+
+        leads = []
+        lead_products = []
+        for company in plan['companies']:
+            comerciales = plan['comerciales_by_company'][company.id]
+            weights = self._zipf_weights(len(comerciales), skew)
+            lead_ids = self._reserve_ids('crm_lead', volumes['leads'])
+            for lead_id in lead_ids:
+                comercial = rng.choices(comerciales, weights)[0]
+                user_id = plan['user_by_partner'][comercial['id']]
+                clients = plan['clients_by_comercial'].get(comercial['id'])
+                stage_id, probability = rng.choice(stage_choices) if stage_choices else (None, 10.0)
+                chosen = rng.sample(products, k=min(len(products), rng.randint(1, 3))) if products else []
+                revenue = sum(price for _product_id, price in chosen)
+                leads.append((
+                    lead_id, f"Oportunidad {lead_id}", 'opportunity', True, user_id,
+                    rng.choice(clients) if clients else None, stage_id, company.id,
+                    revenue, revenue * probability / 100.0, probability, '0',
+                    department_names[comercial['department_id']],
+                    user_id, fields.Datetime.now(), user_id, fields.Datetime.now(),
+                ))
+                lead_products += [(lead_id, product_id) for product_id, _price in chosen]
+
+        columns = [
+            'id', 'name', 'type', 'active', 'user_id', 'partner_id', 'stage_id', 'company_id',
+            'expected_revenue', 'prorated_revenue', 'probability', 'priority', 'commercial_department',
+            'create_uid', 'create_date', 'write_uid', 'write_date',
+        ]
+        plan['lead_count'] = self._copy_rows('crm_lead', columns, leads, batch_size)
+        product_field = self.env['crm.lead']._fields['product_ids']
+        self._copy_rows(
+            product_field.relation, [product_field.column1, product_field.column2],
+            lead_products, batch_size,
+        )
@@ -0,0 +1,44 @@
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class LeadDepartment(models.Model):
+    _inherit = 'res.partner.department'
+
+    open_lead_count = fields.Integer(string='Oportunidades abiertas', readonly=True, default=0)
+    pipeline_value = fields.Float(string='Valor del pipeline', readonly=True, default=0.0)
+
+    @api.model
+    def _refresh_counters(self, department_ids=None):
+        super()._refresh_counters(department_ids)
+        relation = self.env['res.partner']._fields['department']
+        self.env['crm.lead'].flush_model(['active', 'user_id', 'stage_id', 'expected_revenue'])
+        self.env['res.partner'].flush_model(['department'])
+        where = "WHERE dep.id = ANY(%(ids)s)" if department_ids is not None else ""
+        # Una oportunidad cuenta en los departamentos del partner de su comercial
+        self.env.cr.execute(f"""
+            UPDATE res_partner_department d
+               SET open_lead_count = c.open_lead_count,
+                   pipeline_value = c.pipeline_value
+              FROM (SELECT dep.id AS department_id,
+                           COUNT(l.id) AS open_lead_count,
+                           COALESCE(SUM(l.expected_revenue), 0) AS pipeline_value
+                      FROM res_partner_department dep
+                 LEFT JOIN (SELECT r.{relation.column2} AS department_id, lead.id, lead.expected_revenue
+                              FROM crm_lead lead
+                              JOIN res_users u ON u.id = lead.user_id
+                              JOIN {relation.relation} r ON r.{relation.column1} = u.partner_id
+                         LEFT JOIN crm_stage s ON s.id = lead.stage_id
+                             WHERE lead.active
+                               AND s.is_won IS NOT TRUE) l ON l.department_id = dep.id
+                           {where}
+                  GROUP BY dep.id) c
+             WHERE d.id = c.department_id
+        """, {'ids': list(department_ids or [])})
+        _logger.info(f"🔢 Contadores de oportunidades actualizados: {self.env.cr.rowcount} departamentos")
+        self.invalidate_model(['open_lead_count', 'pipeline_value'])
+        # Mismos departamentos pendientes para el resumen del pipeline
+        self.env['crm.lead.pipeline.summary'].sudo()._refresh(department_ids)
+
@@ -0,0 +1,109 @@
+import logging
+
+from odoo import models, fields, api, tools
+from odoo.osv import expression
+
+_logger = logging.getLogger(__name__)
+
+
+class CrmLeadPipelineSummary(models.Model):
+    """
+    Pipeline abierto agregado por departamento, comercial y etapa.
+
+    La tabla se rellena por SQL desde res.partner.department._refresh_counters:
+    las oportunidades y los contactos ya marcan sus departamentos como
+    pendientes, y antes del commit solo se recalculan las filas de esos
+    departamentos. El cron nocturno de reconciliación la reconstruye entera.
+    """
+    _name = 'crm.lead.pipeline.summary'
+    _description = 'Resumen del pipeline por departamento'
+    _order = 'department_id, user_id, stage_id'
+    _log_access = False
+
+    department_id = fields.Many2one(
+        'res.partner.department', string='Departamento', readonly=True, index=True, ondelete='cascade',
+    )
+    company_id = fields.Many2one('res.company', string='Compañía', readonly=True, ondelete='cascade')
+    user_id = fields.Many2one('res.users', string='Comercial', readonly=True, index=True, ondelete='cascade')
+    stage_id = fields.Many2one('crm.stage', string='Etapa', readonly=True, ondelete='cascade')
+    lead_count = fields.Integer(string='Oportunidades', readonly=True, group_operator='sum')
+    expected_revenue = fields.Float(string='Ingreso esperado', readonly=True, group_operator='sum')
+    prorated_revenue = fields.Float(string='Ingreso ponderado', readonly=True, group_operator='sum')
+
+    def init(self):
+        # Filtro del supervisor: departamento (child_of) y compañía
+        tools.create_index(
+            self._cr,
+            'crm_lead_pipeline_summary_department_company_index',
+            self._table,
+            ['department_id', 'company_id'],
+        )
+
+    # -------------------------
+    # VISIBILIDAD
+    # -------------------------
+
+    @api.model
+    def _get_visibility_domain(self, profile):
+        """Filas visibles: el equipo del supervisor, sus comerciales para un externo, las propias para el resto."""
+        if profile.is_admin:
+            return []
+        if profile.is_supervisor:
+            return [
+                ('department_id', 'child_of', list(profile.department_ids)),
+                ('company_id', '=', profile.company_id),
+            ]
+        if profile.is_external:
+            return [('user_id.partner_id', 'in', list(profile.comercial_ids))]
+        return [('user_id', '=', profile.uid)]
+
+    @api.model
+    def _where_calc(self, domain, active_test=True):
+        # search y read_group (las vistas pivot y graph) pasan por aquí
+        if not self.env.su:
+            profile = self.env['res.partner']._get_acting_profile()
+            domain = expression.AND([domain or [], self._get_visibility_domain(profile)])
+        return super()._where_calc(domain, active_test)
+
+    # -------------------------
+    # RECÁLCULO
+    # -------------------------
+
+    @api.model
+    def _refresh(self, department_ids=None):
+        """Recalcula las filas de los departamentos indicados (todas si es None)."""
+        relation = self.env['res.partner']._fields['department']
+        self.env['crm.lead'].flush_model(['active', 'type', 'user_id', 'stage_id', 'expected_revenue', 'probability'])
+        self.env['res.partner'].flush_model(['department', 'internal_company_id'])
+        params = {'ids': list(department_ids or [])}
+        if department_ids is not None:
+            self.env.cr.execute(
+                "DELETE FROM crm_lead_pipeline_summary WHERE department_id = ANY(%(ids)s)", params,
+            )
+            where = f"AND r.{relation.column2} = ANY(%(ids)s)"
+        else:
+            self.env.cr.execute("DELETE FROM crm_lead_pipeline_summary")
+            where = ""
+        # Una oportunidad cuenta en los departamentos del partner de su comercial
+        self.env.cr.execute(f"""
+            INSERT INTO crm_lead_pipeline_summary (
+                department_id, company_id, user_id, stage_id,
+                lead_count, expected_revenue, prorated_revenue
+            )
+            SELECT r.{relation.column2}, p.internal_company_id, lead.user_id, lead.stage_id,
+                   COUNT(*),
+                   COALESCE(SUM(lead.expected_revenue), 0),
+                   COALESCE(SUM(lead.expected_revenue * COALESCE(lead.probability, 0) / 100.0), 0)
+              FROM crm_lead lead
+              JOIN res_users u ON u.id = lead.user_id
+              JOIN res_partner p ON p.id = u.partner_id
+              JOIN {relation.relation} r ON r.{relation.column1} = u.partner_id
+         LEFT JOIN crm_stage s ON s.id = lead.stage_id
+             WHERE lead.active
+               AND lead.type = 'opportunity'
+               AND s.is_won IS NOT TRUE
+                   {where}
+          GROUP BY r.{relation.column2}, p.internal_company_id, lead.user_id, lead.stage_id
+        """, params)
+        _logger.info(f"📈 Resumen del pipeline actualizado: {self.env.cr.rowcount} filas")
+        self.invalidate_model()
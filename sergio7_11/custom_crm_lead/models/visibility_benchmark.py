@@ -0,0 +1,260 @@
+import base64
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+
+from odoo import models, fields, api
+from odoo.exceptions import AccessError, UserError
+from odoo.addons.custom_partner.models.acting_profile import invalidate_acting_profiles
+
+_logger = logging.getLogger(__name__)
+
+
+class VisibilityBenchmark(models.AbstractModel):
+    """
+    Banco de pruebas de los filtros de visibilidad por rol.
+
+    Ejecuta search/search_read de res.partner y crm.lead como admin,
+    comercial, supervisor y externo, y mide tiempo, número de consultas SQL,
+    filas devueltas y pico de memoria. El resultado es JSON y se puede
+    comparar con una línea base guardada.
+
+    Desde odoo-bin shell:
+        Benchmark = env['custom.visibility.benchmark']
+        report = Benchmark.run_scales([0.5, 1, 2])
+        Benchmark._write_report(report, '/tmp/visibility.json')
+        Benchmark.save_baseline(report)      # la primera vez
+        Benchmark.run(compare_baseline=True)  # tras cada cambio
+    """
+    _name = 'custom.visibility.benchmark'
+    _description = 'Benchmark de filtros de visibilidad por rol'
+
+    # Nombre del adjunto con la línea base
+    _BASELINE_NAME = 'visibility_benchmark_baseline.json'
+
+    # Operaciones medidas: (modelo, método)
+    _OPERATIONS = (
+        ('res.partner', 'search'),
+        ('res.partner', 'search_read'),
+        ('crm.lead', 'search'),
+        ('crm.lead', 'search_read'),
+    )
+
+    # Campos leídos en search_read (los de las vistas de lista)
+    _READ_FIELDS = {
+        'res.partner': ['name', 'email', 'phone', 'department', 'comercial_asignado_id'],
+        'crm.lead': ['name', 'partner_id', 'user_id', 'stage_id', 'expected_revenue'],
+    }
+
+    # -------------------------
+    # API
+    # -------------------------
+
+    @api.model
+    def run(self, users=None, repeat=5, limit=None, dataset='current', compare_baseline=False):
+        """
+        Mide las operaciones para cada rol sobre los datos actuales.
+
+        :param users: {'admin': uid, 'worker': uid, ...}; por defecto se elige
+            el primer usuario de cada rol
+        :param repeat: ejecuciones por operación (se informa la mediana)
+        :param limit: límite de las búsquedas (None = sin límite)
+        :param dataset: etiqueta del conjunto de datos en el informe
+        :param compare_baseline: añade la comparación con la línea base guardada
+        """
+        self._check_access()
+        users = users or self._default_users()
+        report = {
+            'meta': self._report_meta(repeat, limit),
+            'results': self._measure(dataset, users, repeat, limit),
+        }
+        if compare_baseline:
+            report['comparison'] = self.compare(report)
+        return report
+
+    @api.model
+    def run_scales(self, scales=(0.5, 1.0, 2.0), companies=2, skew=1.0, seed=42, repeat=5, limit=None,
+                   compare_baseline=False):
+        """
+        Mide las operaciones con varios tamaños de dataset. Cada dataset se
+        genera con custom.dataset.generator dentro de un savepoint y se
+        descarta al terminar su medición.
+        """
+        self._check_access()
+        report = {'meta': self._report_meta(repeat, limit), 'results': []}
+        report['meta'].update({'scales': list(scales), 'companies': companies, 'skew': skew, 'seed': seed})
+        for scale in scales:
+            dataset = f"scale={scale}"
+            try:
+                with self.env.cr.savepoint():
+                    summary = self.env['custom.dataset.generator'].generate(
+                        companies=companies, scale=scale, skew=skew, seed=seed,
+                    )
+                    users = self._default_users(prefix=summary['prefix'])
+                    report['results'] += self._measure(dataset, users, repeat, limit)
+                    raise _DiscardDataset()
+            except _DiscardDataset:
+                pass
+            finally:
+                self.env.invalidate_all()
+                self.env.cr.cache.clear()
+        if compare_baseline:
+            report['comparison'] = self.compare(report)
+        return report
+
+    @api.model
+    def save_baseline(self, report):
+        """Guarda el informe como línea base (adjunto JSON)."""
+        self._check_access()
+        Attachment = self.env['ir.attachment'].sudo()
+        data = base64.b64encode(json.dumps(report, indent=2).encode())
+        baseline = Attachment.search([('res_model', '=', self._name), ('name', '=', self._BASELINE_NAME)], limit=1)
+        if baseline:
+            baseline.write({'datas': data})
+        else:
+            Attachment.create({
+                'name': self._BASELINE_NAME,
+                'res_model': self._name,
+                'mimetype': 'application/json',
+                'datas': data,
+            })
+        _logger.info(f"📌 Línea base del benchmark guardada ({len(report['results'])} mediciones)")
+        return True
+
+    @api.model
+    def load_baseline(self):
+        baseline = self.env['ir.attachment'].sudo().search(
+            [('res_model', '=', self._name), ('name', '=', self._BASELINE_NAME)], limit=1,
+        )
+        if not baseline:
+            return None
+        return json.loads(base64.b64decode(baseline.datas))
+
+    @api.model
+    def compare(self, report, baseline=None, tolerance=0.2):
+        """
+        Compara el informe con la línea base. Es regresión si el tiempo supera
+        la base en más de tolerance (20% por defecto) o si hay más consultas SQL.
+        """
+        baseline = baseline or self.load_baseline()
+        if not baseline:
+            raise UserError("No hay línea base guardada. Usa save_baseline() primero.")
+
+        def key(result):
+            return (result['dataset'], result['role'], result['model'], result['method'])
+
+        base_results = {key(result): result for result in baseline['results']}
+        comparison = {'regressions': [], 'improvements': [], 'missing': []}
+        for result in report['results']:
+            base = base_results.get(key(result))
+            if not base:
+                comparison['missing'].append(key(result))
+                continue
+            delta = {
+                'dataset': result['dataset'],
+                'role': result['role'],
+                'model': result['model'],
+                'method': result['method'],
+                'wall_ms': [base['wall_ms'], result['wall_ms']],
+                'queries': [base['queries'], result['queries']],
+            }
+            if result['wall_ms'] > base['wall_ms'] * (1 + tolerance) or result['queries'] > base['queries']:
+                comparison['regressions'].append(delta)
+            elif result['wall_ms'] < base['wall_ms'] * (1 - tolerance) or result['queries'] < base['queries']:
+                comparison['improvements'].append(delta)
+        _logger.info(
+            f"📊 Comparación con la línea base: {len(comparison['regressions'])} regresiones, "
+            f"{len(comparison['improvements'])} mejoras"
+        )
+        return comparison
+
+    # -------------------------
+    # MEDICIÓN
+    # -------------------------
+
+    def _check_access(self):
+        if not self.env.is_system():
+            raise AccessError("Solo los administradores pueden ejecutar el benchmark.")
+
+    def _report_meta(self, repeat, limit):
+        return {
+            'database': self.env.cr.dbname,
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'repeat': repeat,
+            'limit': limit,
+        }
+
+    def _default_users(self, prefix=None):
+        """Primer usuario de cada rol (opcionalmente, de los datos con ese prefijo)."""
+        Users = self.env['res.users'].sudo().with_context(skip_custom_search=True)
+        users = {'admin': self.env.ref('base.user_admin').id}
+        for role in ('worker', 'supervisor', 'external'):
+            domain = [(f'partner_id.{role}', '=', True)]
+            if prefix:
+                domain.append(('partner_id.name', '=like', f"{prefix} %"))
+            user = Users.search(domain, order='id', limit=1)
+            if user:
+                users[role] = user.id
+            else:
+                _logger.warning(f"⚠️ Benchmark: no hay usuario con rol {role}")
+        return users
+
+    def _call(self, model, method, limit):
+        if method == 'search':
+            return model.search([], limit=limit)
+        return model.search_read([], self._READ_FIELDS[model._name], limit=limit)
+
+    def _measure(self, dataset, users, repeat, limit):
+        cr = self.env.cr
+        results = []
+        for role, uid in users.items():
+            for model_name, method in self._OPERATIONS:
+                model = self.env[model_name].with_user(uid)
+                timings, queries = [], []
+                rows = 0
+                for _index in range(max(repeat, 1)):
+                    # Sin perfil cacheado: cada repetición mide también su construcción
+                    self.env.invalidate_all()
+                    invalidate_acting_profiles(self.env)
+                    queries_before = cr.sql_log_count
+                    start = time.perf_counter()
+                    records = self._call(model, method, limit)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    queries.append(cr.sql_log_count - queries_before)
+                    rows = len(records)
+                # Memoria en una pasada aparte: tracemalloc ralentiza cada asignación
+                self.env.invalidate_all()
+                invalidate_acting_profiles(self.env)
+                tracemalloc.start()
+                try:
+                    self._call(model, method, limit)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                result = {
+                    'dataset': dataset,
+                    'role': role,
+                    'model': model_name,
+                    'method': method,
+                    'wall_ms': round(statistics.median(timings), 2),
+                    'wall_ms_min': round(min(timings), 2),
+                    'queries': int(statistics.median(queries)),
+                    'rows': rows,
+                    'peak_kb': round(peak / 1024, 1),
+                }
+                _logger.info(f"⏱️ Benchmark {result}")
+                results.append(result)
+        return results
+
+    def _write_report(self, report, output):
+        """Escribe el informe JSON en output. Solo para odoo-bin shell: no es accesible por RPC."""
+        with open(output, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        _logger.info(f"💾 Informe del benchmark escrito en {output}")
+        return report
+
+
+class _DiscardDataset(Exception):
+    """Fuerza el rollback del savepoint con el dataset generado."""
@@ -0,0 +1,93 @@
+from odoo.tests import tagged
+
+from odoo.addons.custom_partner.tests.common import CustomPartnerOrgCase
+
+
+@tagged('post_install', '-at_install')
+class TestCrmLeadQueryCounts(CustomPartnerOrgCase):
+    """Las operaciones de oportunidades no deben crecer con el volumen de datos."""
+
+    _user_groups = 'base.group_user,base.group_partner_manager,sales_team.group_sale_salesman'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.product = None
+        super().setUpClass()
+
+    @classmethod
+    def _get_product(cls):
+        if not cls.product:
+            cls.product = cls.env['product.product'].create({'name': 'QC Producto', 'list_price': 100.0})
+        return cls.product
+
+    @classmethod
+    def _after_add_comercial(cls, user):
+        cls.env['crm.lead'].with_user(user).create([
+            {
+                'name': f"QC Oportunidad {user.login} {index}",
+                'type': 'opportunity',
+                'product_ids': [(6, 0, cls._get_product().ids)],
+            }
+            for index in range(2)
+        ])
+
+    # -------------------------
+    # BÚSQUEDAS CON VISIBILIDAD
+    # -------------------------
+
+    def _assert_visibility_searches_stable(self, user):
+        Lead = self.env['crm.lead'].with_user(user)
+        self.assertQueryCountStable(lambda: Lead.search([]))
+        self.assertQueryCountStable(lambda: Lead.search_read([], ['name', 'user_id', 'expected_revenue']))
+
+    def test_search_worker(self):
+        self._assert_visibility_searches_stable(self.worker_user)
+
+    def test_search_supervisor(self):
+        # Antes: una búsqueda de res.users por cada comercial y externo
+        self._assert_visibility_searches_stable(self.supervisor_user)
+
+    def test_search_externo(self):
+        self._assert_visibility_searches_stable(self.externo_user)
+
+    # -------------------------
+    # CREATE / WRITE CON ETIQUETAS
+    # -------------------------
+
+    def test_create_lead_with_department_tag(self):
+        Lead = self.env['crm.lead'].with_user(self.worker_user)
+        self.assertQueryCountStable(lambda: Lead.create({
+            'name': 'QC Oportunidad nueva',
+            'type': 'opportunity',
+            'product_ids': [(6, 0, self._get_product().ids)],
+        }))
+
+    def test_create_leads_batch_tags_once(self):
+        Lead = self.env['crm.lead'].with_user(self.worker_user)
+        vals = {'name': 'QC Oportunidad en bloque', 'type': 'opportunity'}
+        # El bloque pasa de 5 a 20 oportunidades al crecer la organización: el
+        # etiquetado se hace una vez por bloque, no por oportunidad
+        sizes = iter([5, 5, 20, 20])
+        self.assertQueryCountStable(lambda: Lead.create([vals] * next(sizes)))
+
+    def test_write_user_reassigns_tags(self):
+        lead = self.env['crm.lead'].with_user(self.worker_user).create({'name': 'QC Reasignada'})
+        users = iter([self.supervisor_user, self.worker_user] * 10)
+        self.assertQueryCountStable(lambda: lead.sudo().write({'user_id': next(users).id}))
+
+    # -------------------------
+    # INGRESO ESPERADO
+    # -------------------------
+
+    def test_expected_revenue_recompute(self):
+        product = self._get_product()
+        prices = iter(range(200, 240))
+
+        def change_price():
+            product.write({'list_price': next(prices)})
+            self.env['crm.lead'].flush_model(['expected_revenue'])
+
+        # Cada comercial nuevo añade oportunidades con este producto
+        self.assertQueryCountStable(change_price)
+        lead = self.env['crm.lead'].search([('product_ids', 'in', product.ids)], limit=1)
+        self.assertEqual(lead.expected_revenue, product.list_price)
@@ -1,12 +1,14 @@
 {
     'name': 'Partner Departments',
-    'version': '16.0.1.0.0',
+    'version': '16.0.1.4.0',
     'summary': 'Modelo y vistas de departamentos para comerciales',
     'description': 'Permite gestionar departamentos y asignarlos a contactos',
     'category': 'Tools',
     'depends': ['base'],
     'data': [
         'security/ir.model.access.csv',
+        'security/multi_company_security.xml',
+        'data/ir_cron.xml',
         'views/department_views.xml',
     ],
     'license': 'LGPL-3',
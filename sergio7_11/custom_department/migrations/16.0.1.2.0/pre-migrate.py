@@ -0,0 +1,8 @@
+def migrate(cr, version):
+    if not version:
+        return
+    # La unicidad del nombre pasa a ser por compañía (name_company_uniq)
+    cr.execute("""
+        ALTER TABLE res_partner_department
+        DROP CONSTRAINT IF EXISTS res_partner_department_name_uniq
+    """)
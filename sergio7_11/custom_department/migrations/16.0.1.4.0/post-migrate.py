@@ -0,0 +1,17 @@
+# Códigos estables para los departamentos que el código buscaba por nombre
+DEPARTMENT_CODES = {
+    'medico': ('médico', 'medico'),
+    'estetica': ('estética', 'estetica'),
+}
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    for code, names in DEPARTMENT_CODES.items():
+        cr.execute("""
+            UPDATE res_partner_department
+               SET code = %s
+             WHERE code IS NULL
+               AND lower(trim(name)) IN %s
+        """, [code, names])
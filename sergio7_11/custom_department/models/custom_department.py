@@ -1,13 +1,212 @@
-from odoo import models, fields
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError
+import logging
+
+_logger = logging.getLogger(__name__)
 
 class Department(models.Model):
     _name = 'res.partner.department'
     _description = 'Departamentos de Comerciales'
-    _order = 'name'
+    _parent_name = 'parent_id'
+    _parent_store = True
+    _rec_name = 'complete_name'
+    _order = 'complete_name'
+    _check_company_auto = True
 
     name = fields.Char(string='Nombre', required=True)
+    code = fields.Char(
+        string='Código',
+        index=True,
+        copy=False,
+        help='Código estable del departamento (p. ej. medico, estetica) para localizarlo aunque se renombre'
+    )
+    complete_name = fields.Char(
+        string='Nombre completo',
+        compute='_compute_complete_name',
+        recursive=True,
+        store=True
+    )
+    parent_id = fields.Many2one(
+        'res.partner.department',
+        string='Departamento padre',
+        index=True,
+        ondelete='restrict',
+        check_company=True
+    )
+    parent_path = fields.Char(index=True, unaccent=False)
+    child_ids = fields.One2many('res.partner.department', 'parent_id', string='Subdepartamentos')
     active = fields.Boolean(string='Activo', default=True)
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        index=True,
+        help='Compañía del departamento. Vacío: departamento compartido entre compañías'
+    )
 
     _sql_constraints = [
-        ('name_uniq', 'unique(name)', 'El nombre del departamento debe ser único!'),
-    ]
\ No newline at end of file
+        ('name_company_uniq', 'unique(name, company_id)', 'El nombre del departamento debe ser único en cada compañía!'),
+        ('code_company_uniq', 'unique(code, company_id)', 'El código del departamento debe ser único en cada compañía!'),
+    ]
+
+    def init(self):
+        self._cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {self._CODE_LOOKUP_SEQUENCE}")
+        # Índice para las búsquedas child_of (parent_path LIKE 'x/y/%')
+        tools.create_index(
+            self._cr,
+            'res_partner_department_parent_path_prefix_index',
+            self._table,
+            ['parent_path text_pattern_ops'],
+        )
+        # unique(name, company_id) no cubre los departamentos compartidos (company_id NULL)
+        self._cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS res_partner_department_shared_name_uniq
+                ON res_partner_department (name)
+             WHERE company_id IS NULL
+        """)
+        self._cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS res_partner_department_shared_code_uniq
+                ON res_partner_department (code)
+             WHERE company_id IS NULL AND code IS NOT NULL
+        """)
+
+    @api.depends('name', 'parent_id.complete_name')
+    def _compute_complete_name(self):
+        for department in self:
+            if department.parent_id:
+                department.complete_name = f"{department.parent_id.complete_name} / {department.name}"
+            else:
+                department.complete_name = department.name
+
+    @api.constrains('parent_id')
+    def _check_department_recursion(self):
+        if not self._check_recursion():
+            raise ValidationError('No se puede crear una jerarquía de departamentos recursiva.')
+
+    # -------------------------
+    # BÚSQUEDA POR CÓDIGO
+    # -------------------------
+
+    # Campos que cambian el resultado de _department_ids_by_code
+    _CODE_LOOKUP_FIELDS = ('code', 'active', 'parent_id')
+    # Secuencia con la versión de los códigos: forma parte de la clave de la
+    # caché, así que cambiarla invalida solo esta búsqueda en todos los workers
+    _CODE_LOOKUP_SEQUENCE = 'res_partner_department_code_lookup_seq'
+    # Claves en cr.cache (versión leída) y cr.postcommit.data (incremento pendiente)
+    _CODE_LOOKUP_VERSION_KEY = 'custom_department.code_lookup_version'
+    _CODE_LOOKUP_BUMP_KEY = 'custom_department.code_lookup_bump'
+
+    @api.model
+    def _department_ids_by_code(self, code):
+        """
+        Ids de los departamentos con ese código y de todos sus
+        subdepartamentos, en cualquier compañía. Con active_test (por
+        defecto) solo los activos. Se cachea por proceso.
+        """
+        active_test = self.env.context.get('active_test', True)
+        # Con cambios sin confirmar en este cursor, la versión aún no ha cambiado
+        if self._CODE_LOOKUP_BUMP_KEY in self.env.cr.postcommit.data:
+            return self._search_department_ids_by_code(code, active_test)
+        return self._cached_department_ids_by_code(code, active_test, self._code_lookup_version())
+
+    @api.model
+    @tools.ormcache('code', 'active_test', 'version')
+    def _cached_department_ids_by_code(self, code, active_test, version):
+        return self._search_department_ids_by_code(code, active_test)
+
+    @api.model
+    def _search_department_ids_by_code(self, code, active_test):
+        Department = self.sudo().with_context(active_test=active_test)
+        departments = Department.search([('code', '=', code)])
+        if not departments:
+            return ()
+        return tuple(Department.search([('id', 'child_of', departments.ids)]).ids)
+
+    @api.model
+    def _code_lookup_version(self):
+        """Versión de los códigos, leída una vez por cursor."""
+        cache = self.env.cr.cache
+        if self._CODE_LOOKUP_VERSION_KEY not in cache:
+            self.env.cr.execute(f"SELECT last_value FROM {self._CODE_LOOKUP_SEQUENCE}")
+            cache[self._CODE_LOOKUP_VERSION_KEY] = self.env.cr.fetchone()[0]
+        return cache[self._CODE_LOOKUP_VERSION_KEY]
+
+    def _bump_code_lookup_version(self):
+        """Incrementa la versión tras el commit, para no cachear datos sin confirmar."""
+        cr = self.env.cr
+        data = cr.postcommit.data
+        if self._CODE_LOOKUP_BUMP_KEY in data:
+            return
+        data[self._CODE_LOOKUP_BUMP_KEY] = True
+        cr.cache.pop(self._CODE_LOOKUP_VERSION_KEY, None)
+        registry = self.env.registry
+        sequence = self._CODE_LOOKUP_SEQUENCE
+
+        def bump():
+            data.pop(self._CODE_LOOKUP_BUMP_KEY, None)
+            try:
+                with registry.cursor() as bump_cr:
+                    bump_cr.execute(f"SELECT nextval('{sequence}')")
+            except Exception as e:
+                _logger.warning(f"⚠️ No se pudo incrementar la versión de los códigos de departamento: {e}")
+
+        cr.postcommit.add(bump)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        departments = super().create(vals_list)
+        self._bump_code_lookup_version()
+        return departments
+
+    def write(self, vals):
+        result = super().write(vals)
+        if any(fname in vals for fname in self._CODE_LOOKUP_FIELDS):
+            self._bump_code_lookup_version()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self._bump_code_lookup_version()
+        return result
+
+    # -------------------------
+    # CONTADORES ALMACENADOS
+    # -------------------------
+
+    # Clave en cr.precommit.data con los departamentos pendientes de recalcular
+    _COUNTERS_DIRTY_KEY = 'custom_department.dirty_counters'
+
+    @api.model
+    def _mark_counters_dirty(self, department_ids):
+        """
+        Marca departamentos cuyos contadores han cambiado. Se recalculan
+        todos juntos, una sola vez, justo antes del commit.
+        """
+        department_ids = set(department_ids)
+        if not department_ids:
+            return
+        data = self.env.cr.precommit.data
+        if self._COUNTERS_DIRTY_KEY not in data:
+            data[self._COUNTERS_DIRTY_KEY] = set()
+            self.env.cr.precommit.add(self._refresh_dirty_counters)
+        data[self._COUNTERS_DIRTY_KEY].update(department_ids)
+
+    @api.model
+    def _refresh_dirty_counters(self):
+        """Recalcula los contadores de los departamentos marcados en la transacción."""
+        department_ids = self.env.cr.precommit.data.pop(self._COUNTERS_DIRTY_KEY, set())
+        if department_ids:
+            self._refresh_counters(sorted(department_ids))
+
+    @api.model
+    def _refresh_counters(self, department_ids=None):
+        """
+        Recalcula con SQL los contadores de los departamentos indicados
+        (None = todos). Los módulos que añaden contadores extienden este método.
+        """
+        return
+
+    @api.model
+    def _cron_reconcile_counters(self):
+        """Tarea nocturna: recalcula los contadores de todos los departamentos."""
+        _logger.info("🔢 Reconciliando contadores de departamentos")
+        self._refresh_counters()
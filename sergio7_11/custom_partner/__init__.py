@@ -1 +1,4 @@
-from . import models
\ No newline at end of file
+from . import controllers
+from . import models
+from . import wizard
+from .hooks import pre_init_hook
@@ -1,6 +1,6 @@
 {
     'name': 'Extends Partner',
-    'version': '16.0.1.1.0',  # Incrementamos la versión
+    'version': '16.0.1.3.0',  # Incrementamos la versión
     'summary': 'Extends partner for a many2many tags products',
     'description': 'Extends partner for a many2many tags products',
     'category': 'Tools',
@@ -9,7 +9,13 @@
         'security/ir.model.access.csv',
         'security/partner_security.xml',
         'views/customer_partner.xml',
+        'views/partner_onboarding_views.xml',
+        'views/department_views.xml',
+        'views/perf_sample_views.xml',
+        'views/perf_slow_search_views.xml',
+        'views/perf_profile_views.xml',
     ],
+    'pre_init_hook': 'pre_init_hook',
     'license': 'LGPL-3',
     'installable': True,
     'auto_install': False,
@@ -0,0 +1,32 @@
+import hmac
+
+from odoo import http
+from odoo.http import request
+
+from ..models import perf_metrics
+
+
+class PartnerMetricsController(http.Controller):
+
+    @http.route('/custom_partner/metrics', type='http', auth='none', methods=['GET'], csrf=False, save_session=False)
+    def metrics(self, token=None, **kwargs):
+        """
+        Métricas en formato de exposición de Prometheus. Requiere el token del
+        parámetro custom_partner.metrics_token (cabecera Authorization: Bearer
+        o ?token=); sin token configurado el endpoint no existe.
+        """
+        expected = request.env['ir.config_parameter'].sudo().get_param('custom_partner.metrics_token')
+        if not expected:
+            return request.not_found()
+        authorization = request.httprequest.headers.get('Authorization', '')
+        provided = authorization[7:] if authorization.startswith('Bearer ') else (token or '')
+        if not hmac.compare_digest(provided, expected):
+            return request.make_response('Unauthorized\n', status=401, headers=[('Content-Type', 'text/plain')])
+
+        # Volcar lo pendiente de este worker antes de leer la tabla compartida
+        perf_metrics.flush(request.env.registry)
+        body = perf_metrics.render(request.env.cr)
+        return request.make_response(body, headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+        ])
@@ -0,0 +1,55 @@
+import json
+import os
+import statistics
+
+from odoo import http
+from odoo.http import request
+from odoo.tools import config
+
+from ..models.perf_probe import clear_samples, get_samples
+
+
+class PartnerPerfController(http.Controller):
+
+    @http.route('/custom_partner/perf', type='http', auth='user', methods=['GET'])
+    def perf_samples(self, limit=200, reset=None, **kwargs):
+        """
+        Muestras de la instrumentación de visibilidad de este worker (solo en
+        modo debug y para administradores). ?reset=1 vacía el buffer.
+        """
+        if not (request.session.debug or config.get('dev_mode')) or not request.env.user.has_group('base.group_system'):
+            return request.not_found()
+
+        samples = get_samples(int(limit))
+        if reset:
+            clear_samples()
+        payload = {
+            'pid': os.getpid(),
+            'count': len(samples),
+            'summary': self._summarize(samples),
+            'samples': samples,
+        }
+        return request.make_response(
+            json.dumps(payload, indent=2),
+            headers=[('Content-Type', 'application/json'), ('Cache-Control', 'no-store')],
+        )
+
+    def _summarize(self, samples):
+        """Medias y máximos por (modelo, método, rama)."""
+        groups = {}
+        for sample in samples:
+            groups.setdefault((sample['model'], sample['method'], sample['branch']), []).append(sample)
+        return [
+            {
+                'model': model,
+                'method': method,
+                'branch': branch,
+                'calls': len(group),
+                'build_ms_avg': round(statistics.mean(s['build_ms'] for s in group), 3),
+                'final_ms_avg': round(statistics.mean(s['final_ms'] for s in group), 3),
+                'final_ms_max': max(s['final_ms'] for s in group),
+                'subqueries_avg': round(statistics.mean(s['subqueries'] for s in group), 1),
+                'id_list_max': max(s['id_list_max'] for s in group),
+            }
+            for (model, method, branch), group in sorted(groups.items())
+        ]
@@ -0,0 +1,43 @@
+import logging
+_logger = logging.getLogger(__name__)
+
+from odoo.tools.sql import column_exists
+
+
+def cleanup_partner_invariants(cr):
+    """
+    Corrige en bloque los contactos que incumplen los CHECK de res_partner
+    (un único rol y roles solo en individuos) antes de que se creen las
+    constraints. Las empresas sin rol, como las de res.company, no se tocan.
+    """
+    if not all(column_exists(cr, 'res_partner', column) for column in ('worker', 'supervisor', 'external')):
+        return
+
+    cr.execute("""
+        UPDATE res_partner
+           SET is_company = false
+         WHERE is_company IS TRUE
+           AND (worker IS TRUE OR supervisor IS TRUE OR external IS TRUE)
+    """)
+    _logger.info(f"🧹 Contactos con rol convertidos a individuo: {cr.rowcount}")
+
+    # Misma prioridad que en create: Comercial > Supervisor > Externo
+    cr.execute("""
+        UPDATE res_partner
+           SET supervisor = false, external = false
+         WHERE worker IS TRUE
+           AND (supervisor IS TRUE OR external IS TRUE)
+    """)
+    cleaned = cr.rowcount
+    cr.execute("""
+        UPDATE res_partner
+           SET external = false
+         WHERE supervisor IS TRUE
+           AND external IS TRUE
+    """)
+    cleaned += cr.rowcount
+    _logger.info(f"🧹 Contactos con varios roles corregidos: {cleaned}")
+
+
+def pre_init_hook(cr):
+    cleanup_partner_invariants(cr)
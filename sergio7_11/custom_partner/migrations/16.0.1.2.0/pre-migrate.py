@@ -0,0 +1,7 @@
+from odoo.addons.custom_partner.hooks import cleanup_partner_invariants
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    cleanup_partner_invariants(cr)
@@ -1 +1,7 @@
-from . import custom_partner
\ No newline at end of file
+from . import custom_partner
+from . import ir_http
+from . import partner_department
+from . import perf_metric
+from . import perf_profile
+from . import perf_sample
+from . import perf_slow_search
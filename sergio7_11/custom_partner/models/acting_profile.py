@@ -0,0 +1,109 @@
+import logging
+_logger = logging.getLogger(__name__)
+
+# Clave bajo la que se guardan los perfiles en la caché del cursor
+PROFILE_CACHE_KEY = 'custom_partner.acting_profile'
+
+# Campos del partner que, al modificarse, invalidan los perfiles cacheados
+PROFILE_FIELDS = (
+    'worker', 'supervisor', 'external', 'department', 'internal_company_id',
+    'comerciales_asignados_ids', 'supervisores_ids', 'name',
+)
+
+
+class ActingProfile:
+    """
+    Perfil inmutable del usuario que ejecuta la petición.
+
+    Reúne en un solo objeto el rol y los datos del partner del usuario que
+    consultan las reglas de negocio de contactos y oportunidades, para no
+    releerlos en cada hook.
+    """
+
+    __slots__ = (
+        'uid', 'partner_id', 'partner_name', 'is_admin', 'role',
+        'department_ids', 'company_id', 'comercial_ids', 'supervisor_ids',
+    )
+
+    def __init__(self, uid, partner_id, partner_name, is_admin, role,
+                 department_ids, company_id, comercial_ids, supervisor_ids):
+        set_ = object.__setattr__
+        set_(self, 'uid', uid)
+        set_(self, 'partner_id', partner_id)
+        set_(self, 'partner_name', partner_name)
+        set_(self, 'is_admin', is_admin)
+        set_(self, 'role', role)
+        set_(self, 'department_ids', tuple(department_ids))
+        set_(self, 'company_id', company_id)
+        set_(self, 'comercial_ids', tuple(comercial_ids))
+        set_(self, 'supervisor_ids', tuple(supervisor_ids))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ActingProfile es inmutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("ActingProfile es inmutable")
+
+    def __repr__(self):
+        return (
+            f"ActingProfile(uid={self.uid}, partner_id={self.partner_id}, role={self.role}, "
+            f"departments={list(self.department_ids)}, company={self.company_id})"
+        )
+
+    @property
+    def is_worker(self):
+        return self.role == 'worker'
+
+    @property
+    def is_supervisor(self):
+        return self.role == 'supervisor'
+
+    @property
+    def is_external(self):
+        return self.role == 'external'
+
+
+def get_acting_profile(env):
+    """Devuelve el perfil del usuario de env, construyéndolo una vez por cursor."""
+    profiles = env.cr.cache.setdefault(PROFILE_CACHE_KEY, {})
+    key = (env.uid, tuple(env.companies.ids))
+    profile = profiles.get(key)
+    if profile is None:
+        profile = profiles[key] = _build_acting_profile(env)
+    return profile
+
+
+def invalidate_acting_profiles(env):
+    """Descarta los perfiles cacheados en el cursor actual."""
+    env.cr.cache.pop(PROFILE_CACHE_KEY, None)
+
+
+def _build_acting_profile(env):
+    user = env.user
+    partner = user.partner_id.sudo()
+    # Solo los departamentos de las compañías activas (y los compartidos)
+    company_ids = env.companies.ids
+    departments = partner.department.filtered(
+        lambda department: not department.company_id or department.company_id.id in company_ids
+    )
+    if partner.worker:
+        role = 'worker'
+    elif partner.supervisor:
+        role = 'supervisor'
+    elif partner.external:
+        role = 'external'
+    else:
+        role = False
+    profile = ActingProfile(
+        uid=user.id,
+        partner_id=partner.id,
+        partner_name=partner.name,
+        is_admin=user._is_admin(),
+        role=role,
+        department_ids=departments.ids,
+        company_id=partner.internal_company_id.id,
+        comercial_ids=partner.comerciales_asignados_ids.ids,
+        supervisor_ids=partner.supervisores_ids.ids,
+    )
+    _logger.info(f"👤 Perfil de usuario construido: {profile}")
+    return profile
@@ -1,8 +1,17 @@
 import logging
+import random
+import time
 _logger = logging.getLogger(__name__)
 
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+
+from .acting_profile import PROFILE_FIELDS, get_acting_profile, invalidate_acting_profiles
+from .perf_probe import VisibilityProbe, claim_nested_search, nested_search
+from . import perf_metrics
+from . import search_panel_cache
+
 class ResPartner(models.Model):
     _inherit = 'res.partner'
 
@@ -94,170 +103,228 @@ class ResPartner(models.Model):
     # CONSTRAINTS Y VALIDACIONES
     # -------------------------
 
-    @api.constrains('worker', 'supervisor', 'external')
-    def _check_single_role(self):
-        """Validar que solo tenga un rol activo, pero permitir transiciones"""
-        for record in self:
-            # Solo validar si el registro ya está en la base de datos
-            if record.id:
-                active_roles = [record.worker, record.supervisor, record.external]
-                if sum(active_roles) > 1:
-                    raise ValidationError(
-                        "❌ ERROR: Solo puede seleccionar un rol a la vez.\n"
-                        "Un contacto no puede ser Comercial, Supervisor y Externo simultáneamente."
-                    )
+    # Invariantes garantizados por PostgreSQL (ver hooks.cleanup_partner_invariants)
+    _sql_constraints = [
+        ('single_role_check',
+         'CHECK(COALESCE(worker, false)::int + COALESCE(supervisor, false)::int'
+         ' + COALESCE(external, false)::int <= 1)',
+         "❌ ERROR: Solo puede seleccionar un rol a la vez.\n"
+         "Un contacto no puede ser Comercial, Supervisor y Externo simultáneamente."),
+        # Las empresas sin rol (las de res.company, por ejemplo) quedan fuera
+        ('individual_only_check',
+         'CHECK(is_company IS NOT TRUE OR NOT (COALESCE(worker, false)'
+         ' OR COALESCE(supervisor, false) OR COALESCE(external, false)))',
+         "❌ ERROR: Solo se permiten contactos de tipo 'Individuo'.\n"
+         "Un Comercial, Supervisor o Externo no puede ser de tipo 'Empresa'."),
+    ]
 
-    
     @api.constrains('external', 'supervisores_ids')
     def _check_supervisor_externo_obligatorio(self):
-        for rec in self:
-            if rec.external and not rec.supervisores_ids:
-                raise ValidationError("Debes asignar al menos un supervisor a este supervisor externo.")
-            
-            
-    @api.constrains('external', 'comerciales_asignados_ids')
-    def _check_comerciales_externo(self):
-        """Validar que los comerciales asignados a un externo sean válidos"""
-        for rec in self:
-            if rec.external and rec.comerciales_asignados_ids:
-                # Verificar que los asignados sean realmente comerciales
-                no_workers = rec.comerciales_asignados_ids.filtered(lambda c: not c.worker)
-                if no_workers:
-                    raise ValidationError(
-                        f"Solo se pueden asignar comerciales. Los siguientes contactos no son comerciales: "
-                        f"{', '.join(no_workers.mapped('name'))}"
-                    )
-    
-    
-    @api.constrains('external', 'comerciales_asignados_ids')
-    def _check_comerciales_mismo_departamento(self):
-        for rec in self:
-            if rec.external and rec.comerciales_asignados_ids:
-                departamentos_externo = rec.department
-                comerciales_departamento_diferente = rec.comerciales_asignados_ids.filtered(
-                    lambda c: not c.department or not any(dept in departamentos_externo for dept in c.department)
-                )
-                if comerciales_departamento_diferente:
-                    raise ValidationError(
-                        f"❌ ERROR: Solo puedes asignar comerciales del mismo departamento.\n"
-                        f"Los comerciales {comerciales_departamento_diferente.mapped('name')} "
-                        f"no pertenecen a tu departamento."
-                    )
-                    
+        self._raise_or_defer('_get_supervisor_externo_violations')
+
+    def _get_supervisor_externo_violations(self):
+        return [
+            (rec.id, "Debes asignar al menos un supervisor a este supervisor externo.")
+            for rec in self
+            if rec.external and not rec.supervisores_ids
+        ]
 
     @api.constrains('external', 'comerciales_asignados_ids')
-    def _check_comerciales_mismo_departamento_externo(self):
-        """Validar que los comerciales asignados a un externo sean de su mismo departamento"""
-        for rec in self:
-            if rec.external and rec.comerciales_asignados_ids:
-                # El externo no tiene departamento, así que verificamos los departamentos de los supervisores
-                departamentos_supervisores = rec.supervisores_ids.mapped('department')
-                if not departamentos_supervisores:
-                    raise ValidationError(
-                        "El externo debe tener al menos un supervisor con departamento asignado "
-                        "para poder asignar comerciales."
-                    )
-                
-                # Verificar que cada comercial tenga al menos un departamento en común con los supervisores
-                for comercial in rec.comerciales_asignados_ids:
-                    if not comercial.department:
-                        raise ValidationError(
-                            f"El comercial {comercial.name} no tiene departamento asignado."
-                        )
-                    
-                    departamentos_comercial = comercial.department
-                    departamentos_supervisores_flat = [dept for sublist in departamentos_supervisores for dept in sublist]
-                    
-                    if not any(dept in departamentos_supervisores_flat for dept in departamentos_comercial):
-                        raise ValidationError(
-                            f"El comercial {comercial.name} no pertenece a los departamentos "
-                            f"de los supervisores asignados al externo."
-                        )
+    def _check_comerciales_asignados_externo(self):
+        """Validar que los comerciales asignados a un externo sean comerciales de su mismo departamento y empresa"""
+        self._raise_or_defer('_get_comerciales_asignados_violations')
+
+    def _get_comerciales_asignados_violations(self):
+        """
+        Devuelve [(id externo, mensaje)] con todos los comerciales mal asignados.
+
+        Carga en una sola consulta los comerciales de todos los externos, con
+        sus departamentos y empresa, y compara conjuntos en Python.
+        """
+        externos = self.filtered(lambda rec: rec.external and rec.comerciales_asignados_ids)
+        if not externos:
+            return []
+
+        department_field = self._fields['department']
+        self.flush_model(['name', 'worker', 'internal_company_id', 'department', 'comerciales_asignados_ids'])
+        self.env.cr.execute(f"""
+            SELECT rel.externo_id, c.id, c.name, c.worker, c.internal_company_id,
+                   ARRAY(SELECT d.{department_field.column2}
+                           FROM {department_field.relation} d
+                          WHERE d.{department_field.column1} = c.id)
+              FROM supervisor_externo_comercial_rel rel
+              JOIN res_partner c ON c.id = rel.comercial_id
+             WHERE rel.externo_id = ANY(%s)
+             ORDER BY rel.externo_id, c.name
+        """, (externos.ids,))
+        rows = self.env.cr.fetchall()
+
+        externos_by_id = {externo.id: externo for externo in externos}
+        externo_departments = {externo.id: set(externo.department.ids) for externo in externos}
+        violations = []
+        for externo_id, _comercial_id, comercial_name, is_worker, company_id, department_ids in rows:
+            externo = externos_by_id[externo_id]
+            if not is_worker:
+                violations.append((externo_id, f"{comercial_name} no es un comercial."))
+                continue
+            if not department_ids:
+                violations.append((externo_id, f"El comercial {comercial_name} no tiene departamento asignado."))
+                continue
+            if not company_id:
+                violations.append((externo_id, f"El comercial {comercial_name} no tiene empresa asignada."))
+                continue
+            if not externo_departments[externo_id].intersection(department_ids):
+                violations.append((
+                    externo_id,
+                    f"El comercial {comercial_name} no pertenece a los departamentos del externo {externo.name}."
+                ))
+            if company_id != externo.internal_company_id.id:
+                violations.append((
+                    externo_id,
+                    f"El comercial {comercial_name} no pertenece a la misma empresa que el externo {externo.name}."
+                ))
+        return violations
 
     @api.constrains('worker', 'supervisor_externo_id')
     def _check_comercial_tiene_departamento(self):
         """Validar que el comercial tenga departamento si tiene supervisor externo"""
-        for rec in self:
-            if rec.worker and rec.supervisor_externo_id and not rec.department:
-                raise ValidationError(
-                    "El comercial debe tener departamento asignado para poder tener un supervisor externo."
-                )
-               
-                
+        self._raise_or_defer('_get_comercial_sin_departamento_violations')
+
+    def _get_comercial_sin_departamento_violations(self):
+        return [
+            (rec.id, "El comercial debe tener departamento asignado para poder tener un supervisor externo.")
+            for rec in self
+            if rec.worker and rec.supervisor_externo_id and not rec.department
+        ]
+
     @api.constrains('comercial_asignado_id', 'department', 'internal_company_id')
     def _check_comercial_asignado_same_department_company(self):
         """Validar que el comercial asignado sea del mismo departamento y empresa"""
+        self._raise_or_defer('_get_comercial_asignado_violations')
+
+    def _get_comercial_asignado_violations(self):
+        violations = []
         for record in self:
-            if record.comercial_asignado_id:
-                comercial = record.comercial_asignado_id
-                
-                # Verificar que sea comercial
-                if not comercial.worker:
-                    raise ValidationError(
-                        f"Solo puedes asignar usuarios con rol 'Comercial'. "
-                        f"{comercial.name} no es un comercial."
-                    )
-                
-                # Verificar misma empresa
-                if record.internal_company_id and comercial.internal_company_id:
-                    if record.internal_company_id != comercial.internal_company_id:
-                        raise ValidationError(
-                            f"El comercial asignado debe ser de la misma empresa.\n"
-                            f"Cliente: {record.internal_company_id.name}\n"
-                            f"Comercial: {comercial.internal_company_id.name}"
-                        )
-                
-                # Verificar mismo departamento (al menos uno en común)
-                if record.department and comercial.department:
-                    departamentos_comunes = record.department & comercial.department
-                    if not departamentos_comunes:
-                        raise ValidationError(
-                            f"El comercial asignado debe pertenecer al menos a uno de los departamentos del cliente.\n"
-                            f"Departamentos del cliente: {record.department.mapped('name')}\n"
-                            f"Departamentos del comercial: {comercial.department.mapped('name')}"
-                        )
-    @api.constrains('company_type', 'is_company')
-    def _check_company_type_individual(self):
-        """Forzar que todos los contactos sean individuos"""
-        for record in self:
-            if record.company_type != 'person' or record.is_company:
-                raise ValidationError(
-                    "❌ ERROR: Solo se permiten contactos de tipo 'Individuo'.\n"
-                    "No se pueden crear contactos de tipo 'Empresa' en este sistema."
+            comercial = record.comercial_asignado_id
+            if not comercial:
+                continue
+
+            # Verificar que sea comercial
+            if not comercial.worker:
+                violations.append((
+                    record.id,
+                    f"Solo puedes asignar usuarios con rol 'Comercial'. "
+                    f"{comercial.name} no es un comercial."
+                ))
+
+            # Verificar misma empresa
+            elif (record.internal_company_id and comercial.internal_company_id
+                    and record.internal_company_id != comercial.internal_company_id):
+                violations.append((
+                    record.id,
+                    f"El comercial asignado debe ser de la misma empresa.\n"
+                    f"Cliente: {record.internal_company_id.name}\n"
+                    f"Comercial: {comercial.internal_company_id.name}"
+                ))
+
+            # Verificar mismo departamento (al menos uno en común)
+            elif record.department and comercial.department and not (record.department & comercial.department):
+                violations.append((
+                    record.id,
+                    f"El comercial asignado debe pertenecer al menos a uno de los departamentos del cliente.\n"
+                    f"Departamentos del cliente: {record.department.mapped('name')}\n"
+                    f"Departamentos del comercial: {comercial.department.mapped('name')}"
+                ))
+        return violations
+
+    # -------------------------
+    # VALIDACIÓN DIFERIDA (operaciones masivas)
+    # -------------------------
+
+    # Las reglas de rol único y de solo individuos nunca se difieren: son
+    # CHECK de PostgreSQL (_sql_constraints), que rechazan la fila al
+    # escribirla, y create rechaza varios roles en vals antes de insertar.
+    # En modo diferido solo se difieren las constraints Python que pasan por
+    # _raise_or_defer.
+
+    # Clave de contexto que activa el modo diferido
+    _DEFER_CONTEXT_KEY = 'defer_partner_constraints'
+    # Clave en cr.precommit.data con los registros pendientes de validar
+    _DEFERRED_DATA_KEY = 'custom_partner.deferred_constraints'
+
+    def _raise_or_defer(self, violations_method):
+        """
+        Ejecuta la validación indicada o, en modo diferido, la deja pendiente
+        para validarla en bloque al final de la transacción.
+        """
+        if self.env.context.get(self._DEFER_CONTEXT_KEY):
+            data = self.env.cr.precommit.data
+            if self._DEFERRED_DATA_KEY not in data:
+                data[self._DEFERRED_DATA_KEY] = {}
+                self.env.cr.precommit.add(self._check_deferred_constraints_on_commit)
+            data[self._DEFERRED_DATA_KEY].setdefault(violations_method, set()).update(self.ids)
+            return
+
+        violations = getattr(self, violations_method)()
+        if violations:
+            raise ValidationError("\n\n".join(message for _partner_id, message in violations))
+
+    @api.model
+    def validate_deferred_constraints(self, raise_on_violation=False):
+        """
+        Valida en bloque todos los registros pendientes del modo diferido.
+
+        Devuelve un informe {'checked': n, 'violations': [{'constraint',
+        'partner_id', 'message'}]}. Si raise_on_violation es True y hay
+        violaciones, lanza un único ValidationError con todas ellas.
+        """
+        # Solo se consume lo pendiente si se va a lanzar: un simple informe no
+        # puede desactivar la validación del commit
+        data = self.env.cr.precommit.data
+        if raise_on_violation:
+            pending = data.pop(self._DEFERRED_DATA_KEY, {})
+        else:
+            pending = {method: set(ids) for method, ids in data.get(self._DEFERRED_DATA_KEY, {}).items()}
+        report = {'checked': 0, 'violations': []}
+        if not pending:
+            return report
+
+        # Los creados en modo diferido ya pasan por la comprobación completa de duplicados
+        if '_get_duplicate_batch_violations' in pending and '_get_duplicate_contact_violations' in pending:
+            pending['_get_duplicate_contact_violations'] = (
+                pending['_get_duplicate_contact_violations'] - pending['_get_duplicate_batch_violations']
+            )
+
+        checked_ids = set()
+        Partner = self.with_context(**{self._DEFER_CONTEXT_KEY: False})
+        for violations_method, ids in pending.items():
+            records = Partner.browse(ids).exists()
+            checked_ids.update(records.ids)
+            for partner_id, message in getattr(records, violations_method)():
+                report['violations'].append({
+                    'constraint': violations_method,
+                    'partner_id': partner_id,
+                    'message': message,
+                })
+        report['checked'] = len(checked_ids)
+        _logger.info(
+            f"🧾 Validación diferida: {report['checked']} contactos, "
+            f"{len(report['violations'])} violaciones"
+        )
+
+        if raise_on_violation and report['violations']:
+            raise ValidationError(
+                "❌ ERROR: La operación masiva no cumple las validaciones:\n\n" +
+                "\n\n".join(
+                    f"[ID {violation['partner_id']}] {violation['message']}"
+                    for violation in report['violations']
                 )
-    
-    @api.constrains('external', 'comerciales_asignados_ids')
-    def _check_comerciales_mismo_departamento_externo(self):
-        """Validar que los comerciales asignados a un externo sean de su mismo departamento y empresa"""
-        for rec in self:
-            if rec.external and rec.comerciales_asignados_ids:
-                # Verificar que cada comercial tenga al menos un departamento en común y misma empresa
-                for comercial in rec.comerciales_asignados_ids:
-                    if not comercial.department:
-                        raise ValidationError(
-                            f"El comercial {comercial.name} no tiene departamento asignado."
-                        )
-                    
-                    if not comercial.internal_company_id:
-                        raise ValidationError(
-                            f"El comercial {comercial.name} no tiene empresa asignada."
-                        )
-                    
-                    # Verificar mismo departamento
-                    departamentos_comunes = rec.department & comercial.department
-                    if not departamentos_comunes:
-                        raise ValidationError(
-                            f"El comercial {comercial.name} no pertenece a los departamentos "
-                            f"del externo {rec.name}."
-                        )
-                    
-                    # Verificar misma empresa
-                    if rec.internal_company_id != comercial.internal_company_id:
-                        raise ValidationError(
-                            f"El comercial {comercial.name} no pertenece a la misma empresa "
-                            f"que el externo {rec.name}."
-                        )
+            )
+        return report
 
+    def _check_deferred_constraints_on_commit(self):
+        """Antes del commit: si quedan validaciones pendientes, se ejecutan y bloquean la transacción."""
+        self.validate_deferred_constraints(raise_on_violation=True)
 
     # -------------------------
     # ONCHANGE METHODS
@@ -295,21 +362,15 @@ class ResPartner(models.Model):
 
     @api.depends_context('uid')
     def _compute_is_worker_user(self):
-        current_user = self.env.user
+        profile = self._get_acting_profile()
         for partner in self:
-            partner.is_worker_user = bool(
-                current_user.partner_id and
-                current_user.partner_id.worker
-            )
+            partner.is_worker_user = profile.is_worker
 
     @api.depends_context('uid')
     def _compute_is_external_user(self):
-        current_user = self.env.user
+        profile = self._get_acting_profile()
         for partner in self:
-            partner.is_external_user = bool(
-                current_user.partner_id and
-                current_user.partner_id.external
-            )
+            partner.is_external_user = profile.is_external
             
     def _compute_meeting_count(self):
         """
@@ -333,19 +394,55 @@ class ResPartner(models.Model):
     # BUSINESS METHODS
     # -------------------------
 
+    # Dominio de cada rol admitido en partners_by_department
+    _ROLE_DOMAINS = {
+        'worker': [('worker', '=', True)],
+        'supervisor': [('supervisor', '=', True)],
+        'external': [('external', '=', True)],
+        'client': [('worker', '=', False), ('supervisor', '=', False), ('external', '=', False)],
+    }
+
+    @api.model
+    def partners_by_department(self, code, roles=None):
+        """
+        Contactos de los departamentos con el código indicado (y sus
+        subdepartamentos), opcionalmente filtrados por roles: worker,
+        supervisor, external y/o client.
+        """
+        department_ids = self.env['res.partner.department']._department_ids_by_code(code)
+        if not department_ids:
+            _logger.info(f"⚠️ No hay departamentos con código '{code}'")
+            return self.browse()
+
+        domain = [('department', 'in', list(department_ids))]
+        if roles:
+            unknown_roles = set(roles) - set(self._ROLE_DOMAINS)
+            if unknown_roles:
+                raise ValidationError(f"Roles no válidos: {', '.join(sorted(unknown_roles))}")
+            domain = expression.AND([
+                domain,
+                expression.OR([self._ROLE_DOMAINS[role] for role in roles]),
+            ])
+        return self.search(domain)
+
     def get_medical_partners(self):
         """Devuelve todos los contactos del departamento médico"""
-        return self.search([('department.name', 'ilike', 'Médico')])
+        return self.partners_by_department('medico')
 
     def get_aesthetic_partners(self):
         """Devuelve todos los contactos del departamento estética"""
-        return self.search([('department.name', 'ilike', 'Estética')])
+        return self.partners_by_department('estetica')
 
     @api.model
     def unrestricted_search(self, domain, limit=None):
         """Devuelve registros de res.partner sin aplicar filtros de visibilidad personalizados."""
         return super(ResPartner, self.sudo()).search(domain, limit=limit)
 
+    @api.model
+    def _get_acting_profile(self):
+        """Perfil (rol, departamentos, empresa...) del usuario actual, cacheado por petición."""
+        return get_acting_profile(self.env)
+
     def _validate_duplicate_in_department(self, field_name, field_value, current_department, exclude_id=None):
         """Método auxiliar para validar duplicados globalmente (sin restricciones)."""
         if not field_value:
@@ -357,32 +454,108 @@ class ResPartner(models.Model):
             domain.append(('id', '!=', exclude_id))
         existing_record = self.unrestricted_search(domain, limit=1)
         if existing_record:
-            field_labels = {
-                'vat': 'NIF/CIF',
-                'phone': 'teléfono',
-                'mobile': 'móvil'
-            }
-            field_label = field_labels.get(field_name, field_name)
-            existing_department = existing_record.department or 'Sin departamento'
-            raise ValidationError(
-                f"❌ ERROR: No se puede crear/modificar el contacto.\n\n"
-                f"📋 El {field_label} '{field_value}' ya está registrado en el sistema por:\n"
-                f"🏭 Departamento: {existing_department}\n\n"
-                f"⚠️ No se pueden duplicar clientes."
-            )
+            self._raise_duplicate_error(field_name, field_value, existing_record.department)
+
+    def _raise_duplicate_error(self, field_name, field_value, existing_department):
+        """Lanza el error de contacto duplicado con el formato común."""
+        perf_metrics.inc(self.env, 'custom_partner_duplicate_hits_total', field=field_name)
+        raise ValidationError(self._duplicate_error_message(field_name, field_value, existing_department))
+
+    def _duplicate_error_message(self, field_name, field_value, existing_department):
+        field_labels = {
+            'vat': 'NIF/CIF',
+            'phone': 'teléfono',
+            'mobile': 'móvil'
+        }
+        field_label = field_labels.get(field_name, field_name)
+        existing_department = existing_department or 'Sin departamento'
+        return (
+            f"❌ ERROR: No se puede crear/modificar el contacto.\n\n"
+            f"📋 El {field_label} '{field_value}' ya está registrado en el sistema por:\n"
+            f"🏭 Departamento: {existing_department}\n\n"
+            f"⚠️ No se pueden duplicar clientes."
+        )
 
     @api.constrains('vat', 'phone', 'mobile', 'department')
     def _check_duplicate_contact_in_department(self):
-        for record in self:
-            if record.department:
-                if record.vat:
-                    self._validate_duplicate_in_department('vat', record.vat, record.department, record.id)
-                if record.phone:
-                    self._validate_duplicate_in_department('phone', record.phone, record.department, record.id)
-                if record.mobile:
-                    self._validate_duplicate_in_department('mobile', record.mobile, record.department, record.id)
-    
-    
+        self._raise_or_defer('_get_duplicate_contact_violations')
+
+    def _get_duplicate_contact_violations(self):
+        """Una búsqueda sin restricciones por campo para todo el conjunto de registros."""
+        records = self.filtered('department')
+        violations = []
+        for field_name in ('vat', 'phone', 'mobile'):
+            records_by_value = {}
+            for record in records:
+                value = record[field_name]
+                if not value:
+                    continue
+                if field_name == 'vat':
+                    value = value.strip().upper()
+                records_by_value.setdefault(value, []).append(record)
+            if not records_by_value:
+                continue
+
+            existing_by_value = {}
+            for existing in self.unrestricted_search([(field_name, 'in', list(records_by_value))]):
+                existing_by_value.setdefault(existing[field_name], []).append(existing)
+
+            for value, value_records in records_by_value.items():
+                for record in value_records:
+                    duplicate = next(
+                        (existing for existing in existing_by_value.get(value, []) if existing.id != record.id),
+                        None
+                    )
+                    if duplicate:
+                        perf_metrics.inc(self.env, 'custom_partner_duplicate_hits_total', field=field_name)
+                        violations.append((
+                            record.id,
+                            self._duplicate_error_message(field_name, value, duplicate.department)
+                        ))
+        return violations
+
+    def _get_duplicate_batch_violations(self):
+        """
+        Equivalente diferido de _validate_duplicates_bulk para los contactos
+        creados en modo diferido: todos los registros, con o sin
+        departamento, repeticiones dentro del propio conjunto y coincidencias
+        con otros contactos.
+        """
+        violations = []
+        for field_name in ('vat', 'phone', 'mobile'):
+            records_by_value = {}
+            for record in self:
+                value = record[field_name]
+                if not value:
+                    continue
+                if field_name == 'vat':
+                    value = value.strip().upper()
+                records_by_value.setdefault(value, []).append(record)
+            if not records_by_value:
+                continue
+
+            # Los registros del conjunto ya se comparan entre sí abajo
+            existing_by_value = {}
+            for existing in self.unrestricted_search([
+                (field_name, 'in', list(records_by_value)),
+                ('id', 'not in', self.ids),
+            ]):
+                existing_by_value.setdefault(existing[field_name], []).append(existing)
+
+            for value, value_records in records_by_value.items():
+                existing = existing_by_value.get(value)
+                if existing:
+                    perf_metrics.inc(self.env, 'custom_partner_duplicate_hits_total', field=field_name)
+                    violations.append((
+                        value_records[0].id,
+                        self._duplicate_error_message(field_name, value, existing[0].department)
+                    ))
+                for record in value_records[1:]:
+                    perf_metrics.inc(self.env, 'custom_partner_duplicate_hits_total', field=field_name)
+                    violations.append((record.id, self._duplicate_error_message(field_name, value, False)))
+        return violations
+
+
     # -------------------------
     # DEBUGGING METHODS
     # -------------------------
@@ -394,60 +567,162 @@ class ResPartner(models.Model):
         _logger.info(f"🔍 FIELDS_GET llamado")
         return result
 
+    # -------------------------
+    # AUDITORÍA DE ESCRITURAS
+    # -------------------------
+
+    # Parámetro del sistema con el % de escrituras a auditar (0 = desactivado)
+    _WRITE_AUDIT_PARAM = 'custom_partner.write_audit_sample_rate'
+    # Tipos de campo que se pueden comparar directamente con la columna SQL
+    _WRITE_AUDIT_TYPES = ('boolean', 'char', 'integer', 'float', 'selection', 'many2one')
+
+    def _get_write_audit_rate(self):
+        """Devuelve el porcentaje (0-100) de escrituras a auditar."""
+        value = self.env['ir.config_parameter'].sudo().get_param(self._WRITE_AUDIT_PARAM, '0')
+        try:
+            return min(max(float(value), 0.0), 100.0)
+        except (TypeError, ValueError):
+            _logger.warning(f"⚠️ Valor no válido en {self._WRITE_AUDIT_PARAM}: {value!r}")
+            return 0.0
+
+    def _audit_write(self, vals):
+        """
+        Comprueba que lo escrito coincide con lo guardado en PostgreSQL.
+
+        Solo se ejecuta si el parámetro del sistema está activo y la escritura
+        sale en el muestreo. Hace un único flush de los campos escritos y una
+        única consulta para todos los registros.
+        """
+        rate = self._get_write_audit_rate()
+        if not self or not rate or random.random() * 100 >= rate:
+            return
+
+        fnames = [
+            fname for fname in vals
+            if fname in self._fields
+            and self._fields[fname].store
+            and self._fields[fname].type in self._WRITE_AUDIT_TYPES
+            and not self._fields[fname].translate
+        ]
+        if not fnames:
+            return
+
+        self.flush_recordset(fnames)
+        columns = ', '.join(f'"{fname}"' for fname in fnames)
+        self.env.cr.execute(
+            f'SELECT id, {columns} FROM "{self._table}" WHERE id = ANY(%s)',
+            (list(self.ids),)
+        )
+        db_rows = {row[0]: row[1:] for row in self.env.cr.fetchall()}
+
+        mismatches = 0
+        for record in self:
+            db_row = db_rows.get(record.id)
+            if db_row is None:
+                _logger.warning(f"🔍 AUDITORÍA: {record.id} no encontrado en BD tras escribir")
+                mismatches += 1
+                continue
+            for fname, db_value in zip(fnames, db_row):
+                cache_value = record[fname]
+                if self._fields[fname].type == 'many2one':
+                    cache_value = cache_value.id or None
+                if cache_value != db_value and (cache_value or db_value):
+                    _logger.warning(
+                        f"🔍 AUDITORÍA: {fname} de {record.id} difiere - "
+                        f"caché ORM: {cache_value!r}, BD: {db_value!r}"
+                    )
+                    mismatches += 1
+
+        _logger.info(
+            f"🔍 AUDITORÍA de escritura: {len(self)} registros, "
+            f"campos {fnames}, {mismatches} discrepancias"
+        )
+
 
 
     # -------------------------
     # CRUD METHODS
     # -------------------------
 
-    @api.model
-    def create(self, vals):
-        _logger.info(f"🎯 CREATE llamado con vals: {vals}")
-        current_user = self.env.user
-        
+    @api.model_create_multi
+    def create(self, vals_list):
+        start = time.perf_counter()
+        _logger.info(f"🎯 CREATE llamado con {len(vals_list)} registros")
+
+        # -------------------------
+        # PERFIL DEL CREADOR (una sola lectura por petición)
+        # -------------------------
+        profile = self._get_acting_profile()
+        _logger.info(f"👤 Creador: {profile}")
+        if not profile.partner_id:
+            _logger.info(f"⚠️ El usuario NO tiene partner_id asociado")
+
+        default_company_id = self.env.user.company_id.id
+        for vals in vals_list:
+            self._prepare_create_vals(vals, profile, default_company_id)
+
+        # -------------------------
+        # VALIDACIÓN DE DUPLICADOS (en bloque)
+        # -------------------------
+        # En modo diferido se valida al final, con _get_duplicate_batch_violations
+        deferred = self.env.context.get(self._DEFER_CONTEXT_KEY)
+        if not deferred:
+            self._validate_duplicates_bulk(vals_list)
+
+        _logger.info(f"📦 Creando {len(vals_list)} contactos en una sola llamada")
+        partners = super(ResPartner, self).create(vals_list)
+        if deferred:
+            partners._raise_or_defer('_get_duplicate_batch_violations')
+
+        # -------------------------
+        # 🆕 AUTO-ASIGNACIÓN DE LOS COMERCIALES AL EXTERNO
+        # -------------------------
+        # Si el creador es un externo, los comerciales creados se le asignan
+        if profile.is_external:
+            new_comerciales = partners.filtered('worker')
+            if new_comerciales:
+                try:
+                    _logger.info(f"🔄 Auto-asignando comerciales {new_comerciales.ids} al externo {profile.partner_name}")
+                    creator_partner = self.env['res.partner'].sudo().browse(profile.partner_id)
+                    creator_partner.write({
+                        'comerciales_asignados_ids': [(4, comercial_id) for comercial_id in new_comerciales.ids]
+                    })
+                    _logger.info(f"✅ Auto-asignación EXITOSA: {creator_partner.comerciales_asignados_ids.ids}")
+                except Exception as e:
+                    _logger.error(f"❌ ERROR en auto-asignación: {e}")
+                    # No hacemos rollback porque los comerciales ya se crearon exitosamente
+                    # Solo logueamos el error
+
+        # Contadores de los departamentos afectados (se recalculan antes del commit)
+        department_ids = partners.sudo().department.ids
+        self.env['res.partner.department']._mark_counters_dirty(department_ids)
+        # Un contacto sin departamento no cambia los valores del panel
+        if department_ids:
+            search_panel_cache.bump_generation(self.env)
+
+        perf_metrics.observe(
+            self.env, 'custom_partner_create_seconds', time.perf_counter() - start, role=profile.role or 'other',
+        )
+        return partners
+
+    def _prepare_create_vals(self, vals, profile, default_company_id):
+        """Aplica sobre vals las reglas de rol y herencia del creador."""
         # -------------------------
         # FORZAR TIPO INDIVIDUO
         # -------------------------
         vals['company_type'] = 'person'
         vals['is_company'] = False
-        _logger.info(f"✅ Forzando company_type='person' e is_company=False")
-        
-        # -------------------------
-        # DEBUG: ¿QUIÉN ESTÁ LOGUEADO?
-        # -------------------------
-        _logger.info(f"═══════════════════════════════════════")
-        _logger.info(f"👤 Usuario actual (res.users):")
-        _logger.info(f"   - ID: {current_user.id}")
-        _logger.info(f"   - Login: {current_user.login}")
-        _logger.info(f"   - Name: {current_user.name}")
-        _logger.info(f"   - Partner ID: {current_user.partner_id.id if current_user.partner_id else 'None'}")
-        _logger.info(f"   - Partner Name: {current_user.partner_id.name if current_user.partner_id else 'None'}")
-        
-        if current_user.partner_id:
-            partner = self.env['res.partner'].sudo().browse(current_user.partner_id.id)
-            _logger.info(f"📋 Datos del Partner asociado (desde BD):")
-            _logger.info(f"   - ID: {partner.id}")
-            _logger.info(f"   - Name: {partner.name}")
-            _logger.info(f"   - worker: {partner.worker}")
-            _logger.info(f"   - supervisor: {partner.supervisor}")
-            _logger.info(f"   - external: {partner.external}")
-            _logger.info(f"   - internal_company_id: {partner.internal_company_id.name if partner.internal_company_id else 'None'}")
-            _logger.info(f"   - department IDs: {partner.department.ids}")
-            _logger.info(f"   - department Names: {partner.department.mapped('name')}")
-            _logger.info(f"   - comerciales_asignados_ids: {partner.comerciales_asignados_ids.ids}")
-        else:
-            _logger.info(f"⚠️ El usuario NO tiene partner_id asociado")
-        _logger.info(f"═══════════════════════════════════════")
-        
+
         # -------------------------
         # VALIDACIÓN DE ROLES
         # -------------------------
         role_fields = ['worker', 'supervisor', 'external']
         active_roles = [field for field in role_fields if vals.get(field)]
-        
+
+        # Inmediato también en modo diferido: single_role_check lo rechazaría igualmente
         if len(active_roles) > 1:
             raise ValidationError("Solo puede seleccionar un rol a la vez.")
-        
+
         # Limpiar campos según el rol seleccionado
         if vals.get('worker'):
             vals.update({
@@ -468,195 +743,151 @@ class ResPartner(models.Model):
                 'department': [(5, 0, 0)],
                 'company_id': False,
             })
-        
+
         # -------------------------
         # ASIGNACIÓN DE COMPANY_ID POR DEFECTO
         # -------------------------
         if not vals.get('external') and not vals.get('company_id'):
-            vals['company_id'] = current_user.company_id.id
-        
+            vals['company_id'] = default_company_id
+
         # -------------------------
         # LÓGICA SEGÚN ROL DEL CREADOR
         # -------------------------
-        
+
         # SUPERVISOR creando COMERCIAL
-        if current_user.partner_id.supervisor and vals.get('worker'):
+        if profile.is_supervisor and vals.get('worker'):
             if not vals.get('department'):
-                if current_user.partner_id.department:
-                    vals['department'] = [(6, 0, current_user.partner_id.department.ids)]
+                if profile.department_ids:
+                    vals['department'] = [(6, 0, list(profile.department_ids))]
                 else:
                     raise ValidationError(
                         "No puedes crear un comercial porque, como supervisor, "
                         "no tienes un departamento asignado."
                     )
-        
+
         # COMERCIAL creando CONTACTO
-        elif current_user.partner_id.worker:
+        elif profile.is_worker:
             # Un comercial NO puede crear usuarios con roles
             if vals.get('worker') or vals.get('supervisor') or vals.get('external'):
                 raise ValidationError(
                     "No tienes permisos para crear usuarios con roles "
                     "(Comercial, Supervisor, Externo)."
                 )
-            
+
             # Asignar departamento del comercial al nuevo contacto si no se especifica
-            if current_user.partner_id.department and not vals.get('department'):
-                vals['department'] = [(6, 0, current_user.partner_id.department.ids)]
-        
+            if profile.department_ids and not vals.get('department'):
+                vals['department'] = [(6, 0, list(profile.department_ids))]
+
         # 🆕 EXTERNO creando COMERCIAL - AUTO-ASIGNACIÓN
-        elif current_user.partner_id.external and vals.get('worker'):
-            _logger.info(f"🔄 EXTERNO creando COMERCIAL - Procesando auto-asignación")
-            
+        elif profile.is_external and vals.get('worker'):
             # Verificar que el externo tenga supervisores asignados
-            creator_partner = self.env['res.partner'].sudo().browse(current_user.partner_id.id)
-            if not creator_partner.supervisores_ids:
+            if not profile.supervisor_ids:
                 raise ValidationError(
                     "No puedes crear un comercial porque no tienes supervisores asignados. "
                     "Contacta con un administrador."
                 )
-            
+
             # 🆕 ASIGNAR AUTOMÁTICAMENTE DEPARTAMENTO Y EMPRESA DEL EXTERNO
-            if not vals.get('department') and creator_partner.department:
-                vals['department'] = [(6, 0, creator_partner.department.ids)]
-                _logger.info(f"✅ Asignando departamentos del externo: {creator_partner.department.ids}")
-            
-            if not vals.get('internal_company_id') and creator_partner.internal_company_id:
-                vals['internal_company_id'] = creator_partner.internal_company_id.id
-                _logger.info(f"✅ Asignando empresa del externo: {vals['internal_company_id']}")
-            
+            if not vals.get('department') and profile.department_ids:
+                vals['department'] = [(6, 0, list(profile.department_ids))]
+
+            if not vals.get('internal_company_id') and profile.company_id:
+                vals['internal_company_id'] = profile.company_id
+
             # 🆕 VERIFICAR QUE EL COMERCIAL TENGA DEPARTAMENTO Y EMPRESA
             if not vals.get('department'):
                 raise ValidationError(
                     "El comercial debe tener departamento asignado. "
                     "Como externo, debes tener departamento para crear comerciales."
                 )
-            
+
             if not vals.get('internal_company_id'):
                 raise ValidationError(
                     "El comercial debe tener empresa asignada. "
                     "Como externo, debes tener empresa para crear comerciales."
                 )
-        
+
         # -------------------------
         # HERENCIA AUTOMÁTICA DE EMPRESA Y DEPARTAMENTOS
         # -------------------------
-        if current_user.partner_id:
-            # Forzar lectura desde BD sin caché
-            creator_partner = self.env['res.partner'].sudo().browse(current_user.partner_id.id)
-            
-            _logger.info(f"🔄 Aplicando herencia automática...")
-            _logger.info(f"   - Valores actuales en vals:")
-            _logger.info(f"     * internal_company_id: {vals.get('internal_company_id')}")
-            _logger.info(f"     * department: {vals.get('department')}")
-            
+        if profile.partner_id:
             # Heredar internal_company_id si no se especificó O está vacío
-            if not vals.get('internal_company_id') and creator_partner.internal_company_id:
-                vals['internal_company_id'] = creator_partner.internal_company_id.id
-                _logger.info(
-                    f"✅ Heredando empresa '{creator_partner.internal_company_id.name}' "
-                    f"(ID: {creator_partner.internal_company_id.id}) al nuevo contacto"
-                )
-            else:
-                if vals.get('internal_company_id'):
-                    _logger.info(f"ℹ️ internal_company_id ya tiene valor: {vals.get('internal_company_id')}")
-                elif not creator_partner.internal_company_id:
-                    _logger.warning(f"⚠️ El creador NO tiene empresa asignada")
-            
-            # Heredar department si no se especificó O está vacío y el creador no es externo
+            if not vals.get('internal_company_id') and profile.company_id:
+                vals['internal_company_id'] = profile.company_id
+
+            # Heredar department si no se especificó O está vacío y el nuevo contacto no es externo
             department_empty = (
-                not vals.get('department') or 
+                not vals.get('department') or
                 vals.get('department') == [[6, False, []]] or
                 vals.get('department') == [(6, 0, [])]
             )
-            
-            _logger.info(f"   - department_empty: {department_empty}")
-            
-            if department_empty and creator_partner.department and not vals.get('external'):
-                vals['department'] = [(6, 0, creator_partner.department.ids)]
-                _logger.info(
-                    f"✅ Heredando departamentos {creator_partner.department.mapped('name')} "
-                    f"(IDs: {creator_partner.department.ids}) al nuevo contacto"
-                )
-            else:
-                if not department_empty:
-                    _logger.info(f"ℹ️ department ya tiene valor: {vals.get('department')}")
-                elif not creator_partner.department:
-                    _logger.warning(f"⚠️ El creador NO tiene departamentos asignados")
-                elif vals.get('external'):
-                    _logger.info(f"ℹ️ El nuevo contacto es externo (no hereda departamentos)")
-        
+            if department_empty and profile.department_ids and not vals.get('external'):
+                vals['department'] = [(6, 0, list(profile.department_ids))]
+
         # -------------------------
         # AUTO-ASIGNACIÓN DE COMERCIAL A CLIENTES
         # -------------------------
         # Si el creador es un comercial y está creando un cliente (sin roles)
-        if (current_user.partner_id and 
-            current_user.partner_id.worker and 
-            not vals.get('worker') and 
-            not vals.get('supervisor') and 
+        if (profile.is_worker and
+            not vals.get('worker') and
+            not vals.get('supervisor') and
             not vals.get('external')):
-            
+
             # Auto-asignar al comercial que lo crea
             if not vals.get('comercial_asignado_id'):
-                vals['comercial_asignado_id'] = current_user.partner_id.id
-                _logger.info(
-                    f"✅ Auto-asignando comercial '{current_user.partner_id.name}' "
-                    f"(ID: {current_user.partner_id.id}) al cliente"
-                )
-        
-        # -------------------------
-        # 🆕 AUTO-ASIGNACIÓN DEL COMERCIAL AL EXTERNO
-        # -------------------------
-        # Si el creador es un externo y está creando un comercial
-        if (current_user.partner_id and 
-            current_user.partner_id.external and 
-            vals.get('worker')):
-            
-            _logger.info(f"🎯 EXTERNO creando COMERCIAL - Preparando auto-asignación")
-            
-            # Crear el registro primero
-            _logger.info(f"📦 Valores FINALES antes de crear: {vals}")
-            new_comercial = super(ResPartner, self).create(vals)
-            
-            # Auto-asignar el nuevo comercial al externo que lo creó
-            try:
-                _logger.info(f"🔄 Auto-asignando comercial {new_comercial.name} (ID: {new_comercial.id}) al externo {current_user.partner_id.name}")
-                
-                # Usar sudo() para evitar problemas de permisos
-                externo_partner = self.env['res.partner'].sudo().browse(current_user.partner_id.id)
-                
-                # Agregar el nuevo comercial a la lista de comerciales asignados del externo
-                externo_partner.write({
-                    'comerciales_asignados_ids': [(4, new_comercial.id)]
-                })
-                
-                _logger.info(f"✅ Auto-asignación EXITOSA:")
-                _logger.info(f"   - Comercial: {new_comercial.name} (ID: {new_comercial.id})")
-                _logger.info(f"   - Externo: {externo_partner.name} (ID: {externo_partner.id})")
-                _logger.info(f"   - Comerciales asignados ahora: {externo_partner.comerciales_asignados_ids.ids}")
-                
-            except Exception as e:
-                _logger.error(f"❌ ERROR en auto-asignación: {e}")
-                # No hacemos rollback porque el comercial ya se creó exitosamente
-                # Solo logueamos el error
-            
-            return new_comercial
-        
-        # -------------------------
-        # VALIDACIÓN DE DUPLICADOS
-        # -------------------------
-        duplicate_fields = ['vat', 'phone', 'mobile']
-        for field in duplicate_fields:
-            if vals.get(field):
-                self._validate_duplicate_in_department(field, vals.get(field), vals.get('department'), False)
-        
-        _logger.info(f"📦 Valores FINALES antes de crear: {vals}")
-        return super(ResPartner, self).create(vals)
+                vals['comercial_asignado_id'] = profile.partner_id
+
+        return vals
+
+    def _validate_duplicates_bulk(self, vals_list):
+        """
+        Valida duplicados de NIF/CIF, teléfono y móvil para un lote completo.
 
+        Detecta repeticiones dentro del propio lote y hace una única búsqueda
+        sin restricciones por campo contra los contactos existentes.
+        """
+        for field_name in ('vat', 'phone', 'mobile'):
+            values, seen = [], set()
+            for vals in vals_list:
+                value = vals.get(field_name)
+                if not value:
+                    continue
+                if field_name == 'vat':
+                    value = value.strip().upper()
+                if value in seen:
+                    self._raise_duplicate_error(field_name, value, False)
+                seen.add(value)
+                values.append(value)
+            if not values:
+                continue
+            existing_record = self.unrestricted_search([(field_name, 'in', values)], limit=1)
+            if existing_record:
+                self._raise_duplicate_error(field_name, existing_record[field_name], existing_record.department)
+
+    def _merge_role_transition_vals(self, clear_vals, vals):
+        """
+        Combina los valores de limpieza de rol con los valores del usuario.
 
+        Equivale a escribir primero clear_vals y después vals: los campos
+        simples de vals sustituyen a los de limpieza y en los x2many se
+        concatenan los comandos (primero la limpieza, luego los del usuario).
+        """
+        merged = dict(clear_vals)
+        for fname, value in vals.items():
+            field = self._fields.get(fname)
+            if (fname in merged and field and field.type in ('one2many', 'many2many')
+                    and isinstance(value, (list, tuple))):
+                merged[fname] = list(merged[fname]) + list(value)
+            else:
+                merged[fname] = value
+        return merged
 
+    # Campos que alteran los contadores de los departamentos (la compañía, el resumen del pipeline)
+    _DEPARTMENT_COUNTER_FIELDS = ('active', 'worker', 'supervisor', 'external', 'department', 'internal_company_id')
 
     def write(self, vals):
-        current_user = self.env.user
+        start = time.perf_counter()
+        profile = self._get_acting_profile()
         _logger.info(f"✏️ EJECUTANDO WRITE para {self.mapped('name')}")
         _logger.info(f"📦 Valores a escribir: {vals}")
         
@@ -689,7 +920,7 @@ class ResPartner(models.Model):
             _logger.info(f"🎯 INTENTANDO ASIGNAR COMERCIAL: {vals['comercial_asignado_id']}")
         
         # Si el usuario actual es comercial, bloquear edición de campos restringidos
-        if current_user.partner_id and current_user.partner_id.worker:
+        if profile.is_worker:
             restricted_fields = ['worker', 'supervisor', 'department', 'external', 'supervisor_externo_id', 'supervisores_ids', 'comerciales_asignados_ids']
             attempted_restricted_fields = [field for field in restricted_fields if field in vals]
             if attempted_restricted_fields:
@@ -700,6 +931,11 @@ class ResPartner(models.Model):
                     f"Solo los administradores y supervisores pueden modificar estos campos."
                 )
         
+        # Departamentos afectados antes del cambio (para sus contadores)
+        touches_counters = any(fname in vals for fname in self._DEPARTMENT_COUNTER_FIELDS)
+        if touches_counters:
+            counter_department_ids = set(self.sudo().department.ids)
+
         # Detectar cambios de rol REALES (de False a True)
         records_to_clear = self.env['res.partner']
         
@@ -753,68 +989,36 @@ class ResPartner(models.Model):
                 })
                 _logger.info(f"🔄 Limpiando campos para cambio a EXTERNAL: {clear_vals}")
             
-            # Aplicar limpieza primero
-            if clear_vals:
-                # Hacer una copia de vals sin los campos de rol para evitar conflictos
-                temp_vals = vals.copy()
-                role_fields = ['worker', 'supervisor', 'external']
-                for field in role_fields:
-                    if field in temp_vals:
-                        del temp_vals[field]
-                
-                _logger.info(f"🔄 Aplicando limpieza primero con: {clear_vals}")
-                # Primero aplicar la limpieza
-                super(ResPartner, records_to_clear).write(clear_vals)
-                
-                # Luego aplicar el resto de valores
-                if temp_vals:
-                    _logger.info(f"🔄 Aplicando valores temporales: {temp_vals}")
-                    super(ResPartner, records_to_clear).write(temp_vals)
-                
-                # Finalmente aplicar el cambio de rol
-                role_vals = {k: v for k, v in vals.items() if k in role_fields}
-                if role_vals:
-                    _logger.info(f"🔄 Aplicando cambio de rol final: {role_vals}")
-                    super(ResPartner, records_to_clear).write(role_vals)
-                
-                _logger.info("✅ PROCESO DE CAMBIO DE ROL COMPLETADO")
-                
-                # Si hay registros restantes que NO cambiaron de rol, escribirles normalmente
-                remaining_records = self - records_to_clear
-                if remaining_records:
-                    _logger.info(f"🔄 Escribiendo registros restantes sin cambio de rol: {remaining_records.mapped('name')}")
-                    super(ResPartner, remaining_records).write(vals)
-                
-                # Log del estado DESPUÉS
-                for record in self:
-                    _logger.info(f"📊 Estado actual DESPUÉS de {record.name}:")
-                    _logger.info(f"   - worker: {record.worker}")
-                    _logger.info(f"   - supervisor: {record.supervisor}")  
-                    _logger.info(f"   - external: {record.external}")
-                    _logger.info(f"   - comercial_asignado_id: {record.comercial_asignado_id.id if record.comercial_asignado_id else 'VACÍO'}")
-                    _logger.info(f"   - comerciales_asignados_ids: {record.comerciales_asignados_ids.ids}")
-                    _logger.info(f"   - supervisores_ids: {record.supervisores_ids.ids}")
-                
-                _logger.info(f"✅ WRITE COMPLETADO para {self.mapped('name')}")
-                return True
-        
-        # Para registros que NO cambian de rol, escribir normalmente
-        _logger.info("🔄 Ejecutando WRITE normal (sin cambio de rol)")
-        result = super(ResPartner, self).write(vals)
-        
-        # 🆕 DEBUG: Verificar si el campo se guardó realmente
-        self.env.cr.flush()  # Forzar flush a la base de datos
-        for record in self:
-            # Leer directamente de la base de datos
-            self.env.cr.execute("""
-                SELECT id, name, comercial_asignado_id 
-                FROM res_partner 
-                WHERE id = %s
-            """, (record.id,))
-            db_row = self.env.cr.fetchone()
-            _logger.info(f"🔍 VERIFICACIÓN EN BD para {record.name} (ID {record.id}):")
-            _logger.info(f"   - En caché ORM: comercial_asignado_id = {record.comercial_asignado_id.id if record.comercial_asignado_id else 'NULL'}")
-            _logger.info(f"   - En BD PostgreSQL: comercial_asignado_id = {db_row[2] if db_row else 'NO ENCONTRADO'}")
+            # Fusionar limpieza + valores + cambio de rol en un único write
+            # por grupo: las constraints y el tracking se ejecutan una sola vez
+            transition_vals = self._merge_role_transition_vals(clear_vals, vals)
+            _logger.info(f"🔄 Aplicando cambio de rol en una sola escritura: {transition_vals}")
+            result = super(ResPartner, records_to_clear).write(transition_vals)
+            _logger.info("✅ PROCESO DE CAMBIO DE ROL COMPLETADO")
+
+            # Si hay registros restantes que NO cambiaron de rol, escribirles normalmente
+            remaining_records = self - records_to_clear
+            if remaining_records:
+                _logger.info(f"🔄 Escribiendo registros restantes sin cambio de rol: {remaining_records.mapped('name')}")
+                super(ResPartner, remaining_records).write(vals)
+        else:
+            # Para registros que NO cambian de rol, escribir normalmente
+            _logger.info("🔄 Ejecutando WRITE normal (sin cambio de rol)")
+            result = super(ResPartner, self).write(vals)
+
+        # Si cambian datos de rol, los perfiles cacheados dejan de ser válidos
+        if any(fname in vals for fname in PROFILE_FIELDS):
+            invalidate_acting_profiles(self.env)
+
+        if touches_counters:
+            counter_department_ids.update(self.sudo().department.ids)
+            self.env['res.partner.department']._mark_counters_dirty(counter_department_ids)
+
+        if any(fname in vals for fname in self._SEARCH_PANEL_FIELDS):
+            search_panel_cache.bump_generation(self.env)
+
+        # Auditoría opcional y muestreada (desactivada por defecto)
+        self._audit_write(vals)
 
         # Log del estado DESPUÉS
         for record in self:
@@ -828,6 +1032,17 @@ class ResPartner(models.Model):
             _logger.info(f"   - department: {record.department.ids}")
 
         _logger.info(f"✅ WRITE COMPLETADO para {self.mapped('name')}")
+        perf_metrics.observe(
+            self.env, 'custom_partner_write_seconds', time.perf_counter() - start, role=profile.role or 'other',
+        )
+        return result
+
+    def unlink(self):
+        department_ids = self.sudo().department.ids
+        result = super(ResPartner, self).unlink()
+        self.env['res.partner.department']._mark_counters_dirty(department_ids)
+        if department_ids:
+            search_panel_cache.bump_generation(self.env)
         return result
 
 
@@ -836,128 +1051,89 @@ class ResPartner(models.Model):
     # FILTROS DE VISIBILIDAD
     # -------------------------
 
+    def _skip_visibility_filters(self):
+        """🆕 CRÍTICO: Evitar recursión en cálculos computados y operaciones del sistema"""
+        context = self.env.context
+        return bool(
+            context.get('skip_custom_search') or
+            context.get('active_test') is False or
+            context.get('computing_opportunity_count') or
+            '_compute_' in str(context)
+        )
+
     @api.model
-    def search(self, args, offset=0, limit=None, order=None, count=False):
+    def _get_visibility_domain(self, profile):
         """
-        Filtros personalizados de visibilidad por rol.
+        Dominio de contactos visibles para el perfil de usuario indicado.
+        Las subconsultas se hacen con sudo y skip_custom_search para evitar recursión.
         """
-        current_user = self.env.user
-        
-        # 🆕 CRÍTICO: Evitar recursión en cálculos computados y operaciones del sistema
-        if (self.env.context.get('skip_custom_search') or 
-            self.env.context.get('active_test') is False or
-            self.env.context.get('computing_opportunity_count') or
-            '_compute_' in str(self.env.context)):
-            _logger.info(f"🔓 Contexto especial detectado - búsqueda sin restricciones")
-            return super(ResPartner, self).search(args, offset=offset, limit=limit, order=order, count=count)
-
-        # IMPORTANTE: Verificar si ya estamos en un contexto de bypass
-        if self.env.context.get('skip_custom_search'):
-            _logger.info(f"🔓 Bypass activado - búsqueda sin restricciones")
-            return super(ResPartner, self).search(args, offset=offset, limit=limit, order=order, count=count)
+        Partner = self.env['res.partner'].with_context(skip_custom_search=True).sudo()
 
-        _logger.info(f"===== SEARCH llamado por usuario {current_user.name} (ID {current_user.id}) =====")
-        _logger.info(f"- Partner ID: {current_user.partner_id.id if current_user.partner_id else None}")
-        
-        # Admin ve todo
-        if self.env.user._is_admin():
-            _logger.info("Es admin REAL - Sin restricciones")
-            return super(ResPartner, self).search(args, offset, limit, order, count)
-
-        if not current_user.partner_id:
+        if not profile.partner_id:
             _logger.warning(f"Usuario sin partner_id asociado")
-            return super(ResPartner, self).search(args + [('id', '=', False)], offset, limit, order, count)
-
-        partner = current_user.partner_id
-        _logger.info(f"- Roles: worker={partner.worker}, supervisor={partner.supervisor}, external={partner.external}")
+            return [('id', '=', False)]
 
         # COMERCIAL
-        if partner.worker:
-            _logger.info(f"COMERCIAL search - Usuario {partner.name} (ID {partner.id})")
-            
-            # 🆕 LIMPIAR args que restringen por ID
-            clean_args = []
-            for item in args:
-                if isinstance(item, tuple) and len(item) == 3:
-                    field, operator, value = item
-                    if field == 'id' and operator == 'in':
-                        _logger.info(f"🚫 Ignorando restricción externa: {item}")
-                        continue
-                clean_args.append(item)
-            
-            worker_domain = [
+        if profile.is_worker:
+            return [
                 '|',
-                ('id', '=', partner.id),
-                ('comercial_asignado_id', '=', partner.id)
+                ('id', '=', profile.partner_id),
+                ('comercial_asignado_id', '=', profile.partner_id)
             ]
-            
-            _logger.info(f"Args originales: {args}")
-            _logger.info(f"Args limpiados: {clean_args}")
-            _logger.info(f"Worker domain: {worker_domain}")
-            
-            # Llamar a super() con args limpiados y sudo para bypassear record rules
-            result = super(ResPartner, self.sudo()).search(clean_args + worker_domain, offset=offset, limit=limit, order=order, count=count)
-            
-            _logger.info(f"Resultado comercial: {result if count else len(result)} registros")
-            if not count:
-                _logger.info(f"- IDs encontrados: {result.ids}")
-            return result
 
         # SUPERVISOR
-        if partner.supervisor:
-            _logger.info(f"SUPERVISOR search - Usuario {partner.name}")
-            _logger.info(f"- Departamentos: {partner.department.mapped('name')} (IDs {partner.department.ids})")
-            _logger.info(f"- Empresa: {partner.internal_company_id.name if partner.internal_company_id else None}")
+        if profile.is_supervisor:
+            # child_of: el supervisor ve todo el subárbol de sus departamentos
+            # (un único prefijo indexado sobre parent_path)
+            department_ids = list(profile.department_ids)
 
-            # Obtener IDs de comerciales (CON CONTEXTO SKIP)
-            comerciales_ids = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
+            # Obtener IDs de comerciales
+            comerciales_ids = Partner.search([
                 ('worker', '=', True),
-                ('department', 'in', partner.department.ids),
-                ('internal_company_id', '=', partner.internal_company_id.id)
+                ('department', 'child_of', department_ids),
+                ('internal_company_id', '=', profile.company_id)
             ]).ids
-            _logger.info(f"- Comerciales encontrados: {len(comerciales_ids)} - IDs: {comerciales_ids}")
+            _logger.info(f"- Comerciales encontrados: {len(comerciales_ids)}")
 
-            # Obtener IDs de clientes creados por comerciales (CON CONTEXTO SKIP)
-            clientes_por_comerciales = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
+            # Obtener IDs de clientes creados por comerciales
+            clientes_por_comerciales = Partner.search([
                 ('worker', '=', False),
                 ('supervisor', '=', False),
                 ('external', '=', False),
                 ('create_uid.partner_id', 'in', comerciales_ids),
-                ('internal_company_id', '=', partner.internal_company_id.id)
+                ('internal_company_id', '=', profile.company_id)
             ]).ids
 
-            # Obtener clientes creados por el supervisor mismo (CON CONTEXTO SKIP)
-            clientes_por_supervisor = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
+            # Obtener clientes creados por el supervisor mismo
+            clientes_por_supervisor = Partner.search([
                 ('worker', '=', False),
                 ('supervisor', '=', False),
                 ('external', '=', False),
-                ('create_uid', '=', current_user.id),
-                ('internal_company_id', '=', partner.internal_company_id.id)
+                ('create_uid', '=', profile.uid),
+                ('internal_company_id', '=', profile.company_id)
             ]).ids
             _logger.info(f"- Clientes creados por este supervisor: {len(clientes_por_supervisor)}")
 
             # 🆕 OBTENER EXTERNOS QUE TIENE ASIGNADOS ESTE SUPERVISOR
-            externos_supervisados_ids = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
+            externos_supervisados = Partner.search([
                 ('external', '=', True),
-                ('supervisores_ids', 'in', [partner.id])
-            ]).ids
-            _logger.info(f"- Externos supervisados: {len(externos_supervisados_ids)} - IDs: {externos_supervisados_ids}")
+                ('supervisores_ids', 'in', [profile.partner_id])
+            ])
+            externos_supervisados_ids = externos_supervisados.ids
+            _logger.info(f"- Externos supervisados: {len(externos_supervisados_ids)}")
 
             # 🆕 OBTENER COMERCIALES DE LOS EXTERNOS SUPERVISADOS
             comerciales_de_externos = []
             clientes_de_externos = []
-            
+
             if externos_supervisados_ids:
-                # Comerciales asignados a los externos supervisados
-                for externo in self.env['res.partner'].browse(externos_supervisados_ids):
-                    comerciales_de_externos.extend(externo.comerciales_asignados_ids.ids)
-                
-                comerciales_de_externos = list(set(comerciales_de_externos))
-                _logger.info(f"- Comerciales de externos supervisados: {len(comerciales_de_externos)} - IDs: {comerciales_de_externos}")
-                
+                # Comerciales asignados a los externos supervisados (una sola lectura)
+                comerciales_de_externos = externos_supervisados.comerciales_asignados_ids.ids
+                _logger.info(f"- Comerciales de externos supervisados: {len(comerciales_de_externos)}")
+
                 # Clientes de los comerciales de los externos supervisados
                 if comerciales_de_externos:
-                    clientes_de_externos = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
+                    clientes_de_externos = Partner.search([
                         ('worker', '=', False),
                         ('supervisor', '=', False),
                         ('external', '=', False),
@@ -970,19 +1146,19 @@ class ResPartner(models.Model):
             _logger.info(f"- Total clientes visibles: {len(todos_clientes_ids)}")
 
             # 🆕 CONSTRUIR DOMINIO AMPLIADO PARA SUPERVISOR - ESTRUCTURA CORREGIDA
-            supervisor_domain = [
+            return [
                 '|',  # OR principal
                 '|',  # Segundo nivel OR
-                '|',  # Tercer nivel OR  
+                '|',  # Tercer nivel OR
                 '|',  # Cuarto nivel OR
                 '|',  # Quinto nivel OR
                 # Opción 1: El propio supervisor
-                ('id', '=', partner.id),
+                ('id', '=', profile.partner_id),
                 # Opción 2: Comerciales de su departamento/empresa
                 '&', '&',
                 ('worker', '=', True),
-                ('department', 'in', partner.department.ids),
-                ('internal_company_id', '=', partner.internal_company_id.id),
+                ('department', 'child_of', department_ids),
+                ('internal_company_id', '=', profile.company_id),
                 # Opción 3: Clientes de su equipo
                 '&', '&', '&',
                 ('worker', '=', False),
@@ -1005,64 +1181,106 @@ class ResPartner(models.Model):
                 ('id', 'in', clientes_de_externos if clientes_de_externos else [False])
             ]
 
-            _logger.info(f"Aplicando dominio supervisor ampliado")
-            result = super(ResPartner, self).search(args + supervisor_domain, offset, limit, order, count)
-            _logger.info(f"Resultado: {result if count else len(result)} registros")
-            return result
-
         # EXTERNO
-        if partner.external:
-            _logger.info(f"EXTERNO search - Usuario {partner.name}")
-            
+        if profile.is_external:
             # 🆕 OBTENER CLIENTES DE LOS COMERCIALES ASIGNADOS (solo de misma empresa)
-            comerciales_asignados_ids = partner.comerciales_asignados_ids.ids
+            comerciales_asignados_ids = list(profile.comercial_ids)
             _logger.info(f"- Comerciales asignados: {comerciales_asignados_ids}")
-            
+
+            clientes_de_comerciales = []
             if comerciales_asignados_ids:
-                # Obtener IDs de clientes creados por los comerciales asignados (CON CONTEXTO SKIP)
-                clientes_de_comerciales = self.env['res.partner'].with_context(skip_custom_search=True).sudo().search([
+                clientes_de_comerciales = Partner.search([
                     ('worker', '=', False),
                     ('supervisor', '=', False),
                     ('external', '=', False),
                     ('create_uid.partner_id', 'in', comerciales_asignados_ids),
-                    ('internal_company_id', '=', partner.internal_company_id.id)  # 🆕 Solo clientes de misma empresa
+                    ('internal_company_id', '=', profile.company_id)  # 🆕 Solo clientes de misma empresa
                 ]).ids
-                _logger.info(f"- Clientes de comerciales asignados: {len(clientes_de_comerciales)} - IDs: {clientes_de_comerciales}")
-            else:
-                clientes_de_comerciales = []
-                _logger.info(f"- No hay comerciales asignados")
-            
+                _logger.info(f"- Clientes de comerciales asignados: {len(clientes_de_comerciales)}")
+
             # 🆕 DOMINIO PARA EXTERNOS AMPLIADO - CORREGIDO
-            external_domain = [
+            return [
                 '|',  # Primer OR
                 '|',  # Segundo OR
-                ('id', '=', partner.id),  # Opción 1: El propio externo
+                ('id', '=', profile.partner_id),  # Opción 1: El propio externo
                 ('id', 'in', comerciales_asignados_ids),  # Opción 2: Comerciales asignados
                 '&', '&', '&', '&',  # Opción 3: Clientes de comerciales (todos estos deben ser True)
                 ('worker', '=', False),
                 ('supervisor', '=', False),
                 ('external', '=', False),
-                ('internal_company_id', '=', partner.internal_company_id.id),
+                ('internal_company_id', '=', profile.company_id),
                 ('id', 'in', clientes_de_comerciales if clientes_de_comerciales else [False])
             ]
-            
-            _logger.info(f"🔍 Aplicando dominio externo ampliado:")
-            _logger.info(f"   - Externo propio: {partner.id}")
-            _logger.info(f"   - Comerciales asignados: {len(comerciales_asignados_ids)}")
-            _logger.info(f"   - Clientes de comerciales: {len(clientes_de_comerciales)}")
-            
-            result = super(ResPartner, self).search(args + external_domain, offset, limit, order, count)
-            _logger.info(f"✅ Resultado externo: {result if count else len(result)} registros")
-            if not count:
-                _logger.info(f"- IDs encontrados: {result.ids}")
-            return result
 
         # OTRO ROL
         _logger.info("Usuario sin rol específico")
-        return super(ResPartner, self).search(args + [('id', '=', partner.id)], offset, limit, order, count)
+        return [('id', '=', profile.partner_id)]
+
+    @api.model
+    def search(self, args, offset=0, limit=None, order=None, count=False):
+        """
+        Filtros personalizados de visibilidad por rol.
+        """
+        if self._skip_visibility_filters():
+            _logger.info(f"🔓 Contexto especial detectado - búsqueda sin restricciones")
+            return super(ResPartner, self).search(args, offset=offset, limit=limit, order=order, count=count)
+
+        profile = self._get_acting_profile()
+
+        # Llamada interna de search_read: args ya incluye el dominio de
+        # visibilidad y la medición es la de search_read
+        nested = claim_nested_search(self.env, self._name, args)
+        if nested is not None:
+            result, nested['branch'], nested['model'], nested['final_domain'] = self._search_visible(
+                profile, args, offset, limit, order, count,
+            )
+            return result
+
+        _logger.info(f"===== SEARCH llamado por {profile} =====")
+        probe = VisibilityProbe(self.env, self._name, 'search')
+        visibility_domain = []
+        if not profile.is_admin:
+            with probe.stage('build'):
+                visibility_domain = self._get_visibility_domain(profile)
+
+        with probe.stage('final'):
+            result, branch, model, final_domain = self._search_visible(
+                profile, args + visibility_domain, offset, limit, order, count,
+            )
+        probe.record(profile, visibility_domain, result if count else len(result), branch)
+        if branch != 'admin':
+            probe.capture_if_slow(model, final_domain, offset, limit, order, profile, count)
+        _logger.info(f"✅ Resultado ({branch}): {result if count else len(result)} registros")
+        return result
+
+    def _search_visible(self, profile, domain, offset, limit, order, count):
+        """
+        Ejecuta la búsqueda con el dominio (que ya incluye el de visibilidad)
+        por la rama del perfil. Devuelve (resultado, rama, modelo, dominio final).
+        """
+        # Admin ve todo
+        if profile.is_admin:
+            _logger.info("Es admin REAL - Sin restricciones")
+            return super(ResPartner, self).search(domain, offset, limit, order, count), 'admin', self, domain
 
+        # COMERCIAL
+        if profile.is_worker:
+            # 🆕 LIMPIAR args que restringen por ID
+            clean_domain = []
+            for item in domain:
+                if isinstance(item, tuple) and len(item) == 3:
+                    field, operator, value = item
+                    if field == 'id' and operator == 'in':
+                        _logger.info(f"🚫 Ignorando restricción externa: {item}")
+                        continue
+                clean_domain.append(item)
 
+            # Llamar a super() con args limpiados y sudo para bypassear record rules
+            result = super(ResPartner, self.sudo()).search(clean_domain, offset=offset, limit=limit, order=order, count=count)
+            return result, 'worker_sudo', self.sudo(), clean_domain
 
+        result = super(ResPartner, self).search(domain, offset, limit, order, count)
+        return result, 'default', self, domain
 
     @api.model
     def search_read(self, domain=None, fields=None, offset=0, limit=None, order=None):
@@ -1072,185 +1290,72 @@ class ResPartner(models.Model):
         if domain is None:
             domain = []
 
-        current_user = self.env.user
-        
-        # 🆕 CRÍTICO: Evitar recursión en cálculos computados
-        if (self.env.context.get('skip_custom_search') or 
-            self.env.context.get('active_test') is False or
-            self.env.context.get('computing_opportunity_count') or
-            '_compute_' in str(self.env.context)):
+        if self._skip_visibility_filters():
             _logger.info(f"🔓 Contexto especial detectado en search_read - sin restricciones")
             return super(ResPartner, self).search_read(domain, fields, offset, limit, order)
 
-        _logger.info(f"SEARCH_READ llamado por usuario {current_user.name}")
+        profile = self._get_acting_profile()
+        _logger.info(f"SEARCH_READ llamado por {profile}")
 
+        probe = VisibilityProbe(self.env, self._name, 'search_read')
+        visibility_domain = []
         # Admin ve todo
-        if self.env.is_admin():
-            _logger.info("Es admin - Sin restricciones")
-            return super(ResPartner, self).search_read(domain, fields, offset, limit, order)
-
-        if not current_user.partner_id:
-            _logger.warning(f"Usuario sin partner_id asociado")
-            return super(ResPartner, self).search_read(domain + [('id', '=', False)], fields, offset, limit, order)
-
-        partner = current_user.partner_id
-        _logger.info(f"- Roles: worker={partner.worker}, supervisor={partner.supervisor}, external={partner.external}")
-
-        # COMERCIAL
-        if partner.worker:
-            _logger.info(f"COMERCIAL search_read - Usuario {partner.name}")
-            worker_domain = [
-                '|', 
-                ('id', '=', partner.id),
-                ('comercial_asignado_id', '=', partner.id)
-            ]
-            _logger.info(f"Worker domain: {worker_domain}")
-            return super(ResPartner, self).search_read(domain + worker_domain, fields, offset, limit, order)
-
-        # SUPERVISOR
-        if partner.supervisor:
-            _logger.info(f"SUPERVISOR search_read - Usuario {partner.name}")
-            
-            # Obtener IDs de comerciales
-            comerciales_ids = self.env['res.partner'].sudo().search([
-                ('worker', '=', True),
-                ('department', 'in', partner.department.ids),
-                ('internal_company_id', '=', partner.internal_company_id.id)
-            ]).ids
-            _logger.info(f"- Comerciales encontrados: {len(comerciales_ids)}")
-
-            # Obtener IDs de clientes creados por comerciales
-            clientes_por_comerciales = self.env['res.partner'].sudo().search([
-                ('worker', '=', False),
-                ('supervisor', '=', False),
-                ('external', '=', False),
-                ('create_uid.partner_id', 'in', comerciales_ids),
-                ('internal_company_id', '=', partner.internal_company_id.id)
-            ]).ids
-
-            # Obtener clientes creados por el supervisor mismo
-            clientes_por_supervisor = self.env['res.partner'].sudo().search([
-                ('worker', '=', False),
-                ('supervisor', '=', False),
-                ('external', '=', False),
-                ('create_uid', '=', current_user.id),
-                ('internal_company_id', '=', partner.internal_company_id.id)
-            ]).ids
-
-            # 🆕 OBTENER EXTERNOS QUE TIENE ASIGNADOS ESTE SUPERVISOR
-            externos_supervisados_ids = self.env['res.partner'].sudo().search([
-                ('external', '=', True),
-                ('supervisores_ids', 'in', [partner.id])
-            ]).ids
-            _logger.info(f"- Externos supervisados: {len(externos_supervisados_ids)}")
+        if not profile.is_admin:
+            with probe.stage('build'):
+                visibility_domain = self._get_visibility_domain(profile)
+        full_domain = domain + visibility_domain
+        with probe.stage('final'), nested_search(self.env, self._name, full_domain) as nested:
+            result = super(ResPartner, self).search_read(full_domain, fields, offset, limit, order)
+        probe.record(profile, visibility_domain, len(result), nested['branch'])
+        if nested['branch'] not in (None, 'admin'):
+            probe.capture_if_slow(nested['model'], nested['final_domain'], offset, limit, order, profile)
+        return result
 
-            # 🆕 OBTENER COMERCIALES DE LOS EXTERNOS SUPERVISADOS
-            comerciales_de_externos = []
-            clientes_de_externos = []
-            
-            if externos_supervisados_ids:
-                # Comerciales asignados a los externos supervisados
-                for externo in self.env['res.partner'].browse(externos_supervisados_ids):
-                    comerciales_de_externos.extend(externo.comerciales_asignados_ids.ids)
-                
-                comerciales_de_externos = list(set(comerciales_de_externos))
-                _logger.info(f"- Comerciales de externos supervisados: {len(comerciales_de_externos)}")
-                
-                # Clientes de los comerciales de los externos supervisados
-                if comerciales_de_externos:
-                    clientes_de_externos = self.env['res.partner'].sudo().search([
-                        ('worker', '=', False),
-                        ('supervisor', '=', False),
-                        ('external', '=', False),
-                        ('create_uid.partner_id', 'in', comerciales_de_externos)
-                    ]).ids
-                    _logger.info(f"- Clientes de comerciales de externos: {len(clientes_de_externos)}")
 
-            # Combinar todos los tipos de clientes
-            todos_clientes_ids = list(set(clientes_por_comerciales + clientes_por_supervisor + clientes_de_externos))
-            _logger.info(f"- Total clientes visibles: {len(todos_clientes_ids)}")
+    # -------------------------
+    # PANEL DE BÚSQUEDA
+    # -------------------------
 
-            # 🆕 CONSTRUIR DOMINIO AMPLIADO PARA SUPERVISOR - ESTRUCTURA CORREGIDA
-            supervisor_domain = [
-                '|',  # OR principal
-                '|',  # Segundo nivel OR
-                '|',  # Tercer nivel OR  
-                '|',  # Cuarto nivel OR
-                '|',  # Quinto nivel OR
-                # Opción 1: El propio supervisor
-                ('id', '=', partner.id),
-                # Opción 2: Comerciales de su departamento/empresa
-                '&', '&',
-                ('worker', '=', True),
-                ('department', 'in', partner.department.ids),
-                ('internal_company_id', '=', partner.internal_company_id.id),
-                # Opción 3: Clientes de su equipo
-                '&', '&', '&',
-                ('worker', '=', False),
-                ('supervisor', '=', False),
-                ('external', '=', False),
-                ('id', 'in', todos_clientes_ids if todos_clientes_ids else [False]),
-                # Opción 4: Externos que supervisa
-                '&',
-                ('external', '=', True),
-                ('id', 'in', externos_supervisados_ids),
-                # Opción 5: Comerciales de los externos que supervisa
-                '&',
-                ('worker', '=', True),
-                ('id', 'in', comerciales_de_externos if comerciales_de_externos else [False]),
-                # Opción 6: Clientes de los comerciales de los externos que supervisa
-                '&', '&', '&',
-                ('worker', '=', False),
-                ('supervisor', '=', False),
-                ('external', '=', False),
-                ('id', 'in', clientes_de_externos if clientes_de_externos else [False])
-            ]
+    # Campos cuyos valores y contadores del panel se cachean por usuario
+    _SEARCH_PANEL_CACHED_FIELDS = ('department',)
+    # Campos de contacto de los que dependen esos contadores (departamento,
+    # archivado y visibilidad por rol); solo su escritura invalida la caché
+    _SEARCH_PANEL_FIELDS = (
+        'active', 'department', 'worker', 'supervisor', 'external', 'internal_company_id', 'company_id',
+        'comercial_asignado_id', 'supervisor_externo_id', 'comerciales_asignados_ids', 'supervisores_ids',
+    )
 
-            _logger.info(f"Aplicando dominio supervisor ampliado en search_read")
-            return super(ResPartner, self).search_read(domain + supervisor_domain, fields, offset, limit, order)
+    def init(self):
+        super().init()
+        search_panel_cache.create_generation_sequence(self._cr)
+
+    def _search_panel_cache_key(self, method, field_name, kwargs):
+        """Clave del panel: usuario, su versión de visibilidad (perfil) y argumentos."""
+        profile = self._get_acting_profile()
+        return (
+            self.env.cr.dbname, self._name, method, field_name,
+            self.env.uid, tuple(self.env.companies.ids), self.env.lang,
+            profile.is_admin, profile.role, profile.department_ids, profile.company_id,
+            profile.comercial_ids, profile.supervisor_ids,
+            repr(sorted(kwargs.items())),
+        )
 
-        # EXTERNO
-        if partner.external:
-            _logger.info(f"EXTERNO search_read - Usuario {partner.name}")
-            
-            # 🆕 OBTENER CLIENTES DE LOS COMERCIALES ASIGNADOS (solo de misma empresa)
-            comerciales_asignados_ids = partner.comerciales_asignados_ids.ids
-            _logger.info(f"- Comerciales asignados: {comerciales_asignados_ids}")
-            
-            if comerciales_asignados_ids:
-                # Obtener IDs de clientes creados por los comerciales asignados
-                clientes_de_comerciales = self.env['res.partner'].sudo().search([
-                    ('worker', '=', False),
-                    ('supervisor', '=', False),
-                    ('external', '=', False),
-                    ('create_uid.partner_id', 'in', comerciales_asignados_ids),
-                    ('internal_company_id', '=', partner.internal_company_id.id)  # 🆕 Solo clientes de misma empresa
-                ]).ids
-                _logger.info(f"- Clientes de comerciales asignados: {len(clientes_de_comerciales)}")
-            else:
-                clientes_de_comerciales = []
-            
-            # 🆕 DOMINIO PARA EXTERNOS AMPLIADO - CORREGIDO
-            external_domain = [
-                '|',  # Primer OR
-                '|',  # Segundo OR  
-                ('id', '=', partner.id),  # Opción 1: El propio externo
-                ('id', 'in', comerciales_asignados_ids),  # Opción 2: Comerciales asignados
-                '&', '&', '&', '&',  # Opción 3: Clientes de comerciales (todos estos deben ser True)
-                ('worker', '=', False),
-                ('supervisor', '=', False),
-                ('external', '=', False),
-                ('internal_company_id', '=', partner.internal_company_id.id),
-                ('id', 'in', clientes_de_comerciales if clientes_de_comerciales else [False])
-            ]
-            
-            _logger.info(f"🔍 Aplicando dominio externo ampliado en search_read")
-            _logger.info(f"   - Externo: {partner.id}")
-            _logger.info(f"   - Comerciales asignados: {len(comerciales_asignados_ids)}")
-            _logger.info(f"   - Clientes de comerciales: {len(clientes_de_comerciales)}")
-            
-            return super(ResPartner, self).search_read(domain + external_domain, fields, offset, limit, order)
+    @api.model
+    def search_panel_select_range(self, field_name, **kwargs):
+        if field_name not in self._SEARCH_PANEL_CACHED_FIELDS or self._skip_visibility_filters():
+            return super().search_panel_select_range(field_name, **kwargs)
+        return search_panel_cache.cached(
+            self.env,
+            self._search_panel_cache_key('select_range', field_name, kwargs),
+            lambda: super(ResPartner, self).search_panel_select_range(field_name, **kwargs),
+        )
 
-        # OTRO ROL
-        _logger.info("Usuario sin rol específico")
-        return super(ResPartner, self).search_read(domain + [('id', '=', partner.id)], fields, offset, limit, order)
\ No newline at end of file
+    @api.model
+    def search_panel_select_multi_range(self, field_name, **kwargs):
+        if field_name not in self._SEARCH_PANEL_CACHED_FIELDS or self._skip_visibility_filters():
+            return super().search_panel_select_multi_range(field_name, **kwargs)
+        return search_panel_cache.cached(
+            self.env,
+            self._search_panel_cache_key('select_multi_range', field_name, kwargs),
+            lambda: super(ResPartner, self).search_panel_select_multi_range(field_name, **kwargs),
+        )
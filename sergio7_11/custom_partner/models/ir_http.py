@@ -0,0 +1,51 @@
+import logging
+import threading
+from functools import partial
+
+from odoo import api, models, SUPERUSER_ID
+from odoo.http import request
+
+from .perf_sampler import SKIPPED_PATH_PREFIXES, StackSampler
+
+_logger = logging.getLogger(__name__)
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _dispatch(cls, endpoint):
+        """Perfila por muestreo las peticiones del usuario con un perf.profile activo."""
+        armed = None
+        if request.env.uid and not request.httprequest.path.startswith(SKIPPED_PATH_PREFIXES):
+            armed = request.env['perf.profile'].sudo()._get_armed_profile(request.env.uid)
+        if not armed:
+            return super()._dispatch(endpoint)
+
+        profile_id, interval = armed
+        sampler = StackSampler(threading.get_ident(), interval)
+        sampler.start()
+        try:
+            return super()._dispatch(endpoint)
+        finally:
+            stacks = sampler.stop()
+            # Tras cerrar la transacción de la petición: si esta modifica el
+            # propio perfil (detenerlo, editarlo), bloquear la fila antes se
+            # bloquearía a sí misma. Las peticiones que fallan (rollback)
+            # también se guardan: suelen ser las lentas
+            store = partial(
+                cls._store_profile_samples, request.env.registry, profile_id,
+                request.httprequest.path, stacks, sampler.samples, sampler.elapsed,
+            )
+            request.env.cr.postcommit.add(store)
+            request.env.cr.postrollback.add(store)
+
+    @classmethod
+    def _store_profile_samples(cls, registry, profile_id, path, stacks, samples, elapsed):
+        # Cursor propio: la transacción de la petición ya está cerrada
+        try:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env['perf.profile'].browse(profile_id)._add_request_samples(path, stacks, samples, elapsed)
+        except Exception as e:
+            _logger.warning(f"⚠️ No se pudieron guardar las muestras del perfil {profile_id}: {e}")
@@ -0,0 +1,63 @@
+from odoo import models, fields, api
+import logging
+
+from . import search_panel_cache
+
+_logger = logging.getLogger(__name__)
+
+
+class PartnerDepartment(models.Model):
+    _inherit = 'res.partner.department'
+
+    worker_count = fields.Integer(string='Comerciales', readonly=True, default=0)
+    supervisor_count = fields.Integer(string='Supervisores', readonly=True, default=0)
+    client_count = fields.Integer(string='Clientes', readonly=True, default=0)
+
+    @api.model
+    def _refresh_counters(self, department_ids=None):
+        super()._refresh_counters(department_ids)
+        relation = self.env['res.partner']._fields['department']
+        self.env['res.partner'].flush_model(['active', 'worker', 'supervisor', 'external', 'department'])
+        where = "WHERE dep.id = ANY(%(ids)s)" if department_ids is not None else ""
+        self.env.cr.execute(f"""
+            UPDATE res_partner_department d
+               SET worker_count = c.worker_count,
+                   supervisor_count = c.supervisor_count,
+                   client_count = c.client_count
+              FROM (SELECT dep.id AS department_id,
+                           COUNT(p.id) FILTER (WHERE p.worker) AS worker_count,
+                           COUNT(p.id) FILTER (WHERE p.supervisor) AS supervisor_count,
+                           COUNT(p.id) FILTER (
+                               WHERE p.worker IS NOT TRUE
+                                 AND p.supervisor IS NOT TRUE
+                                 AND p.external IS NOT TRUE
+                           ) AS client_count
+                      FROM res_partner_department dep
+                 LEFT JOIN {relation.relation} r ON r.{relation.column2} = dep.id
+                 LEFT JOIN res_partner p ON p.id = r.{relation.column1} AND p.active
+                           {where}
+                  GROUP BY dep.id) c
+             WHERE d.id = c.department_id
+        """, {'ids': list(department_ids or [])})
+        _logger.info(f"🔢 Contadores de contactos actualizados: {self.env.cr.rowcount} departamentos")
+        self.invalidate_model(['worker_count', 'supervisor_count', 'client_count'])
+
+    # Campos de los departamentos que se ven en el panel de búsqueda de contactos
+    _SEARCH_PANEL_FIELDS = ('name', 'parent_id', 'active', 'company_id')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        departments = super().create(vals_list)
+        search_panel_cache.bump_generation(self.env)
+        return departments
+
+    def write(self, vals):
+        result = super().write(vals)
+        if any(fname in vals for fname in self._SEARCH_PANEL_FIELDS):
+            search_panel_cache.bump_generation(self.env)
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        search_panel_cache.bump_generation(self.env)
+        return result
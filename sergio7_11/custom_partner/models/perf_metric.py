@@ -0,0 +1,24 @@
+from odoo import models, fields
+
+
+class PerfMetric(models.Model):
+    """Series de métricas acumuladas por todos los workers (ver perf_metrics)."""
+    _name = 'perf.metric'
+    _description = 'Métricas de rendimiento agregadas'
+    _order = 'family, series, labels'
+    _log_access = False
+
+    family = fields.Char(string='Familia', required=True, index=True)
+    series = fields.Char(string='Serie', required=True)
+    labels = fields.Char(string='Etiquetas', default='')
+    value = fields.Float(string='Valor', default=0.0)
+
+    _sql_constraints = [
+        ('series_labels_uniq', 'unique(series, labels)', 'Cada serie con sus etiquetas debe ser única.'),
+    ]
+
+    def action_reset(self):
+        """Pone a cero todas las métricas."""
+        self.env.cr.execute("DELETE FROM perf_metric")
+        self.invalidate_model()
+        return True
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+_logger = logging.getLogger(__name__)
+
+# Familias de métricas: nombre -> (tipo, ayuda)
+METRICS = {
+    'custom_partner_create_seconds': ('histogram', 'Duración de res.partner.create por rol del usuario'),
+    'custom_partner_write_seconds': ('histogram', 'Duración de res.partner.write por rol del usuario'),
+    'custom_visibility_search_seconds': ('histogram', 'Duración de las búsquedas con filtros de visibilidad'),
+    'custom_crm_lead_create_seconds': ('histogram', 'Duración de crm.lead.create por rol del usuario'),
+    'custom_crm_lead_write_seconds': ('histogram', 'Duración de crm.lead.write por rol del usuario'),
+    'custom_crm_tag_upserts_total': ('counter', 'Etiquetas de departamento encontradas o creadas'),
+    'custom_partner_duplicate_hits_total': ('counter', 'Duplicados de NIF/teléfono/móvil detectados'),
+    'custom_crm_expected_revenue_recomputes_total': ('counter', 'Oportunidades con ingreso esperado recalculado'),
+}
+
+# Límites (segundos) de los histogramas
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Cada worker vuelca sus incrementos a la tabla como mucho cada FLUSH_INTERVAL segundos
+FLUSH_INTERVAL = 10.0
+
+# Incrementos pendientes de este proceso: (familia, serie, etiquetas) -> valor
+_pending = defaultdict(float)
+_pending_lock = threading.Lock()
+_last_flush = [0.0]
+# Temporizador de volcado pendiente de este proceso (como mucho uno)
+_flush_timer = [None]
+
+# Clave en cr.postcommit.data para programar un único volcado por transacción
+_FLUSH_DATA_KEY = 'custom_partner.metrics_flush'
+
+
+def _format_labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+def inc(env, name, value=1, **labels):
+    """Incrementa un contador."""
+    with _pending_lock:
+        _pending[(name, name, _format_labels(labels))] += value
+    _schedule_flush(env)
+
+
+def observe(env, name, seconds, **labels):
+    """Registra una observación en un histograma (buckets acumulados, suma y total)."""
+    with _pending_lock:
+        for bucket in HISTOGRAM_BUCKETS:
+            if seconds <= bucket:
+                _pending[(name, f"{name}_bucket", _format_labels(dict(labels, le=bucket)))] += 1
+        _pending[(name, f"{name}_bucket", _format_labels(dict(labels, le='+Inf')))] += 1
+        _pending[(name, f"{name}_sum", _format_labels(labels))] += seconds
+        _pending[(name, f"{name}_count", _format_labels(labels))] += 1
+    _schedule_flush(env)
+
+
+class timed:
+    """Contexto que observa la duración del bloque en un histograma."""
+
+    __slots__ = ('env', 'name', 'labels', 'start')
+
+    def __init__(self, env, name, **labels):
+        self.env = env
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        observe(self.env, self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def _schedule_flush(env):
+    """Programa un único volcado tras el commit de la transacción."""
+    data = env.cr.postcommit.data
+    if _FLUSH_DATA_KEY not in data:
+        data[_FLUSH_DATA_KEY] = True
+        env.cr.postcommit.add(partial(_flush_after_commit, env.registry))
+
+
+def _flush_after_commit(registry):
+    """
+    Vuelca si ha pasado el intervalo. Si no, deja un temporizador para el
+    resto del intervalo: lo pendiente no espera a que llegue otro evento al
+    mismo worker.
+    """
+    wait = FLUSH_INTERVAL - (time.monotonic() - _last_flush[0])
+    if wait <= 0:
+        flush(registry)
+        return
+    with _pending_lock:
+        if _flush_timer[0] is None:
+            timer = threading.Timer(wait, _flush_from_timer, [registry])
+            timer.daemon = True
+            _flush_timer[0] = timer
+            timer.start()
+
+
+def _flush_from_timer(registry):
+    with _pending_lock:
+        _flush_timer[0] = None
+    flush(registry)
+
+
+def flush(registry):
+    """
+    Suma los incrementos pendientes de este proceso a la tabla compartida
+    perf_metric, con un cursor propio. Si falla, se conservan para el siguiente.
+    """
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush[0] = time.monotonic()
+    if not pending:
+        return
+    try:
+        with registry.cursor() as cr:
+            for (family, series, labels), value in sorted(pending.items()):
+                cr.execute("""
+                    INSERT INTO perf_metric (family, series, labels, value)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (series, labels)
+                    DO UPDATE SET value = perf_metric.value + EXCLUDED.value
+                """, [family, series, labels, value])
+    except Exception as e:
+        _logger.warning(f"⚠️ No se pudieron volcar {len(pending)} series de métricas: {e}")
+        with _pending_lock:
+            for key, value in pending.items():
+                _pending[key] += value
+
+
+def render(cr):
+    """Todas las series de la tabla en formato de exposición de Prometheus."""
+    cr.execute("SELECT family, series, labels, value FROM perf_metric ORDER BY family, series, labels")
+    lines = []
+    current_family = None
+    for family, series, labels, value in cr.fetchall():
+        if family != current_family:
+            current_family = family
+            kind, help_text = METRICS.get(family, ('untyped', family))
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+        lines.append(f"{series}{{{labels}}} {value:g}" if labels else f"{series} {value:g}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from odoo import api, fields, SUPERUSER_ID
+from odoo.tools import str2bool
+
+from . import perf_metrics
+
+_logger = logging.getLogger(__name__)
+
+# Parámetros del sistema que activan la instrumentación y su persistencia
+PROBE_ENABLED_PARAM = 'custom_partner.perf_probe'
+PROBE_PERSIST_PARAM = 'custom_partner.perf_probe_persist'
+
+# Muestras en memoria de este proceso (cada worker tiene su propio buffer)
+BUFFER_SIZE = 1000
+SAMPLES = deque(maxlen=BUFFER_SIZE)
+_samples_lock = threading.Lock()
+
+# Clave en cr.postcommit.data con las muestras pendientes de guardar
+_PENDING_DATA_KEY = 'custom_partner.perf_samples'
+
+# Clave en cr.cache con la llamada a search que hace search_read por dentro
+_NESTED_SEARCH_KEY = 'custom_partner.nested_visibility_search'
+
+
+def get_samples(limit=None):
+    """Copia de las muestras del buffer, de la más reciente a la más antigua."""
+    with _samples_lock:
+        samples = list(SAMPLES)
+    samples.reverse()
+    return samples[:limit] if limit else samples
+
+
+def clear_samples():
+    with _samples_lock:
+        SAMPLES.clear()
+
+
+def id_list_sizes(domain):
+    """(total, máximo) de ids en las hojas 'in'/'not in' del dominio."""
+    sizes = [
+        len(leaf[2]) for leaf in domain
+        if isinstance(leaf, (list, tuple)) and len(leaf) == 3
+        and leaf[1] in ('in', 'not in') and isinstance(leaf[2], (list, tuple))
+    ]
+    return sum(sizes), max(sizes, default=0)
+
+
+@contextmanager
+def nested_search(env, model_name, domain):
+    """
+    Marca la llamada a search que hace search_read con este mismo dominio
+    (que ya incluye el de visibilidad): esa llamada no vuelve a construirlo
+    ni se mide, y anota en la marca la rama, el modelo y el dominio finales.
+    """
+    marker = {'model_name': model_name, 'domain': domain, 'branch': None, 'model': None, 'final_domain': None}
+    env.cr.cache[_NESTED_SEARCH_KEY] = marker
+    try:
+        yield marker
+    finally:
+        env.cr.cache.pop(_NESTED_SEARCH_KEY, None)
+
+
+def claim_nested_search(env, model_name, domain):
+    """
+    Marca de nested_search si esta llamada es la anidada: mismo objeto
+    dominio (search_read lo pasa tal cual, salvo si está vacío, que solo
+    ocurre para administradores).
+    """
+    marker = env.cr.cache.get(_NESTED_SEARCH_KEY)
+    if (marker and marker['model_name'] == model_name
+            and (marker['domain'] is domain or not (marker['domain'] or domain))):
+        del env.cr.cache[_NESTED_SEARCH_KEY]
+        return marker
+    return None
+
+
+class _Stage:
+    __slots__ = ('probe', 'name', 'start', 'queries')
+
+    def __init__(self, probe, name):
+        self.probe = probe
+        self.name = name
+
+    def __enter__(self):
+        self.queries = self.probe.cr.sql_log_count
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.probe.stages[self.name] = (
+            (time.perf_counter() - self.start) * 1000,
+            self.probe.cr.sql_log_count - self.queries,
+        )
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class VisibilityProbe:
+    """
+    Mide una llamada a search/search_read con filtros de visibilidad: tiempo
+    y consultas construyendo el dominio, tamaño de las listas de ids y
+    tiempo de la consulta final. Si la instrumentación está desactivada solo
+    exporta la duración total como métrica.
+    """
+
+    __slots__ = ('env', 'cr', 'model', 'method', 'enabled', 'stages', 'start', 'elapsed_ms')
+
+    def __init__(self, env, model, method):
+        self.env = env
+        self.cr = env.cr
+        self.model = model
+        self.method = method
+        self.enabled = str2bool(env['ir.config_parameter'].sudo().get_param(PROBE_ENABLED_PARAM, 'False'))
+        self.stages = {}
+        self.start = time.perf_counter()
+        self.elapsed_ms = 0.0
+
+    def stage(self, name):
+        """Contexto que mide una fase ('build' o 'final')."""
+        return _Stage(self, name) if self.enabled else _NO_STAGE
+
+    def record(self, profile, domain, rows, branch):
+        # La latencia por rol se exporta siempre como métrica
+        elapsed = time.perf_counter() - self.start
+        self.elapsed_ms = elapsed * 1000
+        perf_metrics.observe(
+            self.env, 'custom_visibility_search_seconds', elapsed,
+            model=self.model, method=self.method, role='admin' if profile.is_admin else (profile.role or 'other'),
+        )
+        if not self.enabled:
+            return
+        build_ms, subqueries = self.stages.get('build', (0.0, 0))
+        final_ms, final_queries = self.stages.get('final', (0.0, 0))
+        id_list_total, id_list_max = id_list_sizes(domain or [])
+        sample = {
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'pid': os.getpid(),
+            'uid': profile.uid,
+            'role': profile.role or 'other',
+            'branch': branch,
+            'model': self.model,
+            'method': self.method,
+            'build_ms': round(build_ms, 3),
+            'subqueries': subqueries,
+            'id_list_total': id_list_total,
+            'id_list_max': id_list_max,
+            'final_ms': round(final_ms, 3),
+            'final_queries': final_queries,
+            'rows': rows,
+        }
+        with _samples_lock:
+            SAMPLES.append(sample)
+
+        if str2bool(self.env['ir.config_parameter'].sudo().get_param(PROBE_PERSIST_PARAM, 'False')):
+            data = self.cr.postcommit.data
+            if _PENDING_DATA_KEY not in data:
+                data[_PENDING_DATA_KEY] = []
+                registry = self.env.registry
+                self.cr.postcommit.add(lambda: _persist_samples(registry, data.pop(_PENDING_DATA_KEY, [])))
+            data[_PENDING_DATA_KEY].append(sample)
+
+    def capture_if_slow(self, model, domain, offset, limit, order, profile, count=False):
+        """Tras record(): si la búsqueda superó el umbral, la guarda en perf.slow.search."""
+        SlowSearch = self.env['perf.slow.search']
+        threshold_ms = SlowSearch._get_threshold_ms()
+        if threshold_ms and self.elapsed_ms >= threshold_ms:
+            SlowSearch.sudo()._capture(
+                model, domain, offset, limit, order, self.elapsed_ms, profile, self.method, count,
+            )
+
+
+def _persist_samples(registry, samples):
+    """Tras el commit: guarda las muestras de la transacción con un cursor propio."""
+    if not samples:
+        return
+    try:
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['res.partner.perf.sample'].create([
+                {
+                    'date': sample['date'],
+                    'pid': sample['pid'],
+                    'user_id': sample['uid'],
+                    'role': sample['role'],
+                    'branch': sample['branch'],
+                    'model_name': sample['model'],
+                    'method': sample['method'],
+                    'build_ms': sample['build_ms'],
+                    'subqueries': sample['subqueries'],
+                    'id_list_total': sample['id_list_total'],
+                    'id_list_max': sample['id_list_max'],
+                    'final_ms': sample['final_ms'],
+                    'final_queries': sample['final_queries'],
+                    'rows': sample['rows'],
+                }
+                for sample in samples
+            ])
+    except Exception as e:
+        _logger.warning(f"⚠️ No se pudieron guardar {len(samples)} muestras de rendimiento: {e}")
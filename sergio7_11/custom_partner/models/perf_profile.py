@@ -0,0 +1,108 @@
+import base64
+import logging
+import time
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+from .perf_sampler import format_collapsed, parse_collapsed
+
+_logger = logging.getLogger(__name__)
+
+# Perfiles armados por usuario en este proceso: {'expires': t, 'users': {uid: (id, intervalo)}}
+_ARMED_CACHE = {'expires': 0.0, 'users': {}}
+# Segundos que un proceso tarda como mucho en ver un perfil activado o detenido
+ARMED_CACHE_TTL = 5.0
+
+
+class PerfProfile(models.Model):
+    _name = 'perf.profile'
+    _description = 'Perfil de rendimiento por muestreo'
+    _order = 'id desc'
+
+    name = fields.Char(string='Descripción', required=True, default='Perfil')
+    user_id = fields.Many2one('res.users', string='Usuario', required=True, ondelete='cascade')
+    requests_to_profile = fields.Integer(string='Peticiones a perfilar', default=10, required=True)
+    requests_profiled = fields.Integer(string='Peticiones perfiladas', readonly=True)
+    sample_interval_ms = fields.Float(string='Intervalo de muestreo (ms)', default=5.0, required=True)
+    sample_count = fields.Integer(string='Muestras', readonly=True)
+    profiled_seconds = fields.Float(string='Tiempo perfilado (s)', readonly=True)
+    state = fields.Selection(
+        [('draft', 'Borrador'), ('armed', 'Activo'), ('done', 'Terminado')],
+        string='Estado', default='draft', required=True, readonly=True,
+    )
+    request_log = fields.Text(string='Peticiones', readonly=True)
+    collapsed_stacks = fields.Binary(string='Pilas colapsadas', attachment=True, readonly=True)
+    collapsed_filename = fields.Char(compute='_compute_collapsed_filename')
+
+    @api.depends('user_id')
+    def _compute_collapsed_filename(self):
+        for profile in self:
+            profile.collapsed_filename = f"perfil-{profile.id}-{profile.user_id.login or 'usuario'}.collapsed.txt"
+
+    # -------------------------
+    # ACCIONES
+    # -------------------------
+
+    def action_arm(self):
+        for profile in self:
+            if profile.requests_to_profile <= 0 or profile.sample_interval_ms <= 0:
+                raise UserError("Indica un número de peticiones y un intervalo de muestreo positivos.")
+        self.write({'state': 'armed'})
+        _reset_armed_cache()
+        return True
+
+    def action_stop(self):
+        self.filtered(lambda profile: profile.state == 'armed').write({'state': 'done'})
+        _reset_armed_cache()
+        return True
+
+    # -------------------------
+    # REGISTRO DE MUESTRAS
+    # -------------------------
+
+    @api.model
+    def _get_armed_profile(self, uid):
+        """(id, intervalo en s) del perfil activo del usuario, cacheado por proceso."""
+        now = time.monotonic()
+        if now >= _ARMED_CACHE['expires']:
+            self.env.cr.execute("""
+                SELECT DISTINCT ON (user_id) user_id, id, sample_interval_ms
+                  FROM perf_profile
+                 WHERE state = 'armed'
+              ORDER BY user_id, id
+            """)
+            _ARMED_CACHE['users'] = {
+                user_id: (profile_id, interval_ms / 1000.0)
+                for user_id, profile_id, interval_ms in self.env.cr.fetchall()
+            }
+            _ARMED_CACHE['expires'] = now + ARMED_CACHE_TTL
+        return _ARMED_CACHE['users'].get(uid)
+
+    def _add_request_samples(self, path, stacks, samples, elapsed):
+        """Suma las pilas de una petición al perfil (con el registro bloqueado)."""
+        self.ensure_one()
+        self.env.cr.execute("SELECT state FROM perf_profile WHERE id = %s FOR UPDATE", [self.id])
+        row = self.env.cr.fetchone()
+        if not row or row[0] != 'armed':
+            return
+
+        merged = parse_collapsed(base64.b64decode(self.collapsed_stacks).decode() if self.collapsed_stacks else '')
+        merged.update(stacks)
+        requests_profiled = self.requests_profiled + 1
+        log_line = f"{path} {elapsed * 1000:.0f} ms, {samples} muestras"
+        self.write({
+            'collapsed_stacks': base64.b64encode(format_collapsed(merged).encode()),
+            'requests_profiled': requests_profiled,
+            'sample_count': self.sample_count + samples,
+            'profiled_seconds': self.profiled_seconds + elapsed,
+            'request_log': f"{self.request_log}\n{log_line}" if self.request_log else log_line,
+            'state': 'done' if requests_profiled >= self.requests_to_profile else 'armed',
+        })
+        if requests_profiled >= self.requests_to_profile:
+            _reset_armed_cache()
+            _logger.info(f"🔬 Perfil {self.id} terminado: {requests_profiled} peticiones")
+
+
+def _reset_armed_cache():
+    _ARMED_CACHE['expires'] = 0.0
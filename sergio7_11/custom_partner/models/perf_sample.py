@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+
+class PartnerPerfSample(models.Model):
+    _name = 'res.partner.perf.sample'
+    _description = 'Muestra de rendimiento de los filtros de visibilidad'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    # Días que se conservan las muestras
+    _RETENTION_DAYS = 7
+
+    date = fields.Datetime(string='Fecha', required=True, index=True)
+    pid = fields.Integer(string='Proceso')
+    user_id = fields.Many2one('res.users', string='Usuario', ondelete='cascade')
+    role = fields.Char(string='Rol')
+    branch = fields.Char(string='Rama', index=True)
+    model_name = fields.Char(string='Modelo')
+    method = fields.Char(string='Método')
+    build_ms = fields.Float(string='Construcción (ms)', digits=(16, 3))
+    subqueries = fields.Integer(string='Subconsultas')
+    id_list_total = fields.Integer(string='Ids en el dominio')
+    id_list_max = fields.Integer(string='Lista de ids más larga')
+    final_ms = fields.Float(string='Consulta final (ms)', digits=(16, 3))
+    final_queries = fields.Integer(string='Consultas finales')
+    rows = fields.Integer(string='Filas')
+
+    @api.autovacuum
+    def _gc_samples(self):
+        limit = fields.Datetime.now() - timedelta(days=self._RETENTION_DAYS)
+        self.search([('date', '<', limit)]).unlink()
@@ -0,0 +1,69 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Rutas del servidor que no se perfilan (conexiones largas)
+SKIPPED_PATH_PREFIXES = ('/websocket', '/longpolling', '/web/static', '/custom_partner/perf')
+
+
+class StackSampler(threading.Thread):
+    """
+    Perfilador por muestreo: cada interval segundos lee la pila del hilo
+    indicado (sys._current_frames) y acumula pilas colapsadas
+    ("raíz;...;hoja" -> muestras), el formato que usan los flamegraphs.
+    """
+
+    def __init__(self, thread_ident, interval=0.005, max_depth=128):
+        super().__init__(name=f"stack-sampler-{thread_ident}", daemon=True)
+        self.thread_ident = thread_ident
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self.started_at = None
+        self.elapsed = 0.0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        super().start()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_ident)
+            if frame is None:
+                break
+            self.stacks[self._collapse(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.elapsed = time.perf_counter() - self.started_at
+        return self.stacks
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            filename = '/'.join(code.co_filename.rsplit(os.sep, 2)[-2:])
+            names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+
+def parse_collapsed(text):
+    """Texto colapsado -> Counter."""
+    stacks = Counter()
+    for line in (text or '').splitlines():
+        stack, _sep, count = line.rpartition(' ')
+        if stack and count.isdigit():
+            stacks[stack] += int(count)
+    return stacks
+
+
+def format_collapsed(stacks):
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import re
+import time
+
+from odoo import models, fields, api
+from odoo.tools import str2bool
+
+_logger = logging.getLogger(__name__)
+
+# Último EXPLAIN por huella en este proceso (para no repetirlo en cada captura)
+_last_explained = {}
+_LAST_EXPLAINED_MAX = 1000
+
+# LIMIT/OFFSET literales: cada página de una misma lista daría otra huella
+_LIMIT_OFFSET_RE = re.compile(r'\s+(?:LIMIT|OFFSET)\s+\d+', re.IGNORECASE)
+
+
+class PerfSlowSearch(models.Model):
+    _name = 'perf.slow.search'
+    _description = 'Búsquedas lentas con filtros de visibilidad'
+    _order = 'last_seen desc'
+    _log_access = False
+
+    # Umbral en milisegundos (0 o vacío = captura desactivada)
+    _THRESHOLD_PARAM = 'custom_partner.slow_search_ms'
+    # Si es False, se captura la consulta sin EXPLAIN ANALYZE
+    _EXPLAIN_PARAM = 'custom_partner.slow_search_explain'
+    # Segundos entre dos EXPLAIN de la misma huella en un proceso
+    _EXPLAIN_INTERVAL = 3600
+    # Listas de ids más largas que esto se resumen en el dominio guardado
+    _DOMAIN_LIST_PREVIEW = 20
+
+    fingerprint = fields.Char(string='Huella', required=True, readonly=True)
+    model_name = fields.Char(string='Modelo', readonly=True, index=True)
+    method = fields.Char(string='Método', readonly=True)
+    role = fields.Char(string='Rol (última)', readonly=True)
+    user_id = fields.Many2one('res.users', string='Usuario (último)', readonly=True, ondelete='set null')
+    domain = fields.Text(string='Dominio final (último)', readonly=True)
+    query = fields.Text(string='SQL', readonly=True)
+    params_summary = fields.Text(string='Parámetros (tamaños)', readonly=True)
+    explain = fields.Text(string='EXPLAIN (ANALYZE, BUFFERS)', readonly=True)
+    hit_count = fields.Integer(string='Veces', readonly=True)
+    last_duration_ms = fields.Float(string='Última duración (ms)', readonly=True)
+    max_duration_ms = fields.Float(string='Duración máxima (ms)', readonly=True)
+    first_seen = fields.Datetime(string='Primera vez', readonly=True)
+    last_seen = fields.Datetime(string='Última vez', readonly=True)
+
+    _sql_constraints = [
+        ('fingerprint_uniq', 'unique(fingerprint)', 'Ya existe una captura con esta huella.'),
+    ]
+
+    # -------------------------
+    # CAPTURA
+    # -------------------------
+
+    @api.model
+    def _get_threshold_ms(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(self._THRESHOLD_PARAM, '0')
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return 0.0
+
+    @api.model
+    def _summarize_domain(self, domain):
+        leaves = []
+        for leaf in domain:
+            if (isinstance(leaf, (list, tuple)) and len(leaf) == 3
+                    and isinstance(leaf[2], (list, tuple)) and len(leaf[2]) > self._DOMAIN_LIST_PREVIEW):
+                leaf = (leaf[0], leaf[1], f"<{len(leaf[2])} ids: {list(leaf[2][:5])}...>")
+            leaves.append(leaf)
+        return repr(leaves)
+
+    @api.model
+    def _summarize_params(self, params):
+        summary = []
+        for index, param in enumerate(params):
+            if isinstance(param, (list, tuple)):
+                summary.append(f"${index + 1}: lista de {len(param)}")
+            elif isinstance(param, str):
+                summary.append(f"${index + 1}: texto de {len(param)} caracteres")
+            else:
+                summary.append(f"${index + 1}: {type(param).__name__}")
+        return '\n'.join(summary)
+
+    @api.model
+    def _capture(self, model, domain, offset, limit, order, duration_ms, profile, method='search', count=False):
+        """
+        Guarda una búsqueda que ha superado el umbral: dominio final, SQL
+        generado, tamaños de los parámetros y (como mucho una vez por hora y
+        huella) su EXPLAIN (ANALYZE, BUFFERS), ejecutado en un savepoint.
+        Con count=True se captura el COUNT que ejecuta search, sin orden ni
+        paginación.
+        """
+        try:
+            if count:
+                method = f"{method}_count"
+                sql, params = model._search(domain).select('count(1)')
+            else:
+                sql, params = model._search(domain, offset=offset, limit=limit, order=order).select()
+        except Exception as e:
+            _logger.warning(f"⚠️ No se pudo generar el SQL de la búsqueda lenta: {e}")
+            return
+
+        fingerprint_sql = _LIMIT_OFFSET_RE.sub('', sql)
+        fingerprint = hashlib.sha1(f"{model._name}|{method}|{fingerprint_sql}".encode()).hexdigest()
+        explain = None
+        explain_enabled = str2bool(self.env['ir.config_parameter'].sudo().get_param(self._EXPLAIN_PARAM, 'True'))
+        now = time.monotonic()
+        if explain_enabled and now - _last_explained.get(fingerprint, -self._EXPLAIN_INTERVAL) >= self._EXPLAIN_INTERVAL:
+            # Al final del dict: se descartan primero las huellas explicadas hace más tiempo
+            _last_explained.pop(fingerprint, None)
+            while len(_last_explained) >= _LAST_EXPLAINED_MAX:
+                del _last_explained[next(iter(_last_explained))]
+            _last_explained[fingerprint] = now
+            try:
+                with self.env.cr.savepoint():
+                    self.env.cr.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                    explain = '\n'.join(row[0] for row in self.env.cr.fetchall())
+            except Exception as e:
+                _logger.warning(f"⚠️ EXPLAIN de la búsqueda lenta fallido: {e}")
+
+        values = [
+            fingerprint, model._name, method, 'admin' if profile.is_admin else (profile.role or 'other'),
+            profile.uid, self._summarize_domain(domain), sql, self._summarize_params(params), explain,
+            duration_ms, duration_ms,
+        ]
+        _logger.warning(
+            f"🐢 Búsqueda lenta en {model._name}.{method} ({duration_ms:.0f} ms) "
+            f"por {profile}: huella {fingerprint[:12]}"
+        )
+        # Cursor propio: la captura sobrevive aunque la petición haga rollback
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute("""
+                    INSERT INTO perf_slow_search (
+                        fingerprint, model_name, method, role, user_id, domain, query,
+                        params_summary, explain, last_duration_ms, max_duration_ms,
+                        hit_count, first_seen, last_seen
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 1,
+                            now() at time zone 'UTC', now() at time zone 'UTC')
+                    ON CONFLICT (fingerprint) DO UPDATE SET
+                        role = EXCLUDED.role,
+                        user_id = EXCLUDED.user_id,
+                        domain = EXCLUDED.domain,
+                        params_summary = EXCLUDED.params_summary,
+                        explain = COALESCE(EXCLUDED.explain, perf_slow_search.explain),
+                        last_duration_ms = EXCLUDED.last_duration_ms,
+                        max_duration_ms = GREATEST(perf_slow_search.max_duration_ms, EXCLUDED.max_duration_ms),
+                        hit_count = perf_slow_search.hit_count + 1,
+                        last_seen = EXCLUDED.last_seen
+                """, values)
+        except Exception as e:
+            _logger.warning(f"⚠️ No se pudo guardar la búsqueda lenta: {e}")
@@ -0,0 +1,90 @@
+import copy
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Secuencia de PostgreSQL con la generación de visibilidad: se incrementa
+# tras cada commit que modifica los campos de contactos o departamentos de
+# los que dependen el panel y la visibilidad
+GENERATION_SEQUENCE = 'custom_partner_visibility_generation_seq'
+
+# Segundos que vive una entrada aunque la generación no cambie (cubre cambios
+# que no pasan por el ORM de contactos: grupos, reglas, usuarios...)
+CACHE_TTL = 300.0
+MAX_ENTRIES = 5000
+
+# Resultados de este proceso: clave -> (generación, caduca, resultado)
+_CACHE = {}
+_cache_lock = threading.Lock()
+
+# Clave en cr.postcommit.data para incrementar la generación una vez por transacción
+_BUMP_DATA_KEY = 'custom_partner.visibility_generation_bump'
+# Clave en cr.cache con la generación leída por este cursor
+_GENERATION_CACHE_KEY = 'custom_partner.visibility_generation'
+
+
+def create_generation_sequence(cr):
+    cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {GENERATION_SEQUENCE}")
+
+
+def current_generation(cr):
+    """Generación actual, leída una sola vez por cursor (una por petición)."""
+    if _GENERATION_CACHE_KEY not in cr.cache:
+        cr.execute(f"SELECT last_value FROM {GENERATION_SEQUENCE}")
+        cr.cache[_GENERATION_CACHE_KEY] = cr.fetchone()[0]
+    return cr.cache[_GENERATION_CACHE_KEY]
+
+
+def bump_generation(env):
+    """Programa el incremento de la generación para después del commit."""
+    cr = env.cr
+    data = cr.postcommit.data
+    if _BUMP_DATA_KEY not in data:
+        data[_BUMP_DATA_KEY] = True
+        registry = env.registry
+        # El mismo cursor vuelve a leer la generación tras su propio cambio
+        cr.cache.pop(_GENERATION_CACHE_KEY, None)
+        cr.postcommit.add(lambda: _bump(registry, data.pop(_BUMP_DATA_KEY, None)))
+
+
+def _bump(registry, pending):
+    # Tras el commit: otro proceso no puede recalcular con datos antiguos
+    # y guardarlos bajo la generación nueva
+    if not pending:
+        return
+    try:
+        with registry.cursor() as cr:
+            cr.execute(f"SELECT nextval('{GENERATION_SEQUENCE}')")
+    except Exception as e:
+        _logger.warning(f"⚠️ No se pudo incrementar la generación de visibilidad: {e}")
+
+
+def cached(env, key, compute):
+    """
+    Resultado de compute() para la clave, reutilizado mientras la generación
+    de visibilidad no cambie y no pase CACHE_TTL.
+    """
+    generation = current_generation(env.cr)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _CACHE.get(key)
+    if entry and entry[0] == generation and entry[1] > now:
+        return copy.deepcopy(entry[2])
+
+    result = compute()
+    with _cache_lock:
+        if len(_CACHE) >= MAX_ENTRIES:
+            # Primero las caducadas; si no basta, se vacía
+            for stale_key in [k for k, (gen, expires, _res) in _CACHE.items() if gen != generation or expires <= now]:
+                del _CACHE[stale_key]
+            if len(_CACHE) >= MAX_ENTRIES:
+                _CACHE.clear()
+        _CACHE[key] = (generation, now + CACHE_TTL, copy.deepcopy(result))
+    return result
+
+
+def clear():
+    with _cache_lock:
+        _CACHE.clear()
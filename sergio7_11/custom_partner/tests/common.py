@@ -0,0 +1,94 @@
+from odoo.tests.common import TransactionCase, new_test_user
+
+
+class CustomPartnerOrgCase(TransactionCase):
+    """
+    Organigrama mínimo (supervisor, externo y comerciales con clientes) que
+    se puede hacer crecer para comprobar que el número de consultas SQL de
+    una operación no depende del volumen de datos.
+    """
+
+    # Grupos de los usuarios del organigrama
+    _user_groups = 'base.group_user,base.group_partner_manager'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+        cls.company = cls.env.company
+        Department = cls.env['res.partner.department']
+        cls.department_root = Department.create({'name': 'QC Comercial', 'company_id': cls.company.id})
+        cls.department = Department.create({
+            'name': 'QC Médico',
+            'parent_id': cls.department_root.id,
+            'company_id': cls.company.id,
+        })
+        cls._user_sequence = 0
+
+        cls.supervisor_user = cls._create_role_user('supervisor', {
+            'supervisor': True,
+            'department': [(6, 0, cls.department_root.ids)],
+        })
+        cls.externo_user = cls._create_role_user('externo', {
+            'external': True,
+            'department': [(6, 0, cls.department.ids)],
+            'supervisores_ids': [(6, 0, cls.supervisor_user.partner_id.ids)],
+        })
+        cls.worker_user = cls._add_comercial()
+
+    @classmethod
+    def _create_role_user(cls, name, partner_vals):
+        cls._user_sequence += 1
+        login = f"qc_{name}_{cls._user_sequence}"
+        user = new_test_user(cls.env, login=login, groups=cls._user_groups, company_id=cls.company.id)
+        user.partner_id.write(dict(partner_vals, internal_company_id=cls.company.id))
+        return user
+
+    @classmethod
+    def _add_comercial(cls, clients=3):
+        """Crea un comercial (asignado al externo) con sus clientes."""
+        user = cls._create_role_user('comercial', {
+            'worker': True,
+            'department': [(6, 0, cls.department.ids)],
+        })
+        cls.externo_user.partner_id.write({'comerciales_asignados_ids': [(4, user.partner_id.id)]})
+        cls.env['res.partner'].with_user(user).create([
+            {'name': f"QC Cliente {user.login} {index}"} for index in range(clients)
+        ])
+        cls._after_add_comercial(user)
+        return user
+
+    @classmethod
+    def _after_add_comercial(cls, user):
+        """Gancho para que otros módulos añadan datos a cada comercial."""
+
+    def _grow_organization(self, comerciales=10):
+        for _index in range(comerciales):
+            self._add_comercial()
+        self.env.flush_all()
+
+    def _count_queries(self, operation):
+        """Número de consultas SQL de operation, con la caché del ORM vacía."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        before = self.cr.sql_log_count
+        operation()
+        self.env.flush_all()
+        return self.cr.sql_log_count - before
+
+    def assertQueryCountStable(self, operation, comerciales=10):
+        """
+        Falla si las consultas de operation crecen al añadir comerciales,
+        clientes y oportunidades (patrones N+1).
+        """
+        operation()  # calentar cachés (ormcache, perfiles, grupos)
+        before_growth = self._count_queries(operation)
+        self._grow_organization(comerciales)
+        operation()
+        after_growth = self._count_queries(operation)
+        self.assertEqual(
+            after_growth, before_growth,
+            f"El número de consultas depende del volumen de datos: "
+            f"{before_growth} antes de crecer, {after_growth} después",
+        )
+        return after_growth
@@ -0,0 +1,64 @@
+from odoo.tests import tagged
+
+from .common import CustomPartnerOrgCase
+
+
+@tagged('post_install', '-at_install')
+class TestPartnerQueryCounts(CustomPartnerOrgCase):
+    """Las operaciones de contactos no deben crecer con el volumen de datos."""
+
+    # -------------------------
+    # BÚSQUEDAS CON VISIBILIDAD
+    # -------------------------
+
+    def _assert_visibility_searches_stable(self, user):
+        Partner = self.env['res.partner'].with_user(user)
+        self.assertQueryCountStable(lambda: Partner.search([]))
+        self.assertQueryCountStable(lambda: Partner.search_read([], ['name', 'email', 'department']))
+
+    def test_search_worker(self):
+        self._assert_visibility_searches_stable(self.worker_user)
+
+    def test_search_supervisor(self):
+        self._assert_visibility_searches_stable(self.supervisor_user)
+
+    def test_search_externo(self):
+        self._assert_visibility_searches_stable(self.externo_user)
+
+    def test_search_admin(self):
+        self._assert_visibility_searches_stable(self.env.ref('base.user_admin'))
+
+    # -------------------------
+    # CREATE / WRITE POR ROL
+    # -------------------------
+
+    def test_create_client_as_worker(self):
+        Partner = self.env['res.partner'].with_user(self.worker_user)
+        self.assertQueryCountStable(lambda: Partner.create({'name': 'QC Cliente nuevo'}))
+
+    def test_create_comercial_as_supervisor(self):
+        Partner = self.env['res.partner'].with_user(self.supervisor_user)
+        self.assertQueryCountStable(lambda: Partner.create({
+            'name': 'QC Comercial nuevo',
+            'worker': True,
+            'department': [(6, 0, self.department.ids)],
+            'internal_company_id': self.company.id,
+        }))
+
+    def test_create_comercial_as_externo(self):
+        Partner = self.env['res.partner'].with_user(self.externo_user)
+        self.assertQueryCountStable(lambda: Partner.create({'name': 'QC Comercial del externo', 'worker': True}))
+
+    def test_write_client_as_worker(self):
+        client = self.env['res.partner'].with_user(self.worker_user).create({'name': 'QC Cliente editado'})
+        self.assertQueryCountStable(lambda: client.write({'phone': '600000000'}))
+
+    def test_write_role_change_as_admin(self):
+        partner = self.env['res.partner'].create({'name': 'QC Cambio de rol'})
+        roles = iter(['worker', 'supervisor'] * 10)
+
+        def change_role():
+            role = next(roles)
+            partner.write({role: True, 'department': [(6, 0, self.department.ids)]})
+
+        self.assertQueryCountStable(change_role)
@@ -0,0 +1 @@
+from . import partner_onboarding
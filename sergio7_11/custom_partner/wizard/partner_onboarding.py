@@ -0,0 +1,334 @@
+import base64
+import csv
+import io
+import logging
+from itertools import islice
+
+_logger = logging.getLogger(__name__)
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class PartnerOnboarding(models.TransientModel):
+    _name = 'custom.partner.onboarding'
+    _description = 'Alta masiva de usuarios y contactos comerciales'
+
+    # Cabeceras admitidas (exportación de res.users en español o nombres técnicos)
+    _COLUMN_ALIASES = {
+        'inicio de sesión': 'login',
+        'login': 'login',
+        'nombre': 'name',
+        'name': 'name',
+        'compañía': 'company',
+        'company': 'company',
+        'company_id': 'company',
+        'idioma': 'lang',
+        'lang': 'lang',
+        'correo electrónico': 'email',
+        'email': 'email',
+        'rol': 'role',
+        'role': 'role',
+        'departamento': 'department',
+        'departamentos': 'department',
+        'department': 'department',
+        'supervisores': 'supervisors',
+        'supervisors': 'supervisors',
+        'supervisores_ids': 'supervisors',
+    }
+
+    # Valores admitidos en la columna Rol
+    _ROLE_ALIASES = {
+        'comercial': 'worker',
+        'worker': 'worker',
+        'supervisor': 'supervisor',
+        'externo': 'external',
+        'external': 'external',
+    }
+
+    file = fields.Binary(string='Fichero', required=True, attachment=False)
+    filename = fields.Char(string='Nombre del fichero')
+    default_role = fields.Selection(
+        [('worker', 'Comercial'), ('supervisor', 'Supervisor'), ('external', 'Externo'), ('none', 'Sin rol')],
+        string='Rol por defecto',
+        default='worker',
+        required=True,
+        help='Rol que se asigna a las filas que no indican ninguno'
+    )
+    chunk_size = fields.Integer(
+        string='Filas por bloque',
+        default=200,
+        help='Número de filas que se crean en cada bloque'
+    )
+    commit_chunks = fields.Boolean(
+        string='Confirmar cada bloque',
+        default=True,
+        help='Confirma la transacción al terminar cada bloque para no perder el trabajo hecho'
+    )
+    state = fields.Selection([('draft', 'Borrador'), ('done', 'Terminado')], default='draft')
+    created_count = fields.Integer(string='Usuarios creados', readonly=True)
+    error_count = fields.Integer(string='Filas con errores', readonly=True)
+    report = fields.Text(string='Informe', readonly=True)
+
+    # -------------------------
+    # LECTURA DEL FICHERO (streaming)
+    # -------------------------
+
+    def _iter_rows(self):
+        """Devuelve (número de fila, dict) para cada fila de datos del fichero."""
+        self.ensure_one()
+        data = base64.b64decode(self.file)
+        filename = (self.filename or '').lower()
+        if filename.endswith('.csv'):
+            rows = self._iter_csv_rows(data)
+        elif filename.endswith(('.xlsx', '.xlsm')):
+            rows = self._iter_xlsx_rows(data)
+        else:
+            raise UserError("Formato no soportado. Usa un fichero .xlsx o .csv.")
+
+        header = None
+        for row_number, values in enumerate(rows, start=1):
+            if header is None:
+                header = [self._COLUMN_ALIASES.get(str(value or '').strip().lower()) for value in values]
+                if 'login' not in header or 'name' not in header:
+                    raise UserError(
+                        "El fichero debe tener al menos las columnas 'Inicio de sesión' y 'Nombre'."
+                    )
+                continue
+            if not any(values):
+                continue
+            yield row_number, {
+                key: str(value).strip() if value is not None else ''
+                for key, value in zip(header, values) if key
+            }
+
+    # Codificaciones probadas en orden (Excel en español exporta en Windows-1252)
+    _CSV_ENCODINGS = ('utf-8-sig', 'cp1252')
+
+    def _decode_csv(self, data):
+        for encoding in self._CSV_ENCODINGS:
+            try:
+                return data.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+        raise UserError("No se pudo leer el CSV: guárdalo con codificación UTF-8.")
+
+    def _iter_csv_rows(self, data):
+        stream = io.StringIO(self._decode_csv(data), newline='')
+        sample = stream.read(4096)
+        stream.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(stream, dialect)
+
+    def _iter_xlsx_rows(self, data):
+        if openpyxl is None:
+            raise UserError("Para importar ficheros .xlsx es necesaria la librería openpyxl.")
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    # -------------------------
+    # TABLAS DE BÚSQUEDA
+    # -------------------------
+
+    def _load_lookups(self):
+        """Precarga compañías, departamentos, idiomas y logins existentes."""
+        env = self.env
+        companies = {
+            company['name'].strip().lower(): company['id']
+            for company in env['res.company'].sudo().search_read([], ['name'])
+        }
+        # Los nombres de departamento son únicos por compañía (False = compartido)
+        departments = {
+            (department['company_id'] and department['company_id'][0], department['name'].strip().lower()): department['id']
+            for department in env['res.partner.department'].sudo().search_read([], ['name', 'company_id'])
+        }
+        langs = {}
+        for code, name in env['res.lang'].get_installed():
+            langs[code.lower()] = code
+            langs[name.strip().lower()] = code
+        logins = {
+            user['login'].lower()
+            for user in env['res.users'].sudo().with_context(active_test=False).search_read([], ['login'])
+        }
+        return {
+            'companies': companies,
+            'departments': departments,
+            'langs': langs,
+            'logins': logins,
+            'supervisors': {},
+        }
+
+    def _find_supervisor(self, login, lookups):
+        """
+        Partner del supervisor con ese inicio de sesión (o None). Se busca al
+        pedirlo para encontrar también los creados en bloques anteriores.
+        """
+        key = login.lower()
+        if key not in lookups['supervisors']:
+            user = self.env['res.users'].sudo().search(
+                [('login', '=', login), ('partner_id.supervisor', '=', True)], limit=1,
+            )
+            if not user:
+                return None
+            lookups['supervisors'][key] = user.partner_id.id
+        return lookups['supervisors'][key]
+
+    # -------------------------
+    # VALIDACIÓN DE FILAS
+    # -------------------------
+
+    def _prepare_user_vals(self, row, lookups):
+        """Devuelve (vals, error) para una fila del fichero."""
+        login = row.get('login', '')
+        name = row.get('name', '')
+        if not login or not name:
+            return None, "Faltan el inicio de sesión o el nombre."
+        if login.lower() in lookups['logins']:
+            return None, f"El usuario '{login}' ya existe."
+
+        vals = {
+            'name': name,
+            'login': login,
+            'email': row.get('email') or (login if '@' in login else False),
+        }
+
+        company_id = False
+        company_name = row.get('company', '')
+        if company_name:
+            company_id = lookups['companies'].get(company_name.lower())
+            if not company_id:
+                return None, f"La compañía '{company_name}' no existe."
+            vals.update({
+                'company_id': company_id,
+                'company_ids': [(6, 0, [company_id])],
+                'internal_company_id': company_id,
+            })
+
+        lang = row.get('lang', '')
+        if lang:
+            lang_code = lookups['langs'].get(lang.lower())
+            if not lang_code:
+                return None, f"El idioma '{lang}' no está instalado."
+            vals['lang'] = lang_code
+
+        role = row.get('role', '').lower() or self.default_role
+        if role != 'none':
+            role = self._ROLE_ALIASES.get(role)
+            if not role:
+                return None, f"Rol no válido: '{row.get('role')}'."
+            vals[role] = True
+
+        department_names = [name.strip() for name in row.get('department', '').split(',') if name.strip()]
+        if department_names:
+            department_ids = []
+            for department_name in department_names:
+                department_id = (
+                    lookups['departments'].get((company_id, department_name.lower()))
+                    or lookups['departments'].get((False, department_name.lower()))
+                )
+                if not department_id:
+                    return None, f"El departamento '{department_name}' no existe."
+                department_ids.append(department_id)
+            vals['department'] = [(6, 0, department_ids)]
+
+        # Un externo necesita al menos un supervisor (_check_supervisor_externo_obligatorio)
+        if role == 'external':
+            supervisor_logins = [login.strip() for login in row.get('supervisors', '').split(',') if login.strip()]
+            if not supervisor_logins:
+                return None, "Un externo necesita la columna 'Supervisores' con el inicio de sesión de al menos un supervisor."
+            supervisor_ids = []
+            for supervisor_login in supervisor_logins:
+                supervisor_id = self._find_supervisor(supervisor_login, lookups)
+                if not supervisor_id:
+                    return None, f"El supervisor '{supervisor_login}' no existe."
+                supervisor_ids.append(supervisor_id)
+            vals['supervisores_ids'] = [(6, 0, supervisor_ids)]
+
+        return vals, None
+
+    # -------------------------
+    # CREACIÓN POR BLOQUES
+    # -------------------------
+
+    def _create_chunk(self, rows, errors):
+        """
+        Crea un bloque de usuarios en una sola llamada dentro de un savepoint.
+        Si el bloque falla, se reintenta fila a fila para localizar los errores.
+        """
+        Users = self.env['res.users'].with_context(
+            no_reset_password=True,
+            tracking_disable=True,
+            mail_create_nosubscribe=True,
+        )
+        if not rows:
+            return 0
+        try:
+            with self.env.cr.savepoint():
+                Users.create([vals for _row_number, vals in rows])
+            return len(rows)
+        except Exception as e:
+            _logger.info(f"⚠️ Bloque de {len(rows)} filas con errores, reintentando fila a fila: {e}")
+
+        created = 0
+        for row_number, vals in rows:
+            try:
+                with self.env.cr.savepoint():
+                    Users.create(vals)
+                created += 1
+            except Exception as e:
+                errors.append((row_number, str(e)))
+        return created
+
+    def action_import(self):
+        self.ensure_one()
+        chunk_size = max(self.chunk_size, 1)
+        commit = self.commit_chunks and not self.env.registry.in_test_mode()
+        lookups = self._load_lookups()
+        errors = []
+        created = 0
+
+        rows = self._iter_rows()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            valid_rows = []
+            for row_number, row in chunk:
+                vals, error = self._prepare_user_vals(row, lookups)
+                if error:
+                    errors.append((row_number, error))
+                    continue
+                # Evitar logins repetidos dentro del propio fichero
+                lookups['logins'].add(vals['login'].lower())
+                valid_rows.append((row_number, vals))
+
+            created += self._create_chunk(valid_rows, errors)
+            _logger.info(f"📦 Alta masiva: {created} usuarios creados, {len(errors)} errores")
+            if commit:
+                self.env.cr.commit()
+
+        errors.sort()
+        self.write({
+            'state': 'done',
+            'created_count': created,
+            'error_count': len(errors),
+            'report': '\n'.join(f"Fila {row_number}: {error}" for row_number, error in errors),
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga multiusuario contra un Odoo local por JSON-RPC.
+
+Inicia sesión con muchos comerciales, supervisores y externos simulados
+(por defecto, los usuarios creados por custom.dataset.generator) y repite
+sesiones realistas: lista de contactos, búsqueda, kanban de oportunidades,
+alta de cliente y alta de oportunidad con productos. Al terminar muestra la
+latencia p50/p95/p99 por endpoint y rol, y los errores agrupados por tipo
+(fallos de serialización incluidos).
+
+Solo usa la librería estándar. Ejemplo:
+
+    python3 tools/load_test.py --url http://localhost:8069 --db beco \\
+        --admin-password admin --prefix GEN42 --users-per-role 20 \\
+        --duration 300 --set-password --json /tmp/load.json
+"""
+import argparse
+import http.cookiejar
+import itertools
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+# Pasos de cada sesión según el rol
+ROLE_STEPS = {
+    'worker': ['partner_list', 'partner_search', 'lead_kanban', 'create_client', 'create_lead'],
+    'supervisor': ['partner_list', 'partner_search', 'lead_kanban', 'create_lead'],
+    'external': ['partner_list', 'partner_search', 'lead_kanban'],
+}
+
+PARTNER_LIST_FIELDS = ['display_name', 'email', 'phone', 'department', 'comercial_asignado_id']
+LEAD_KANBAN_FIELDS = ['name', 'partner_id', 'user_id', 'stage_id', 'expected_revenue', 'tag_ids']
+
+
+class RpcError(Exception):
+    def __init__(self, error):
+        data = error.get('data') or {}
+        self.name = data.get('name') or error.get('message') or 'RpcError'
+        self.message = data.get('message') or error.get('message') or ''
+        super().__init__(f"{self.name}: {self.message}")
+
+    @property
+    def kind(self):
+        text = f"{self.name} {self.message}".lower()
+        if 'serializ' in text or 'concurrent update' in text:
+            return 'serialization_failure'
+        if 'accesserror' in text or 'access' in self.name.lower():
+            return 'access_error'
+        if 'validationerror' in text:
+            return 'validation_error'
+        return self.name
+
+
+class OdooSession:
+    """Sesión web de un usuario (cookie propia) sobre JSON-RPC."""
+
+    def __init__(self, url, db, timeout=60):
+        self.url = url.rstrip('/')
+        self.db = db
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        self.request_ids = itertools.count(1)
+        self.uid = None
+        self.context = {}
+
+    def rpc(self, path, params):
+        payload = json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'id': next(self.request_ids),
+            'params': params,
+        }).encode()
+        request = urllib.request.Request(
+            self.url + path, data=payload, headers={'Content-Type': 'application/json'},
+        )
+        with self.opener.open(request, timeout=self.timeout) as response:
+            body = json.loads(response.read())
+        if body.get('error'):
+            raise RpcError(body['error'])
+        return body.get('result')
+
+    def authenticate(self, login, password):
+        result = self.rpc('/web/session/authenticate', {'db': self.db, 'login': login, 'password': password})
+        if not result or not result.get('uid'):
+            raise RpcError({'message': f"Login incorrecto para {login}"})
+        self.uid = result['uid']
+        self.context = result.get('user_context') or {}
+        return result
+
+    def call_kw(self, model, method, args=None, kwargs=None):
+        kwargs = dict(kwargs or {})
+        kwargs.setdefault('context', self.context)
+        return self.rpc(f"/web/dataset/call_kw/{model}/{method}", {
+            'model': model,
+            'method': method,
+            'args': args or [],
+            'kwargs': kwargs,
+        })
+
+
+class Stats:
+    """Latencias y errores por (rol, endpoint), compartidos entre hilos."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.samples = defaultdict(list)
+
+    def record(self, role, endpoint, seconds, error=None):
+        with self.lock:
+            key = (role, endpoint)
+            if error is None:
+                self.latencies[key].append(seconds * 1000)
+            else:
+                self.errors[key][error] += 1
+                if len(self.samples[key]) < 3:
+                    self.samples[key].append(str(error))
+
+    @staticmethod
+    def percentile(values, percent):
+        """Percentil por rango más cercano."""
+        ordered = sorted(values)
+        rank = max(1, int(round(percent / 100.0 * len(ordered))))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def report(self):
+        rows = []
+        for key in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(key, [])
+            errors = dict(self.errors.get(key, {}))
+            row = {
+                'role': key[0],
+                'endpoint': key[1],
+                'ok': len(values),
+                'errors': errors,
+                'error_count': sum(errors.values()),
+            }
+            if values:
+                row.update({
+                    'p50_ms': round(self.percentile(values, 50), 1),
+                    'p95_ms': round(self.percentile(values, 95), 1),
+                    'p99_ms': round(self.percentile(values, 99), 1),
+                    'mean_ms': round(statistics.mean(values), 1),
+                    'max_ms': round(max(values), 1),
+                })
+            rows.append(row)
+        return rows
+
+
+# -------------------------
+# PASOS DE UNA SESIÓN
+# -------------------------
+
+def step_partner_list(session, state, rng):
+    session.call_kw('res.partner', 'web_search_read', [], {
+        'domain': [], 'fields': PARTNER_LIST_FIELDS, 'limit': 80, 'count_limit': 10001,
+    })
+
+
+def step_partner_search(session, state, rng):
+    term = rng.choice(['Cliente', 'Comercial', 'a', 'e', '1', '2'])
+    session.call_kw('res.partner', 'name_search', [], {'name': term, 'limit': 8})
+    session.call_kw('res.partner', 'web_search_read', [], {
+        'domain': [('name', 'ilike', term)], 'fields': PARTNER_LIST_FIELDS, 'limit': 80,
+    })
+
+
+def step_lead_kanban(session, state, rng):
+    groups = session.call_kw('crm.lead', 'web_read_group', [], {
+        'domain': [('type', '=', 'opportunity')],
+        'fields': ['stage_id', 'expected_revenue'],
+        'groupby': ['stage_id'],
+        'lazy': True,
+    })
+    for group in (groups or {}).get('groups', [])[:4]:
+        session.call_kw('crm.lead', 'web_search_read', [], {
+            'domain': group.get('__domain', []), 'fields': LEAD_KANBAN_FIELDS, 'limit': 40,
+        })
+
+
+def step_create_client(session, state, rng):
+    partner_id = session.call_kw('res.partner', 'create', [{
+        'name': f"Carga {session.uid}-{rng.randrange(10 ** 9)}",
+        'email': f"carga{rng.randrange(10 ** 9)}@example.com",
+    }])
+    state['client_ids'].append(partner_id)
+
+
+def step_create_lead(session, state, rng):
+    vals = {
+        'name': f"Oportunidad de carga {rng.randrange(10 ** 9)}",
+        'type': 'opportunity',
+        'product_ids': [(6, 0, rng.sample(state['product_ids'], k=min(2, len(state['product_ids']))))],
+    }
+    if state['client_ids']:
+        vals['partner_id'] = rng.choice(state['client_ids'])
+    session.call_kw('crm.lead', 'create', [vals])
+
+
+STEPS = {
+    'partner_list': step_partner_list,
+    'partner_search': step_partner_search,
+    'lead_kanban': step_lead_kanban,
+    'create_client': step_create_client,
+    'create_lead': step_create_lead,
+}
+
+
+# -------------------------
+# EJECUCIÓN
+# -------------------------
+
+def discover_users(admin, prefix, users_per_role):
+    """Logins de los usuarios generados, agrupados por rol."""
+    users = {}
+    for role in ROLE_STEPS:
+        records = admin.call_kw('res.users', 'search_read', [], {
+            'domain': [(f'partner_id.{role}', '=', True), ('login', '=like', f"{prefix.lower()}.%")],
+            'fields': ['login'],
+            'limit': users_per_role,
+            'order': 'id',
+        })
+        users[role] = [record['login'] for record in records]
+    return users
+
+
+def run_user(args, role, login, product_ids, stats, deadline, seed):
+    rng = random.Random(seed)
+    session = OdooSession(args.url, args.db, timeout=args.timeout)
+    start = time.perf_counter()
+    try:
+        session.authenticate(login, args.password)
+        stats.record(role, 'login', time.perf_counter() - start)
+    except (RpcError, urllib.error.URLError, OSError) as error:
+        stats.record(role, 'login', time.perf_counter() - start, getattr(error, 'kind', type(error).__name__))
+        return
+
+    state = {'client_ids': [], 'product_ids': product_ids}
+    iteration = 0
+    while time.monotonic() < deadline and (not args.iterations or iteration < args.iterations):
+        iteration += 1
+        for endpoint in ROLE_STEPS[role]:
+            if endpoint == 'create_lead' and not product_ids:
+                continue
+            start = time.perf_counter()
+            try:
+                STEPS[endpoint](session, state, rng)
+                stats.record(role, endpoint, time.perf_counter() - start)
+            except RpcError as error:
+                stats.record(role, endpoint, time.perf_counter() - start, error.kind)
+            except (urllib.error.URLError, OSError) as error:
+                stats.record(role, endpoint, time.perf_counter() - start, type(error).__name__)
+            if args.think_time:
+                time.sleep(rng.uniform(0, args.think_time))
+
+
+def print_report(rows):
+    header = f"{'rol':<11}{'endpoint':<16}{'ok':>7}{'err':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(
+            f"{row['role']:<11}{row['endpoint']:<16}{row['ok']:>7}{row['error_count']:>6}"
+            f"{row.get('p50_ms', '-'):>9}{row.get('p95_ms', '-'):>9}"
+            f"{row.get('p99_ms', '-'):>9}{row.get('max_ms', '-'):>9}"
+        )
+    errors = [(row['role'], row['endpoint'], row['errors']) for row in rows if row['errors']]
+    if errors:
+        print("\nErrores:")
+        for role, endpoint, by_kind in errors:
+            print(f"  {role}/{endpoint}: {by_kind}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://localhost:8069')
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--admin-login', default='admin')
+    parser.add_argument('--admin-password', required=True)
+    parser.add_argument('--prefix', default='GEN42', help='prefijo de los datos de custom.dataset.generator')
+    parser.add_argument('--password', default='carga', help='contraseña de los usuarios simulados')
+    parser.add_argument('--set-password', action='store_true',
+                        help='asigna --password a los usuarios simulados (con el admin)')
+    parser.add_argument('--users-per-role', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=60, help='segundos de prueba')
+    parser.add_argument('--iterations', type=int, default=0, help='sesiones por usuario (0 = hasta --duration)')
+    parser.add_argument('--think-time', type=float, default=0.5, help='pausa máxima entre pasos (s)')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='fichero donde guardar el informe')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    admin = OdooSession(args.url, args.db, timeout=args.timeout)
+    admin.authenticate(args.admin_login, args.admin_password)
+
+    users = discover_users(admin, args.prefix, args.users_per_role)
+    total = sum(len(logins) for logins in users.values())
+    if not total:
+        print(f"No hay usuarios con el prefijo {args.prefix}. Genera datos con custom.dataset.generator.")
+        return 1
+    if args.set_password:
+        logins = [login for role_logins in users.values() for login in role_logins]
+        user_ids = admin.call_kw('res.users', 'search', [[('login', 'in', logins)]])
+        admin.call_kw('res.users', 'write', [user_ids, {'password': args.password}])
+    product_ids = admin.call_kw('product.product', 'search', [[('sale_ok', '=', True)]], {'limit': 50})
+
+    print(f"Simulando {total} usuarios ({', '.join(f'{role}: {len(logins)}' for role, logins in users.items())}) "
+          f"durante {args.duration:.0f}s")
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    threads = []
+    for index, (role, login) in enumerate((role, login) for role, logins in users.items() for login in logins):
+        thread = threading.Thread(
+            target=run_user, args=(args, role, login, product_ids, stats, deadline, args.seed + index),
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    rows = stats.report()
+    print_report(rows)
+    if args.json:
+        with open(args.json, 'w') as report_file:
+            json.dump({'args': {k: v for k, v in vars(args).items() if 'password' not in k}, 'results': rows},
+                      report_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())